@@ -14,30 +14,16 @@ results = {
 '''
 import json
 import asyncio
-from typing import Any, Sequence, Tuple, NamedTuple, AsyncIterator, TypedDict
-from pysnmp.hlapi.v3arch.asyncio import (
-    SnmpEngine,
-    UsmUserData,
-    UdpTransportTarget,
-    ContextData,
-    ObjectType,
-    ObjectIdentity,
-    get_cmd,
-    walk_cmd,
-    USM_AUTH_HMAC96_MD5,
-    USM_PRIV_CFB128_AES,
+from typing import TypedDict
+from snmp_client import (
+    SnmpClient,
+    SnmpCredentials,
+    SnmpEngineError,
+    SnmpPduError,
+    raise_snmp_error,
 )
-class SnmpTupleResult(NamedTuple):
-    errInd: Any
-    errStat: Any
-    errIdx: int
-    varBinds: Sequence[Tuple[Any, Any]]
-
-class SnmpEngineError(RuntimeError): ...
-class SnmpPduError(RuntimeError):
-    def __init__(self, message: str, bad_oid: str | None = None):
-        super().__init__(message)
-        self.bad_oid = bad_oid
+
+CREDS = SnmpCredentials("SNMPUser1", "AUTHPass1", "PRIVPass1", auth_protocol="MD5", priv_protocol="AES")
 
 class OidStatus(TypedDict):
     ok: bool
@@ -49,36 +35,6 @@ class SnmpRunResult(TypedDict):
     transport_error: str | None
     oids: dict[str, OidStatus]
 
-async def snmp_get_oids(target_ip: str, oid_nums: Sequence[str]) -> AsyncIterator[SnmpTupleResult]:
-    transport = await UdpTransportTarget.create((target_ip, 161), timeout=5, retries=1)
-    oid_types = [ObjectType(ObjectIdentity(oid_num)) for oid_num in oid_nums]
-
-    result = await get_cmd(
-        SnmpEngine(),
-        UsmUserData(
-            userName="SNMPUser1",
-            authKey="AUTHPass1",
-            privKey="PRIVPass1",
-            authProtocol=USM_AUTH_HMAC96_MD5,
-            privProtocol=USM_PRIV_CFB128_AES,
-        ),
-        transport,
-        ContextData(),
-        *oid_types,
-        lookupMib=False,
-    )
-
-    yield SnmpTupleResult(*result)
-
-def raise_snmp_error(errInd: Any, errStat: Any, errIdx: int, varBinds: Sequence, oid_nums: Sequence[str]) -> None:
-    
-    if errInd:
-            raise SnmpEngineError(str(errInd))
-    if errStat:
-            idx0 = int(errIdx) - 1 if errIdx else None
-            bad_oid = oid_nums[idx0] if (idx0 is not None and 0 <= idx0 < len(oid_nums)) else "?"
-            raise SnmpPduError(str(errStat), bad_oid=bad_oid)   
-    
 async def main() -> SnmpRunResult:
 
     target_ip = "192.168.2.55"
@@ -96,10 +52,11 @@ async def main() -> SnmpRunResult:
         },
     }
 
-    async for errInd, errStat, errIdx, varBinds in snmp_get_oids(target_ip, oid_nums):
+    async with SnmpClient(CREDS, timeout=5, retries=1) as client:
+        res = await client.get(target_ip, oid_nums)
 
         try:
-            raise_snmp_error(errInd, errStat, errIdx, varBinds, oid_nums)
+            raise_snmp_error(res, oid_nums)
         
         except SnmpEngineError as e:
             print("SNMP failed/Transport error:", e)
@@ -110,34 +67,34 @@ async def main() -> SnmpRunResult:
             print("SNMP PDU error:", e, "| bad_oid =", e.bad_oid)
 
             for oid in oid_nums:
-                async for errInd, errStat, errIdx, varBinds in snmp_get_oids(target_ip, [oid]):
-                    try:
-                        raise_snmp_error(errInd, errStat, errIdx, varBinds, [oid])
-                    
-                    except SnmpEngineError as te:
-                        print("Transport error on", oid, ":", te)
-                        result["oids"][oid]["ok"] = False
-                        result["oids"][oid]["error"] = str(te)
-                        result["oids"][oid]["response_oid"] = None
-                    
-                    except SnmpPduError as pe:
-                        print("PDU error on", oid, ":", pe)
-                        result["oids"][oid]["ok"] = False
-                        result["oids"][oid]["error"] = str(pe)
-                        result["oids"][oid]["response_oid"] = oid
-
-                    else:
-                        for responce_oid, val in varBinds:
-                            print(f"{responce_oid.prettyPrint()} = {val.prettyPrint()}")
-                            result["oids"][oid]["ok"] = True
-                            result["oids"][oid]["value"] = val.prettyPrint()
-                            result["oids"][oid]["error"] = None
-                            result["oids"][oid]["response_oid"] = responce_oid.prettyPrint()
+                single = await client.get(target_ip, [oid])
+                try:
+                    raise_snmp_error(single, [oid])
+                
+                except SnmpEngineError as te:
+                    print("Transport error on", oid, ":", te)
+                    result["oids"][oid]["ok"] = False
+                    result["oids"][oid]["error"] = str(te)
+                    result["oids"][oid]["response_oid"] = None
+                
+                except SnmpPduError as pe:
+                    print("PDU error on", oid, ":", pe)
+                    result["oids"][oid]["ok"] = False
+                    result["oids"][oid]["error"] = str(pe)
+                    result["oids"][oid]["response_oid"] = oid
+
+                else:
+                    for responce_oid, val in single.varBinds:
+                        print(f"{responce_oid.prettyPrint()} = {val.prettyPrint()}")
+                        result["oids"][oid]["ok"] = True
+                        result["oids"][oid]["value"] = val.prettyPrint()
+                        result["oids"][oid]["error"] = None
+                        result["oids"][oid]["response_oid"] = responce_oid.prettyPrint()
 
             return result
       
         else:
-            resp_map = {response_oid.prettyPrint(): val.prettyPrint() for response_oid, val in varBinds}
+            resp_map = {response_oid.prettyPrint(): val.prettyPrint() for response_oid, val in res.varBinds}
             for oid in oid_nums:
                 if oid in resp_map:
                     result["oids"][oid]["ok"] = True
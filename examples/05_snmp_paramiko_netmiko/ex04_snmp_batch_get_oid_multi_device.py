@@ -20,30 +20,16 @@ SnmpRunResult = {
 '''
 import json
 import asyncio
-from typing import Any, Sequence, Tuple, NamedTuple, AsyncIterator, TypedDict, TypeAlias
-from pysnmp.hlapi.v3arch.asyncio import (
-    SnmpEngine,
-    UsmUserData,
-    UdpTransportTarget,
-    ContextData,
-    ObjectType,
-    ObjectIdentity,
-    get_cmd as pysnmp_get_cmd,
-    walk_cmd,
-    USM_AUTH_HMAC96_MD5,
-    USM_PRIV_CFB128_AES,
+from typing import Sequence, TypedDict, TypeAlias
+from snmp_client import (
+    SnmpClient,
+    SnmpCredentials,
+    SnmpEngineError,
+    SnmpPduError,
+    raise_snmp_error,
 )
-class SnmpTupleResult(NamedTuple):
-    errInd: Any
-    errStat: Any
-    errIdx: int
-    varBinds: Sequence[Tuple[Any, Any]]
-
-class SnmpEngineError(RuntimeError): ...
-class SnmpPduError(RuntimeError):
-    def __init__(self, message: str, bad_oid: str | None = None):
-        super().__init__(message)
-        self.bad_oid = bad_oid
+
+CREDS = SnmpCredentials("SNMPUser1", "AUTHPass1", "PRIVPass1", auth_protocol="MD5", priv_protocol="AES")
 
 class OidStatus(TypedDict):
     ok: bool
@@ -58,103 +44,73 @@ class SnmpRunResult(TypedDict):
 MultiDeviceRunResult: TypeAlias = dict[str, SnmpRunResult]
 
 
-async def get_cmd(ip: str, oid_nums: Sequence[str]) -> AsyncIterator[SnmpTupleResult]:
-    transport = await UdpTransportTarget.create((ip, 161), timeout=5, retries=1)
-    oid_types = [ObjectType(ObjectIdentity(oid_num)) for oid_num in oid_nums]
-
-    result = await pysnmp_get_cmd(
-        SnmpEngine(),
-        UsmUserData(
-            userName="SNMPUser1",
-            authKey="AUTHPass1",
-            privKey="PRIVPass1",
-            authProtocol=USM_AUTH_HMAC96_MD5,
-            privProtocol=USM_PRIV_CFB128_AES,
-        ),
-        transport,
-        ContextData(),
-        *oid_types,
-        lookupMib=False,
-    )
-
-    yield SnmpTupleResult(*result)
-
-def raise_snmp_error(errInd: Any, errStat: Any, errIdx: int, varBinds: Sequence, oid_nums: Sequence[str]) -> None:
-    
-    if errInd:
-            raise SnmpEngineError(str(errInd))
-    if errStat:
-            idx0 = int(errIdx) - 1 if errIdx else None
-            bad_oid = oid_nums[idx0] if (idx0 is not None and 0 <= idx0 < len(oid_nums)) else "?"
-            raise SnmpPduError(str(errStat), bad_oid=bad_oid)   
-    
-async def snmp_get_device(ip: str, oid_nums: Sequence[str]) -> SnmpRunResult:
+async def snmp_get_device(client: SnmpClient, ip: str, oid_nums: Sequence[str]) -> SnmpRunResult:
 
     result: SnmpRunResult = {
         "transport_error": None,
         "oids": {oid: {"ok": False, "value": None, "error": None, "response_oid": None} for oid in oid_nums},
     }
 
-    async for errInd, errStat, errIdx, varBinds in get_cmd(ip, oid_nums):
+    res = await client.get(ip, oid_nums)
 
-        try:
-            raise_snmp_error(errInd, errStat, errIdx, varBinds, oid_nums)
-        
-        except SnmpEngineError as e:
-            print("SNMP failed/Transport error:", e)
-            result["transport_error"] = str(e)
-            return result
-        
-        except SnmpPduError as e:
-            print("Bath PDU error:", e, "| bad_oid =", e.bad_oid)
-
-            for oid in oid_nums:
-                async for errInd, errStat, errIdx, varBinds in get_cmd(ip, [oid]):
-                    try:
-                        raise_snmp_error(errInd, errStat, errIdx, varBinds, [oid])
-                    
-                    except SnmpEngineError as te:
-                        print("Transport error on", oid, ":", te)
-                        result["oids"][oid]["ok"] = False
-                        result["oids"][oid]["error"] = str(te)
-                        result["oids"][oid]["response_oid"] = None
-                    
-                    except SnmpPduError as pe:
-                        print("PDU error on", oid, ":", pe)
-                        result["oids"][oid]["ok"] = False
-                        result["oids"][oid]["error"] = str(pe)
-                        result["oids"][oid]["response_oid"] = oid
-
-                    else:
-                        for responce_oid, val in varBinds:
-                            print(f"{responce_oid.prettyPrint()} = {val.prettyPrint()}")
-                            result["oids"][oid]["ok"] = True
-                            result["oids"][oid]["value"] = val.prettyPrint()
-                            result["oids"][oid]["error"] = None
-                            result["oids"][oid]["response_oid"] = responce_oid.prettyPrint()
-
-            return result
-      
-        else:
-            resp_map = {responce_oid.prettyPrint(): val.prettyPrint() for responce_oid, val in varBinds}
-            for oid in oid_nums:
-                if oid in resp_map:
+    try:
+        raise_snmp_error(res, oid_nums)
+    
+    except SnmpEngineError as e:
+        print("SNMP failed/Transport error:", e)
+        result["transport_error"] = str(e)
+        return result
+    
+    except SnmpPduError as e:
+        print("Bath PDU error:", e, "| bad_oid =", e.bad_oid)
+
+        for oid in oid_nums:
+            single = await client.get(ip, [oid])
+            try:
+                raise_snmp_error(single, [oid])
+            
+            except SnmpEngineError as te:
+                print("Transport error on", oid, ":", te)
+                result["oids"][oid]["ok"] = False
+                result["oids"][oid]["error"] = str(te)
+                result["oids"][oid]["response_oid"] = None
+            
+            except SnmpPduError as pe:
+                print("PDU error on", oid, ":", pe)
+                result["oids"][oid]["ok"] = False
+                result["oids"][oid]["error"] = str(pe)
+                result["oids"][oid]["response_oid"] = oid
+
+            else:
+                for responce_oid, val in single.varBinds:
+                    print(f"{responce_oid.prettyPrint()} = {val.prettyPrint()}")
                     result["oids"][oid]["ok"] = True
-                    result["oids"][oid]["value"] = resp_map[oid]
+                    result["oids"][oid]["value"] = val.prettyPrint()
                     result["oids"][oid]["error"] = None
-                    result["oids"][oid]["response_oid"] = oid
-                else:
-                    result["oids"][oid]["ok"] = False
-                    result["oids"][oid]["value"] = None
-                    result["oids"][oid]["error"] = "missing_in_response"
-                    result["oids"][oid]["response_oid"] = None
-
-            return result
+                    result["oids"][oid]["response_oid"] = responce_oid.prettyPrint()
+
+        return result
+  
+    else:
+        resp_map = {responce_oid.prettyPrint(): val.prettyPrint() for responce_oid, val in res.varBinds}
+        for oid in oid_nums:
+            if oid in resp_map:
+                result["oids"][oid]["ok"] = True
+                result["oids"][oid]["value"] = resp_map[oid]
+                result["oids"][oid]["error"] = None
+                result["oids"][oid]["response_oid"] = oid
+            else:
+                result["oids"][oid]["ok"] = False
+                result["oids"][oid]["value"] = None
+                result["oids"][oid]["error"] = "missing_in_response"
+                result["oids"][oid]["response_oid"] = None
+
+        return result
         
-async def run_sequential(target_ips: Sequence[str], oid_nums: Sequence[str]) -> MultiDeviceRunResult:
+async def run_sequential(client: SnmpClient, target_ips: Sequence[str], oid_nums: Sequence[str]) -> MultiDeviceRunResult:
     all_results: MultiDeviceRunResult = {}
     for ip in target_ips:
-        all_results[ip] = await snmp_get_device(ip, oid_nums)
+        all_results[ip] = await snmp_get_device(client, ip, oid_nums)
     return all_results
 
 async def main() -> MultiDeviceRunResult:
@@ -167,7 +123,8 @@ async def main() -> MultiDeviceRunResult:
         "1.3.6.1.2.1.1.2.0", 
         "1.3.6.1.2.1.1.3.0"
     ]
-    return await run_sequential(target_ips, oid_nums)
+    async with SnmpClient(CREDS, timeout=5, retries=1) as client:
+        return await run_sequential(client, target_ips, oid_nums)
 
 if __name__ == "__main__":
     out = asyncio.run(main())
@@ -10,6 +10,7 @@ MultiDeviceRunResult = {
 
 SnmpRunResult = {
   "transport_error": None,
+  "round_trips": 1,
   "oids": {
      "1.3.6...1.0": {"ok": True,  "value": "...", "error": None, "response_oid": "1.3.6...1.0"},
      "1.3.6...2.0": {"ok": False, "value": None, "error": "noAccess", "response_oid": "1.3.6...2.0"},
@@ -19,30 +20,16 @@ SnmpRunResult = {
 '''
 import json
 import asyncio
-from typing import Any, Sequence, Tuple, NamedTuple, AsyncIterator, TypedDict, TypeAlias
-from pysnmp.hlapi.v3arch.asyncio import (
-    SnmpEngine,
-    UsmUserData,
-    UdpTransportTarget,
-    ContextData,
-    ObjectType,
-    ObjectIdentity,
-    get_cmd as pysnmp_get_cmd,
-    walk_cmd,
-    USM_AUTH_HMAC96_MD5,
-    USM_PRIV_CFB128_AES,
+from typing import Sequence, TypedDict, TypeAlias
+from snmp_client import (
+    SnmpClient,
+    SnmpCredentials,
+    SnmpEngineError,
+    SnmpPduError,
+    raise_snmp_error,
 )
-class SnmpTupleResult(NamedTuple):
-    errInd: Any
-    errStat: Any
-    errIdx: int
-    varBinds: Sequence[Tuple[Any, Any]]
-
-class SnmpEngineError(RuntimeError): ...
-class SnmpPduError(RuntimeError):
-    def __init__(self, message: str, bad_oid: str | None = None):
-        super().__init__(message)
-        self.bad_oid = bad_oid
+
+CREDS = SnmpCredentials("SNMPUser1", "AUTHPass1", "PRIVPass1", auth_protocol="MD5", priv_protocol="AES")
 
 class OidStatus(TypedDict):
     ok: bool
@@ -52,105 +39,98 @@ class OidStatus(TypedDict):
 
 class SnmpRunResult(TypedDict):
     transport_error: str | None
+    round_trips: int
     oids: dict[str, OidStatus]
 
 MultiDeviceRunResult: TypeAlias = dict[str, SnmpRunResult]
 
 
-async def get_cmd(ip: str, oid_nums: Sequence[str]) -> AsyncIterator[SnmpTupleResult]:
-    transport = await UdpTransportTarget.create((ip, 161), timeout=5, retries=1)
-    oid_types = [ObjectType(ObjectIdentity(oid_num)) for oid_num in oid_nums]
-
-    result = await pysnmp_get_cmd(
-        SnmpEngine(),
-        UsmUserData(
-            userName="SNMPUser1",
-            authKey="AUTHPass1",
-            privKey="PRIVPass1",
-            authProtocol=USM_AUTH_HMAC96_MD5,
-            privProtocol=USM_PRIV_CFB128_AES,
-        ),
-        transport,
-        ContextData(),
-        *oid_types,
-        lookupMib=False,
-    )
-
-    yield SnmpTupleResult(*result)
-
-def raise_snmp_error(errInd: Any, errStat: Any, errIdx: int, varBinds: Sequence, oid_nums: Sequence[str]) -> None:
-    
-    if errInd:
-            raise SnmpEngineError(str(errInd))
-    if errStat:
-            idx0 = int(errIdx) - 1 if errIdx else None
-            bad_oid = oid_nums[idx0] if (idx0 is not None and 0 <= idx0 < len(oid_nums)) else "?"
-            raise SnmpPduError(str(errStat), bad_oid=bad_oid)   
-    
-async def snmp_get_device(ip: str, oid_nums: Sequence[str]) -> SnmpRunResult:
-
+def set_ok(status: OidStatus, response_oid: str, value: str) -> None:
+    status["ok"] = True
+    status["value"] = value
+    status["error"] = None
+    status["response_oid"] = response_oid
+
+def set_error(status: OidStatus, error: str, response_oid: str | None) -> None:
+    status["ok"] = False
+    status["value"] = None
+    status["error"] = error
+    status["response_oid"] = response_oid
+
+class PendingBatch(TypedDict):
+    oids: list[str]
+    error: str | None               # set when the batch is known to fail (no need to send it)
+    parent_error: str | None
+    sibling: "PendingBatch | None"  # left half of a bisection: the right half, which
+                                    # fails with the parent's error if this half succeeds
+
+async def snmp_get_device(client: SnmpClient, ip: str, oid_nums: Sequence[str]) -> SnmpRunResult:
+    '''
+    Batch GET; on a PDU error the OID named by errIdx is dropped and the rest
+    resent, a batch whose errIdx is 0 / out of range is bisected. One bad OID
+    in N costs 2 round trips (errIdx) or about log2(N) (bisect) instead of N + 1.
+    '''
     result: SnmpRunResult = {
         "transport_error": None,
+        "round_trips": 0,
         "oids": {oid: {"ok": False, "value": None, "error": None, "response_oid": None} for oid in oid_nums},
     }
 
-    async for errInd, errStat, errIdx, varBinds in get_cmd(ip, oid_nums):
-
-        try:
-            raise_snmp_error(errInd, errStat, errIdx, varBinds, oid_nums)
-        
-        except SnmpEngineError as e:
-            print("SNMP failed/Transport error:", e)
-            result["transport_error"] = str(e)
-            return result
-        
-        except SnmpPduError as e:
-            print("Bath PDU error:", e, "| bad_oid =", e.bad_oid)
-
-            for oid in oid_nums:
-                async for errInd, errStat, errIdx, varBinds in get_cmd(ip, [oid]):
-                    try:
-                        raise_snmp_error(errInd, errStat, errIdx, varBinds, [oid])
-                    
-                    except SnmpEngineError as te:
-                        print("Transport error on", oid, ":", te)
-                        result["oids"][oid]["ok"] = False
-                        result["oids"][oid]["error"] = str(te)
-                        result["oids"][oid]["response_oid"] = None
-                    
-                    except SnmpPduError as pe:
-                        print("PDU error on", oid, ":", pe)
-                        result["oids"][oid]["ok"] = False
-                        result["oids"][oid]["error"] = str(pe)
-                        result["oids"][oid]["response_oid"] = oid
-
-                    else:
-                        for responce_oid, val in varBinds:
-                            print(f"{responce_oid.prettyPrint()} = {val.prettyPrint()}")
-                            result["oids"][oid]["ok"] = True
-                            result["oids"][oid]["value"] = val.prettyPrint()
-                            result["oids"][oid]["error"] = None
-                            result["oids"][oid]["response_oid"] = responce_oid.prettyPrint()
-
-            return result
-      
-        else:
-            resp_map = {responce_oid.prettyPrint(): val.prettyPrint() for responce_oid, val in varBinds}
-            for oid in oid_nums:
-                if oid in resp_map:
-                    result["oids"][oid]["ok"] = True
-                    result["oids"][oid]["value"] = resp_map[oid]
-                    result["oids"][oid]["error"] = None
-                    result["oids"][oid]["response_oid"] = oid
-                else:
-                    result["oids"][oid]["ok"] = False
-                    result["oids"][oid]["value"] = None
-                    result["oids"][oid]["error"] = "missing_in_response"
-                    result["oids"][oid]["response_oid"] = None
-
-            return result
+    pending: list[PendingBatch] = [{"oids": list(oid_nums), "error": None, "parent_error": None, "sibling": None}]
+    while pending:
+        item = pending.pop()
+        batch = item["oids"]
+
+        if item["error"] is None:
+            res = await client.get(ip, batch)
+            result["round_trips"] += 1
+            try:
+                raise_snmp_error(res, batch)
+
+            except SnmpEngineError as e:
+                if result["round_trips"] == 1:
+                    print("SNMP failed/Transport error:", e)
+                    result["transport_error"] = str(e)
+                    return result
+                print("Transport error on", batch, ":", e)
+                for oid in batch:
+                    set_error(result["oids"][oid], str(e), None)
+                continue
+
+            except SnmpPduError as e:
+                if len(batch) > 1 and 0 < e.index <= len(batch):
+                    # errIdx names the offender: drop it, resend the rest
+                    print("Batch PDU error:", e, "| bad_oid =", e.bad_oid)
+                    set_error(result["oids"][e.bad_oid], str(e), e.bad_oid)
+                    pending.append({"oids": batch[:e.index - 1] + batch[e.index:], "error": None, "parent_error": None, "sibling": None})
+                    continue
+                item["error"] = str(e)
+
+            else:
+                for oid, (responce_oid, val) in zip(batch, res.varBinds):
+                    set_ok(result["oids"][oid], responce_oid.prettyPrint(), val.prettyPrint())
+                if item["sibling"] is not None:
+                    item["sibling"]["error"] = item["parent_error"]
+                continue
+
+        error = item["error"]
+        if len(batch) == 1:
+            print("PDU error on", batch[0], ":", error)
+            set_error(result["oids"][batch[0]], error, batch[0])
+            continue
+
+        # errIdx unusable (0 or out of range) or batch known bad: bisect
+        mid = len(batch) // 2
+        print("Batch PDU error:", error, "| bisecting", len(batch), "OIDs")
+        right: PendingBatch = {"oids": batch[mid:], "error": None, "parent_error": None, "sibling": None}
+        left: PendingBatch = {"oids": batch[:mid], "error": None, "parent_error": error, "sibling": right}
+        pending.append(right)
+        pending.append(left)
+
+    return result
     
 async def run_concurrent(
+        client: SnmpClient,
         target_ips: Sequence[str], 
         oid_nums: Sequence[str], 
         limit: int=50
@@ -161,9 +141,9 @@ async def run_concurrent(
     async def bounded(ip: str) -> tuple[str, SnmpRunResult]:
         async with sem:
             try:    
-                return ip, await snmp_get_device(ip, oid_nums)
+                return ip, await snmp_get_device(client, ip, oid_nums)
             except Exception as e:
-                return ip, {"transport_error" : str(e),
+                return ip, {"transport_error" : str(e), "round_trips": 0,
                             "oids": {oid: {"ok": False, "value": None, "error": str(e), "response_oid": None} for oid in oid_nums}}
 
     #pairs = await asyncio.gather(*(bounded(ip) for ip in target_ips))
@@ -193,11 +173,14 @@ async def main() -> MultiDeviceRunResult:
         "1.3.6.1.2.1.1.2.0", 
         "1.3.6.1.2.1.1.3.0"
     ]
-    return await run_concurrent(target_ips, oid_nums)
+    async with SnmpClient(CREDS, timeout=5, retries=1, limit=50) as client:
+        return await run_concurrent(client, target_ips, oid_nums)
 
 if __name__ == "__main__":
     out = asyncio.run(main())
     print(json.dumps(out, indent=2))
+    for ip, res in out.items():
+        print(ip, "round_trips =", res["round_trips"], "| OIDs =", len(res["oids"]))
     with open("snmp_concurrent_devices.json", "w", encoding="utf-8") as f:
         json.dump(out, f, indent=2)
 
@@ -31,25 +31,16 @@ import csv
 import json
 import asyncio
 from datetime import datetime
-from typing import Any, Sequence, Tuple, NamedTuple, AsyncIterator, TypedDict
-from pysnmp.hlapi.v3arch.asyncio import (
-    SnmpEngine,
-    UsmUserData,
-    UdpTransportTarget,
-    ContextData,
-    ObjectType,
-    ObjectIdentity,
-    walk_cmd,
-    USM_AUTH_HMAC96_SHA,
-    USM_PRIV_CFB128_AES,
+from typing import TypedDict
+from snmp_client import (
+    SnmpClient,
+    SnmpCredentials,
+    SnmpEngineError,
+    SnmpPduError,
+    SnmpWalkTooLong,
 )
-class SnmpTupleResult(NamedTuple):
-    errInd: Any
-    errStat: Any
-    errIdx: int
-    varBinds: Sequence[Tuple[Any, Any]]
 
-class SnmpEngineError(RuntimeError): ...
+CREDS = SnmpCredentials("SNMPUser1", "AUTHPass1", "PRIVPass1", auth_protocol="SHA", priv_protocol="AES")
 
 class ifResults(TypedDict):
     transport_error: str | None
@@ -68,62 +59,34 @@ class SnmpCsvResult(TypedDict):
 IFDESCR = "1.3.6.1.2.1.2.2.1.2"
 IFALIAS = "1.3.6.1.2.1.31.1.1.1.18"
 
-async def snmp_walk_if(target_ip: str, bulk_oid: str) -> AsyncIterator[SnmpTupleResult]:
-    transport = await UdpTransportTarget.create((target_ip, 161), timeout=5, retries=1)
-    oid_type = ObjectType(ObjectIdentity(bulk_oid))
-
-    async for errInd, errStat, errIdx, varBinds in walk_cmd(
-        SnmpEngine(),
-        UsmUserData(
-            userName="SNMPUser1",
-            authKey="AUTHPass1",
-            privKey="PRIVPass1",
-            authProtocol=USM_AUTH_HMAC96_SHA,
-            privProtocol=USM_PRIV_CFB128_AES,
-        ),
-        transport,
-        ContextData(),
-        oid_type,
-        lookupMib=False,
-        lexicographicMode=False,
-    ):
-        yield SnmpTupleResult(errInd, errStat, errIdx, varBinds)
-
-def raise_snmp_error(errInd: Any) -> None:
-    
-    if errInd:
-            raise SnmpEngineError(str(errInd))
+async def walk(client: SnmpClient, target_ip: str, columns: list[str]) -> dict[str, ifResults]:
+    """All columns in one GETBULK walk; one ifResults per column."""
 
-async def walk(target_ip, bulk_oid) -> ifResults:
-    
-    result: ifResults = {
-        "transport_error": None,
-        "items": {},
+    results: dict[str, ifResults] = {
+        column: {"transport_error": None, "items": {}} for column in columns
     }
 
-    async for errInd, errStat, errIdx, varBinds in snmp_walk_if(target_ip, bulk_oid):
-
-        try:
-            raise_snmp_error(errInd)
-        
-        except SnmpEngineError as e:
-            print("SNMP failed/Transport error:", e)
-            result["transport_error"] = f"'{bulk_oid}': '{str(e)}'"
-            return result
-        
-        if errStat:
-            return result
-      
-        else:
-            for response_oid, val in varBinds:
-                full_oid = response_oid.prettyPrint()
-                index = int(full_oid.rsplit(".", 1)[-1])
-                text = val.prettyPrint()
-                if text.startswith("No Such Instance") or text.startswith("No Such Object"):
-                    text = None
-                result["items"][index] = text
-
-    return result
+    try:
+        rows = await client.bulk_walk(target_ip, columns)
+    
+    except SnmpEngineError as e:
+        print("SNMP failed/Transport error:", e)
+        for column in columns:
+            results[column]["transport_error"] = f"'{column}': '{str(e)}'"
+        return results
+    
+    except SnmpPduError:
+        return results
+
+    except SnmpWalkTooLong as e:
+        print("SNMP walk truncated:", e)   # keep the partial rows, but say so
+        rows = e.rows
+
+    for index, row in rows.items():
+        for column, vb in row.items():
+            results[column]["items"][int(index)] = vb.text   # None for noSuch*/endOfMibView
+
+    return results
 
 async def main() -> None:
 
@@ -133,8 +96,10 @@ async def main() -> None:
     }
 
     target_ip = "192.168.2.45"
-    ifDescr_results: ifResults = await walk(target_ip, IFDESCR)
-    ifAlias_results: ifResults = await walk(target_ip, IFALIAS)
+    async with SnmpClient(CREDS, timeout=5, retries=1) as client:
+        walked = await walk(client, target_ip, [IFDESCR, IFALIAS])
+    ifDescr_results: ifResults = walked[IFDESCR]
+    ifAlias_results: ifResults = walked[IFALIAS]
 
     if ifDescr_results["transport_error"] or ifAlias_results["transport_error"]:
         final_result["transport_error"] = (
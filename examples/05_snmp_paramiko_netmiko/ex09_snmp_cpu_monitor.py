@@ -4,66 +4,28 @@
 import asyncio
 import csv
 from datetime import datetime
-from typing import Any, Sequence, Tuple, NamedTuple, TypedDict
-from pysnmp.hlapi.v3arch.asyncio import (
-    SnmpEngine,
-    UsmUserData,
-    UdpTransportTarget,
-    ContextData,
-    ObjectType,
-    ObjectIdentity,
-    get_cmd,
-    USM_AUTH_HMAC96_SHA,
-    USM_PRIV_CFB128_AES,
+from typing import TypedDict
+from snmp_client import (
+    SnmpClient,
+    SnmpCredentials,
+    SnmpEngineError,
+    SnmpPduError,
+    oid_str,
+    raise_snmp_error,
 )
-class SnmpTupleResult(NamedTuple):
-    errInd: Any
-    errStat: Any
-    errIdx: int
-    varBinds: Sequence[Tuple[Any, Any]]
-
-class SnmpEngineError(RuntimeError): ...
-class SnmpPduError(RuntimeError): ...
-
+from snmp_values import decode_int
 class SnmpCsvResult(TypedDict):
     timestamp: str | None
     ip: str | None
-    cpu_percent: str | None
+    cpu_percent: int | None
 
 TARGET_IP = "192.168.2.45"
 REQUESTED_OID = "1.3.6.1.4.1.9.2.1.56.0"
+CREDS = SnmpCredentials("SNMPUser1", "AUTHPass1", "PRIVPass1", auth_protocol="SHA", priv_protocol="AES")
 
-async def snmp_get_cpu(REQUESTED_OID: str, transport: UdpTransportTarget, eng: SnmpEngine) -> SnmpTupleResult:
-    
-    oid_type = ObjectType(ObjectIdentity(REQUESTED_OID))
-
-    result = await get_cmd(
-        eng,
-        UsmUserData(
-            userName="SNMPUser1",
-            authKey="AUTHPass1",
-            privKey="PRIVPass1",
-            authProtocol=USM_AUTH_HMAC96_SHA,
-            privProtocol=USM_PRIV_CFB128_AES,
-        ),
-        transport,
-        ContextData(),
-        oid_type,
-        lookupMib=False,
-    )
-
-    return SnmpTupleResult(*result)
-
-def raise_snmp_error(errInd: Any, errStat: Any, REQUESTED_OID: str) -> None:
-    if errInd:
-            raise SnmpEngineError(str(errInd))
-    if errStat:
-            raise SnmpPduError(f"{errStat.prettyPrint()} at {REQUESTED_OID}")    
-    
 async def main() -> None:
 
-    transport = await UdpTransportTarget.create((TARGET_IP, 161), timeout=2, retries=1)
-    eng = SnmpEngine()
+    client = SnmpClient(CREDS, timeout=2, retries=1)   # one engine + transport for every poll
 
     iterations: int = 4 * 60 * 2
     threshold: int = 80
@@ -79,35 +41,34 @@ async def main() -> None:
 
             for _ in range(iterations):
 
-                errInd, errStat, errIdx, varBinds = await snmp_get_cpu(REQUESTED_OID, transport, eng)
+                res = await client.get(TARGET_IP, [REQUESTED_OID])
 
                 try:
-                    raise_snmp_error(errInd, errStat, REQUESTED_OID)
+                    raise_snmp_error(res, [REQUESTED_OID])
 
-                except (SnmpEngineError, SnmpPduError) as e:
+                except SnmpEngineError as e:
                     print("SNMP failed:", e)
+                except SnmpPduError as e:
+                    print("SNMP failed:", e, "at", e.bad_oid)
 
                 else:
-                    for response_oid, val in varBinds:
-                        full_oid = response_oid.prettyPrint()
-                        text = val.prettyPrint()
-                        if text.startswith("No Such Instance") or text.startswith("No Such Object"):
-                            text = None
-                        print(f"{full_oid} = {text}")
+                    for response_oid, val in res.varBinds:
+                        full_oid = oid_str(response_oid)
+                        value_cpu = decode_int(val)   # None for noSuch*/non-numeric
+                        print(f"{full_oid} = {value_cpu}")
                                                 
                         result_csv: SnmpCsvResult = {
                             "timestamp": timestamp,
                             "ip": TARGET_IP,
-                            "cpu_percent": text,
+                            "cpu_percent": value_cpu,
                         }
                         try:
                             writer.writerow(result_csv)
                         except OSError as error:
                             print(f"error writing CSV: {error}")
                         
-                        if text in (None, "None"):
+                        if value_cpu is None:
                             continue
-                        value_cpu = int(text)
                         if value_cpu >= threshold:
                             print(f"WARNING: CPU USAGE is: {value_cpu}")
                             continue
@@ -7,29 +7,17 @@ from netmiko.exceptions import (ReadTimeout, NetmikoAuthenticationException, Net
 from pathlib import Path
 import asyncio
 from datetime import datetime
-from typing import Any, Sequence, Tuple, NamedTuple, TypedDict
-from pysnmp.hlapi.v3arch.asyncio import (
-    SnmpEngine,
-    UsmUserData,
-    UdpTransportTarget,
-    ContextData,
-    ObjectType,
-    ObjectIdentity,
-    get_cmd,
-    USM_AUTH_HMAC96_SHA,
-    USM_PRIV_CFB128_AES,
+from snmp_client import (
+    SnmpClient,
+    SnmpCredentials,
+    SnmpEngineError,
+    SnmpPduError,
+    raise_snmp_error,
 )
-class SnmpTupleResult(NamedTuple):
-    errInd: Any
-    errStat: Any
-    errIdx: int
-    varBinds: Sequence[Tuple[Any, Any]]
-
-class SnmpEngineError(RuntimeError): ...
-class SnmpPduError(RuntimeError): ...
-
+from snmp_values import decode_int
 TARGET_IP = "192.168.2.45"
 REQUESTED_OID = "1.3.6.1.4.1.9.2.1.56.0"
+CREDS = SnmpCredentials("SNMPUser1", "AUTHPass1", "PRIVPass1", auth_protocol="SHA", priv_protocol="AES")
 
 def cmd_show(TARGET_IP: str, username: str, password: str, secret: str | None = None) -> None:
     cmds = [
@@ -81,33 +69,6 @@ def cmd_show(TARGET_IP: str, username: str, password: str, secret: str | None =
         
             print("\nlogs written, we are good, continuing monitoring...\n")
 
-async def snmp_get_cpu(REQUESTED_OID: str, transport: UdpTransportTarget, eng: SnmpEngine) -> SnmpTupleResult:
-    
-    oid_type = ObjectType(ObjectIdentity(REQUESTED_OID))
-
-    result = await get_cmd(
-        eng,
-        UsmUserData(
-            userName="SNMPUser1",
-            authKey="AUTHPass1",
-            privKey="PRIVPass1",
-            authProtocol=USM_AUTH_HMAC96_SHA,
-            privProtocol=USM_PRIV_CFB128_AES,
-        ),
-        transport,
-        ContextData(),
-        oid_type,
-        lookupMib=False,
-    )
-
-    return SnmpTupleResult(*result)
-
-def raise_snmp_error(errInd: Any, errStat: Any, REQUESTED_OID: str) -> None:
-    if errInd:
-            raise SnmpEngineError(str(errInd))
-    if errStat:
-            raise SnmpPduError(f"{errStat.prettyPrint()} at {REQUESTED_OID}")    
-    
 async def main() -> None:
 
     print(f"user/pass for {TARGET_IP}:")
@@ -115,8 +76,7 @@ async def main() -> None:
     password = getpass.getpass("Password: ")
     secret = getpass.getpass("Enable secret (blank if none): ").strip()
 
-    transport = await UdpTransportTarget.create((TARGET_IP, 161), timeout=2, retries=1)
-    eng = SnmpEngine()
+    client = SnmpClient(CREDS, timeout=2, retries=1)   # one engine + transport for every poll
 
     iterations: int = 4 * 60 * 2
     threshold: int = 2
@@ -124,21 +84,17 @@ async def main() -> None:
     try:
             for _ in range(iterations):
 
-                errInd, errStat, errIdx, varBinds = await snmp_get_cpu(REQUESTED_OID, transport, eng)
+                res = await client.get(TARGET_IP, [REQUESTED_OID])
                 try:
-                    raise_snmp_error(errInd, errStat, REQUESTED_OID)
-                except (SnmpEngineError, SnmpPduError) as e:
+                    raise_snmp_error(res, [REQUESTED_OID])
+                except SnmpEngineError as e:
                     print("SNMP failed:", e)
+                except SnmpPduError as e:
+                    print("SNMP failed:", e, "at", e.bad_oid)
                 else:
-                    for response_oid, val in varBinds:
-                        text = val.prettyPrint()
-                        if text.startswith("No Such Instance") or text.startswith("No Such Object"):
-                            text = None
-                        if text in (None, "None"):
-                            continue
-                        try:
-                            value_cpu = int(text)
-                        except ValueError:
+                    for response_oid, val in res.varBinds:
+                        value_cpu = decode_int(val)   # None for noSuch*/non-numeric
+                        if value_cpu is None:
                             continue
                         if value_cpu >= threshold:
                             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -0,0 +1,270 @@
+#Shared_async_SNMPv3_client
+
+'''
+
+One client for the SNMP examples of this folder (ex01-ex05, ex07-ex10).
+
+- one SnmpEngine for the client's lifetime (not one per request)
+- one UsmUserData per client, one UdpTransportTarget per (ip, port)
+- Semaphore limit on PDUs in flight, shared by every call
+- typed results: VarBind(oid, value) with .text / .number / .missing
+
+client = SnmpClient(SnmpCredentials("SNMPUser1", "AUTHPass1", "PRIVPass1", auth_protocol="MD5"))
+
+res = await client.get(ip, oids)             -> SnmpTupleResult (one PDU, raw)
+raise_snmp_error(res, oids)                  -> SnmpEngineError / SnmpPduError
+vals = await client.get_values(ip, oids)     -> {oid: VarBind}, raises
+many = await client.get_many(ips, oids)      -> {ip: {oid: VarBind} | Exception}
+rows = await client.bulk_walk(ip, columns)   -> {index: {column: VarBind}}  (GETBULK)
+                                                raises SnmpWalkTooLong (.rows = partial) past MAX_BULK_PDUS
+
+'''
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+from typing import Any, NamedTuple, Sequence, Tuple
+
+from pysnmp.hlapi.v3arch.asyncio import (
+    SnmpEngine,
+    UsmUserData,
+    UdpTransportTarget,
+    ContextData,
+    ObjectType,
+    ObjectIdentity,
+    get_cmd,
+    bulk_cmd,
+    USM_AUTH_HMAC96_MD5,
+    USM_AUTH_HMAC96_SHA,
+    USM_AUTH_HMAC192_SHA256,
+    USM_PRIV_CBC56_DES,
+    USM_PRIV_CFB128_AES,
+    USM_PRIV_CFB256_AES,
+)
+from snmp_values import decode_number, decode_text, is_exception, oid_tuple
+
+AUTH_PROTOCOLS = {
+    "MD5": USM_AUTH_HMAC96_MD5,
+    "SHA": USM_AUTH_HMAC96_SHA,
+    "SHA256": USM_AUTH_HMAC192_SHA256,
+}
+PRIV_PROTOCOLS = {
+    "DES": USM_PRIV_CBC56_DES,
+    "AES": USM_PRIV_CFB128_AES,
+    "AES256": USM_PRIV_CFB256_AES,
+}
+
+SNMP_ERR_TOO_BIG = 1
+MAX_BULK_PDUS = 256   # guard against agents that never end a column
+
+
+class SnmpTupleResult(NamedTuple):
+    errInd: Any
+    errStat: Any
+    errIdx: int
+    varBinds: Sequence[Tuple[Any, Any]]
+
+class SnmpEngineError(RuntimeError): ...
+class SnmpPduError(RuntimeError):
+    def __init__(self, message: str, bad_oid: str | None = None, index: int = 0):
+        super().__init__(message)
+        self.bad_oid = bad_oid
+        self.index = index      # errIdx, 1-based (0 => not given)
+class SnmpWalkTooLong(RuntimeError):
+    def __init__(self, message: str, rows: dict[str, dict[str, "VarBind"]]):
+        super().__init__(message)
+        self.rows = rows        # what was walked before giving up (a truncated table)
+
+class VarBind(NamedTuple):
+    oid: str
+    value: Any          # pysnmp value object
+
+    @property
+    def missing(self) -> bool:
+        return is_exception(self.value)     # noSuchObject / noSuchInstance / endOfMibView
+
+    @property
+    def text(self) -> str | None:
+        return decode_text(self.value)
+
+    @property
+    def number(self) -> int | float | None:
+        return decode_number(self.value)
+
+
+def oid_str(oid: Any) -> str:
+    return ".".join(map(str, oid_tuple(oid)))
+
+def raise_snmp_error(res: SnmpTupleResult, oids: Sequence[str] | None = None) -> None:
+    if res.errInd:
+        raise SnmpEngineError(str(res.errInd))
+    if res.errStat:
+        idx = int(res.errIdx)
+        bad_oid = "?"
+        if oids is not None and 0 < idx <= len(oids):
+            bad_oid = oids[idx - 1]
+        elif 0 < idx <= len(res.varBinds):
+            bad_oid = oid_str(res.varBinds[idx - 1][0])
+        raise SnmpPduError(res.errStat.prettyPrint(), bad_oid=bad_oid, index=idx)
+
+
+@dataclass(frozen=True)
+class SnmpCredentials:
+    user: str
+    auth_key: str
+    priv_key: str
+    auth_protocol: str = "SHA"
+    priv_protocol: str = "AES"
+
+    def usm(self) -> UsmUserData:
+        return UsmUserData(
+            userName=self.user,
+            authKey=self.auth_key,
+            privKey=self.priv_key,
+            authProtocol=AUTH_PROTOCOLS[self.auth_protocol.upper()],
+            privProtocol=PRIV_PROTOCOLS[self.priv_protocol.upper()],
+        )
+
+
+class SnmpClient:
+
+    def __init__(
+            self,
+            creds: SnmpCredentials,
+            port: int = 161,
+            timeout: float = 2.0,
+            retries: int = 1,
+            limit: int = 50,
+            max_oids_per_pdu: int = 20,
+        ) -> None:
+        self.engine = SnmpEngine()
+        self.auth = creds.usm()
+        self.port = port
+        self.timeout = timeout
+        self.retries = retries
+        self.max_oids_per_pdu = max_oids_per_pdu
+        self._sem = asyncio.Semaphore(limit)
+        self._transports: dict[tuple[str, int], UdpTransportTarget] = {}
+        self.requests = 0       # PDUs sent, for round-trip accounting
+
+    async def __aenter__(self) -> "SnmpClient":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.engine.close_dispatcher()
+
+    async def transport(self, ip: str, port: int | None = None) -> UdpTransportTarget:
+        key = (ip, port or self.port)
+        target = self._transports.get(key)
+        if target is None:
+            target = await UdpTransportTarget.create(key, timeout=self.timeout, retries=self.retries)
+            self._transports[key] = target
+        return target
+
+    async def get(self, ip: str, oids: Sequence[str], port: int | None = None) -> SnmpTupleResult:
+        """One GET PDU for all `oids`, errors left in the result."""
+        transport = await self.transport(ip, port)
+        async with self._sem:
+            self.requests += 1
+            result = await get_cmd(
+                self.engine,
+                self.auth,
+                transport,
+                ContextData(),
+                *[ObjectType(ObjectIdentity(oid)) for oid in oids],
+                lookupMib=False,
+            )
+        return SnmpTupleResult(*result)
+
+    async def get_values(self, ip: str, oids: Sequence[str], port: int | None = None) -> dict[str, VarBind]:
+        """GET in PDUs of max_oids_per_pdu; {requested oid: VarBind}, raises on any error."""
+        out: dict[str, VarBind] = {}
+        for i in range(0, len(oids), self.max_oids_per_pdu):
+            chunk = list(oids[i:i + self.max_oids_per_pdu])
+            res = await self.get(ip, chunk, port)
+            raise_snmp_error(res, chunk)
+            for oid, (resp_oid, val) in zip(chunk, res.varBinds):
+                out[oid] = VarBind(oid_str(resp_oid), val)
+        return out
+
+    async def get_many(
+            self,
+            ips: Sequence[str],
+            oids: Sequence[str],
+        ) -> dict[str, dict[str, VarBind] | Exception]:
+        """get_values() for every ip concurrently (bounded by the client limit)."""
+
+        async def one(ip: str) -> tuple[str, dict[str, VarBind] | Exception]:
+            try:
+                return ip, await self.get_values(ip, oids)
+            except Exception as e:
+                return ip, e
+
+        pairs = await asyncio.gather(*(one(ip) for ip in ips))
+        return dict(pairs)
+
+    async def bulk_walk(
+            self,
+            ip: str,
+            columns: Sequence[str],
+            max_repetitions: int = 25,
+            port: int | None = None,
+        ) -> dict[str, dict[str, VarBind]]:
+        """
+        Walk table columns with GETBULK, all columns in the same PDUs.
+        returns: {index: {column oid: VarBind}}, index = OID suffix after the column
+        raises SnmpWalkTooLong when the columns have not ended after
+        MAX_BULK_PDUS PDUs (the poller's walk_table reports walkTooLong)
+        """
+        transport = await self.transport(ip, port)
+        prefixes = {c: tuple(int(x) for x in c.strip(".").split(".")) for c in columns}
+        last = dict(prefixes)
+        active = list(columns)
+        rows: dict[str, dict[str, VarBind]] = {}
+        reps = max_repetitions
+
+        for _ in range(MAX_BULK_PDUS):
+            if not active:
+                return rows
+            async with self._sem:
+                self.requests += 1
+                res = SnmpTupleResult(*await bulk_cmd(
+                    self.engine,
+                    self.auth,
+                    transport,
+                    ContextData(),
+                    0, reps,
+                    *[ObjectType(ObjectIdentity(".".join(map(str, last[c])))) for c in active],
+                    lookupMib=False,
+                ))
+            if res.errStat and int(res.errStat) == SNMP_ERR_TOO_BIG and reps > 1:
+                reps //= 2
+                continue
+            raise_snmp_error(res, active)
+            if not res.varBinds:
+                return rows
+
+            ended: set[str] = set()
+            for i, (resp_oid, val) in enumerate(res.varBinds):
+                column = active[i % len(active)]
+                if column in ended:
+                    continue
+                prefix = prefixes[column]
+                o = oid_tuple(resp_oid)
+                if is_exception(val) or o[:len(prefix)] != prefix or o <= last[column]:
+                    ended.add(column)
+                    continue
+                last[column] = o
+                index = ".".join(map(str, o[len(prefix):]))
+                rows.setdefault(index, {})[column] = VarBind(".".join(map(str, o)), val)
+            active = [c for c in active if c not in ended]
+
+        if not active:
+            return rows
+        raise SnmpWalkTooLong(
+            f"{ip}: {len(active)} column(s) still open after {MAX_BULK_PDUS} GETBULK PDUs",
+            rows,
+        )
@@ -110,6 +110,11 @@ def build_ctx(run_id: str, config_path: str, vault_path: str) -> RunContext:
         netbox["token"] = token
         netbox.setdefault("verify_ssl", True)
         netbox.setdefault("timeout", 20)
+        netbox.setdefault("page_workers", 4)
+        netbox.setdefault("writeback_chunk_size", 100)
+        netbox.setdefault("writeback_retries", 2)
+        netbox.setdefault("writeback_queue_size", 1000)
+        netbox.setdefault("cache_ttl_sec", 0)
 
     return RunContext(
         run_id=run_id,
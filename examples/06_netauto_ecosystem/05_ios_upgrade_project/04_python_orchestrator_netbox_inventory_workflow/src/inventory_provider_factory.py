@@ -1,6 +1,8 @@
 
 from __future__ import annotations
 
+from pathlib import Path
+
 from src.netbox_client import NetBoxClient, NetBoxClientConfig
 from src.netbox_inventory_provider import (
     NetBoxInventoryProvider,
@@ -35,6 +37,9 @@ def build_inventory_provider(ctx):
       ctx.netbox.token
       ctx.netbox.verify_ssl (optional)
       ctx.netbox.timeout (optional)
+      ctx.netbox.page_workers (optional)
+      ctx.netbox.cache_ttl_sec (optional, default 0 = no inventory cache)
+      ctx.artifacts (inventory cache lives in <artifacts>/.netbox_cache)
       ctx.inventory.site
       ctx.inventory.status (optional)
       ctx.inventory.default_port (optional)
@@ -60,13 +65,17 @@ def build_inventory_provider(ctx):
             token=ctx.netbox["token"],
             verify_ssl=ctx.netbox.get("verify_ssl", True),
             timeout=ctx.netbox.get("timeout", 20),
+            page_workers=ctx.netbox.get("page_workers", 4),
         )
         client = NetBoxClient(client_cfg)
 
+        cache_ttl_sec = int(ctx.netbox.get("cache_ttl_sec", 0))
         provider_cfg = NetBoxInventoryProviderConfig(
             site=ctx.inventory["site"],
             status=ctx.inventory.get("status", "active"),
             default_port=ctx.inventory.get("default_port", 22),
+            cache_dir=str(Path(ctx.artifacts) / ".netbox_cache") if cache_ttl_sec > 0 else None,
+            cache_ttl_sec=cache_ttl_sec,
         )
         return NetBoxInventoryProvider(client=client, config=provider_cfg)
 
@@ -1,14 +1,32 @@
 
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, urlsplit
 
 import requests
+from requests.adapters import HTTPAdapter
 
 
 class NetBoxAPIError(RuntimeError):
-    """Raised when a NetBox API request fails."""
+    """
+    Raised when a NetBox API request fails.
+
+    status_code: HTTP status NetBox answered with (None without an answer)
+    transient: worth retrying (connection error/timeout, 429, 5xx)
+    """
+
+    def __init__(
+        self,
+        message: str,
+        status_code: Optional[int] = None,
+        transient: bool = False,
+    ) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+        self.transient = transient
 
 
 @dataclass(frozen=True)
@@ -17,6 +35,7 @@ class NetBoxClientConfig:
     token: str
     verify_ssl: bool = True
     timeout: int = 20
+    page_workers: int = 4
 
 
 class NetBoxClient:
@@ -27,10 +46,11 @@ class NetBoxClient:
     - build a stable api_root from base_url
     - use NetBox v2 token authentication
     - keep a shared requests session
+    - read list endpoints page by page (concurrently when the count is known)
     - send requests and parse JSON
     - fail fast on HTTP/API errors
-    - provide minimal device read methods
-    - provide minimal device custom-field write-back methods
+    - provide minimal device and IP address read methods
+    - provide minimal device custom-field write-back methods (single and bulk)
 
     Non-goals:
     - business filtering
@@ -67,6 +87,12 @@ class NetBoxClient:
         )
         self.session.verify = config.verify_ssl
 
+        # One pooled connection per page worker on the shared session.
+        pool_size = max(1, config.page_workers)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
     def _build_url(self, path: str) -> str:
         normalized = path.strip()
         if not normalized.startswith("/"):
@@ -80,7 +106,7 @@ class NetBoxClient:
         path: Optional[str] = None,
         url: Optional[str] = None,
         params: Optional[Dict[str, Any]] = None,
-        json_body: Optional[Dict[str, Any]] = None,
+        json_body: Optional[Any] = None,
     ) -> Any:
         """
         Execute one HTTP request.
@@ -104,14 +130,17 @@ class NetBoxClient:
             )
         except requests.RequestException as exc:
             raise NetBoxAPIError(
-                f"NetBox request failed: {method} {target_url}: {exc}"
+                f"NetBox request failed: {method} {target_url}: {exc}",
+                transient=True,
             ) from exc
 
         if not response.ok:
             body_preview = response.text[:500]
             raise NetBoxAPIError(
                 f"NetBox returned {response.status_code} for {method} {target_url}: "
-                f"{body_preview}"
+                f"{body_preview}",
+                status_code=response.status_code,
+                transient=response.status_code == 429 or response.status_code >= 500,
             )
 
         if response.status_code == 204:
@@ -121,9 +150,30 @@ class NetBoxClient:
             return response.json()
         except ValueError as exc:
             raise NetBoxAPIError(
-                f"NetBox returned non-JSON content for {method} {target_url}"
+                f"NetBox returned non-JSON content for {method} {target_url}",
+                status_code=response.status_code,
             ) from exc
 
+    @staticmethod
+    def _check_page(page: Any, what: str) -> Dict[str, Any]:
+        if not isinstance(page, dict) or "results" not in page:
+            raise NetBoxAPIError(f"Unexpected paginated response shape for {what}")
+        return page
+
+    @staticmethod
+    def _next_window(next_url: str) -> Optional[Tuple[int, int]]:
+        """
+        (offset, limit) of a NetBox `next` link, None if it has no usable
+        offset/limit pair (e.g. cursor-style pagination).
+        """
+        query = parse_qs(urlsplit(next_url).query)
+        try:
+            offset = int(query["offset"][0])
+            limit = int(query["limit"][0])
+        except (KeyError, IndexError, ValueError):
+            return None
+        return (offset, limit) if limit > 0 else None
+
     def _get_paginated(
         self,
         path: str,
@@ -132,23 +182,49 @@ class NetBoxClient:
     ) -> List[Dict[str, Any]]:
         """
         Read all pages from a paginated NetBox list endpoint.
-        """
-        first_page = self._request("GET", path=path, params=params)
 
-        if not isinstance(first_page, dict) or "results" not in first_page:
-            raise NetBoxAPIError(f"Unexpected paginated response shape for GET {path}")
+        The first page gives `count` and, through its `next` link, the next
+        offset and the page limit; the remaining offset/limit windows are
+        then fetched concurrently on the shared session (config.page_workers
+        threads) and joined in offset order.
+        Without a usable `count` (or with page_workers <= 1) the `next`
+        links are followed one page at a time.
+        """
+        first_page = self._check_page(
+            self._request("GET", path=path, params=params), f"GET {path}"
+        )
 
         results: List[Dict[str, Any]] = list(first_page.get("results", []))
         next_url = first_page.get("next")
-
-        while next_url:
-            page = self._request("GET", url=next_url)
-
-            if not isinstance(page, dict) or "results" not in page:
-                raise NetBoxAPIError(
-                    f"Unexpected paginated response shape for {next_url}"
+        if not next_url:
+            return results
+
+        count = first_page.get("count")
+        window = self._next_window(next_url)
+
+        if isinstance(count, int) and window and self.config.page_workers > 1:
+            start, limit = window
+            offsets = range(start, count, limit)
+            if not offsets:
+                return results
+
+            def fetch(offset: int) -> List[Dict[str, Any]]:
+                page_params = dict(params or {}, limit=limit, offset=offset)
+                page = self._check_page(
+                    self._request("GET", path=path, params=page_params),
+                    f"GET {path} offset={offset}",
                 )
+                return list(page.get("results", []))
 
+            workers = min(self.config.page_workers, len(offsets))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                # map() yields in submission (offset) order
+                for page_results in pool.map(fetch, offsets):
+                    results.extend(page_results)
+            return results
+
+        while next_url:
+            page = self._check_page(self._request("GET", url=next_url), next_url)
             results.extend(page.get("results", []))
             next_url = page.get("next")
 
@@ -160,10 +236,28 @@ class NetBoxClient:
         site: Optional[str] = None,
         status: Optional[str] = "active",
         name: Optional[str] = None,
+        ids: Optional[Sequence[int]] = None,
+        fields: Optional[Sequence[str]] = None,
+        changed_since: Optional[str] = None,
     ) -> List[Dict[str, Any]]:
         """
         Read devices from NetBox with basic server-side filters.
 
+        `ids` limits the result to those device IDs (?id=1&id=2...).
+
+        `changed_since` (ISO-8601, as NetBox renders last_updated) limits the
+        result to devices with last_updated at or after that time.
+
+        `fields` asks NetBox (4.0+) to return only those top-level fields;
+        nested objects then come back in their brief form and config
+        context / tags / counters are not rendered at all. Older NetBox
+        versions ignore the parameter and return full objects.
+
+        Pages are still decoded whole with response.json(): requests has no
+        streaming JSON parser and adding one (ijson) is not worth a new
+        dependency for 50-1000 devices per page, so `fields` shrinks what
+        gets decoded instead.
+
         Returns:
             A list of NetBox-shaped device objects.
 
@@ -192,9 +286,62 @@ class NetBoxClient:
             params["status"] = status
         if name:
             params["name"] = name
+        if ids:
+            params["id"] = list(ids)
+        if fields:
+            params["fields"] = ",".join(fields)
+        if changed_since:
+            params["last_updated__gte"] = changed_since
 
         return self._get_paginated(self.DEVICES_PATH, params=params)
 
+    def list_ip_addresses(
+        self,
+        *,
+        fields: Optional[Sequence[str]] = None,
+        changed_since: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Read IP address objects, optionally only those with last_updated at
+        or after `changed_since`.
+
+        Editing an IP address does not touch the devices using it as
+        primary IP, so device last_updated alone misses those changes.
+        """
+        params: Dict[str, Any] = {}
+
+        if fields:
+            params["fields"] = ",".join(fields)
+        if changed_since:
+            params["last_updated__gte"] = changed_since
+
+        return self._get_paginated(self.IP_ADDRESSES_PATH, params=params)
+
+    def count_devices(
+        self,
+        *,
+        site: Optional[str] = None,
+        status: Optional[str] = "active",
+    ) -> int:
+        """
+        Number of devices matching the filters, from a one-row page.
+        """
+        params: Dict[str, Any] = {"limit": 1, "fields": "id"}
+
+        if site:
+            params["site"] = site
+        if status:
+            params["status"] = status
+
+        page = self._check_page(
+            self._request("GET", path=self.DEVICES_PATH, params=params),
+            f"GET {self.DEVICES_PATH}",
+        )
+        count = page.get("count")
+        if not isinstance(count, int):
+            raise NetBoxAPIError(f"Missing count in response for GET {self.DEVICES_PATH}")
+        return count
+
     def patch_device_custom_fields(
         self,
         device_id: int,
@@ -224,44 +371,37 @@ class NetBoxClient:
 
         return result
 
-    def write_precheck_status(self, device_id: int, status: str) -> Dict[str, Any]:
-        """
-        Write back precheck_status for one device.
-
-        Note:
-            Allowed values are enforced outside the client.
-        """
-        return self.patch_device_custom_fields(
-            device_id=device_id,
-            custom_fields={"precheck_status": status},
-        )
-
-    def write_backup_metadata(
+    def bulk_patch_device_custom_fields(
         self,
-        device_id: int,
-        backup_path: str,
-        backup_timestamp: str,
-    ) -> Dict[str, Any]:
-        """
-        Write back backup metadata for one device.
+        updates: Dict[int, Dict[str, Any]],
+    ) -> List[Dict[str, Any]]:
         """
-        return self.patch_device_custom_fields(
-            device_id=device_id,
-            custom_fields={
-                "backup_path": backup_path,
-                "backup_timestamp": backup_timestamp,
-            },
-        )
+        Patch custom_fields on many devices with one bulk PATCH against the
+        device list endpoint.
 
-    def write_stage2_result(self, device_id: int, stage2_result: str) -> Dict[str, Any]:
+        NetBox applies a bulk update in one transaction: if any device in
+        `updates` is rejected, none of them is changed.
         """
-        Write back final Stage 2 result for one device.
-        Allowed values are enforced outside the client.
-        """
-        return self.patch_device_custom_fields(
-            device_id=device_id,
-            custom_fields={"stage2_result": stage2_result},
-        )
+        if not updates:
+            raise ValueError("updates must not be empty")
+        for device_id, custom_fields in updates.items():
+            if not isinstance(device_id, int):
+                raise ValueError("device_id must be an integer")
+            if not custom_fields:
+                raise ValueError(f"custom_fields must not be empty (device_id={device_id})")
+
+        payload = [
+            {"id": device_id, "custom_fields": custom_fields}
+            for device_id, custom_fields in updates.items()
+        ]
+        result = self._request("PATCH", path=self.DEVICES_PATH, json_body=payload)
+
+        if not isinstance(result, list):
+            raise NetBoxAPIError(
+                f"Unexpected bulk PATCH response shape for {len(payload)} device(s)"
+            )
+
+        return result
 
     def __enter__(self) -> "NetBoxClient":
         return self
@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from src.netbox_client import NetBoxClient
+
+
+def _newest(objects: Iterable[Dict[str, Any]]) -> Optional[str]:
+    """Latest last_updated among `objects` (ISO-8601 strings sort by time)."""
+    stamps = [o["last_updated"] for o in objects if o.get("last_updated")]
+    return max(stamps) if stamps else None
+
+
+class NetBoxInventoryCache:
+    """
+    On-disk cache of one site's NetBox device list, keyed by
+    (base_url, site, status).
+
+    Responsibilities:
+    - serve raw device objects without re-downloading the whole site
+    - full listing when there is no cache file or it is older than ttl_sec
+    - otherwise incremental refresh: fetch only devices whose last_updated
+      is at or after the newest last_updated seen so far (on any site), and
+      merge them
+    - re-fetch cached devices whose primary IPv4 object changed since the
+      last refresh (editing an IP does not touch the device)
+    - drop devices that moved to another site/status
+    - fall back to a full listing when the site's device count no longer
+      matches the cache (deletions do not show up as changes)
+
+    The watermarks are NetBox's own last_updated values, so the
+    orchestrator's clock never matters.
+
+    Other related objects (platform, device type, ...) can be renamed
+    without touching the device either; those changes only show up at the
+    next full listing, i.e. up to ttl_sec late.
+
+    Non-goals:
+    - business filtering (the provider selects upgrade candidates)
+    - sharing one cache file between concurrent runs
+    """
+
+    # Fields the cache needs on top of what the provider reads.
+    SYNC_FIELDS = ("last_updated", "site", "status", "primary_ip4")
+    IP_FIELDS = ("id", "last_updated")
+    # device IDs per re-fetch request (each one is an ?id= in the URL)
+    REFETCH_CHUNK = 100
+    FORMAT_VERSION = 2
+
+    def __init__(
+        self,
+        client: NetBoxClient,
+        *,
+        cache_dir: str,
+        site: str,
+        status: Optional[str],
+        fields: Sequence[str],
+        ttl_sec: int = 3600,
+    ) -> None:
+        self.client = client
+        self.site = site
+        self.status = status
+        self.ttl_sec = ttl_sec
+        self.fields = tuple(dict.fromkeys([*fields, "id", *self.SYNC_FIELDS]))
+
+        key = "|".join([client.api_root, site, status or ""])
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+        self.path = Path(cache_dir).expanduser().resolve() / f"devices_{digest}.json"
+
+        # how the last devices() call was served: "full" | "incremental"
+        self.last_refresh: Optional[str] = None
+
+    def devices(self) -> List[Dict[str, Any]]:
+        """Current device list for (site, status), refreshed as cheaply as possible."""
+        cached = self._load()
+
+        by_id: Optional[Dict[int, Dict[str, Any]]] = None
+        if cached is not None and time.time() - cached["full_synced_at"] <= self.ttl_sec:
+            by_id, watermark, ip_watermark = self._incremental(
+                cached["devices"], cached["watermark"], cached["ip_watermark"]
+            )
+            full_synced_at = cached["full_synced_at"]
+            self.last_refresh = "incremental"
+
+        if by_id is None:
+            by_id = self._full_listing()
+            watermark = _newest(by_id.values())
+            ip_watermark = None
+            full_synced_at = time.time()
+            self.last_refresh = "full"
+
+        self._save(by_id, full_synced_at, watermark, ip_watermark)
+        return sorted(by_id.values(), key=lambda d: d["id"])
+
+    def _full_listing(self) -> Dict[int, Dict[str, Any]]:
+        devices = self.client.list_devices(
+            site=self.site,
+            status=self.status,
+            fields=self.fields,
+        )
+        return {d["id"]: d for d in devices if isinstance(d.get("id"), int)}
+
+    def _incremental(
+        self,
+        cached: Dict[int, Dict[str, Any]],
+        watermark: Optional[str],
+        ip_watermark: Optional[str],
+    ) -> Tuple[Optional[Dict[int, Dict[str, Any]]], Optional[str], Optional[str]]:
+        """
+        (merged device map, new device watermark, new IP watermark); the map
+        is None when a full listing is needed.
+
+        The device watermark covers every device the queries returned, in
+        scope or not: changes on other sites would otherwise match
+        last_updated__gte again on every refresh of a quiet site.
+        """
+        if not watermark:
+            return None, None, None
+
+        by_id = dict(cached)
+        # No site/status filter: a device that left the site or status must
+        # show up here so it can be dropped.
+        changed = self.client.list_devices(
+            status=None,
+            changed_since=watermark,
+            fields=self.fields,
+        )
+        self._merge(by_id, changed)
+        seen = list(changed)
+
+        # Right after a full listing there is no IP watermark yet; the device
+        # watermark predates that listing, so starting there misses nothing.
+        changed_ips = self.client.list_ip_addresses(
+            changed_since=ip_watermark or watermark,
+            fields=self.IP_FIELDS,
+        )
+        ip_ids = {ip.get("id") for ip in changed_ips}
+        stale = [
+            device_id for device_id, device in by_id.items()
+            if (device.get("primary_ip4") or {}).get("id") in ip_ids
+        ]
+        for start in range(0, len(stale), self.REFETCH_CHUNK):
+            refetched = self.client.list_devices(
+                status=None,
+                ids=stale[start:start + self.REFETCH_CHUNK],
+                fields=self.fields,
+            )
+            self._merge(by_id, refetched)
+            seen.extend(refetched)
+
+        count = self.client.count_devices(site=self.site, status=self.status)
+        if count != len(by_id):
+            return None, None, None
+        return (
+            by_id,
+            _newest([*seen, {"last_updated": watermark}]),
+            _newest([*changed_ips, {"last_updated": ip_watermark}]),
+        )
+
+    def _merge(self, by_id: Dict[int, Dict[str, Any]], devices: List[Dict[str, Any]]) -> None:
+        for device in devices:
+            device_id = device.get("id")
+            if not isinstance(device_id, int):
+                continue
+            if self._in_scope(device):
+                by_id[device_id] = device
+            else:
+                by_id.pop(device_id, None)
+
+    def _in_scope(self, device: Dict[str, Any]) -> bool:
+        site = device.get("site") or {}
+        status = device.get("status") or {}
+        if site.get("slug") != self.site:
+            return False
+        return not self.status or status.get("value") == self.status
+
+    def _load(self) -> Optional[Dict[str, Any]]:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+        if not isinstance(data, dict) or data.get("version") != self.FORMAT_VERSION:
+            return None
+        if data.get("fields") != list(self.fields):
+            return None
+
+        devices = {d["id"]: d for d in data.get("devices", []) if isinstance(d.get("id"), int)}
+        return {
+            "full_synced_at": float(data.get("full_synced_at", 0)),
+            "watermark": data.get("watermark"),
+            "ip_watermark": data.get("ip_watermark"),
+            "devices": devices,
+        }
+
+    def _save(
+        self,
+        by_id: Dict[int, Dict[str, Any]],
+        full_synced_at: float,
+        watermark: Optional[str],
+        ip_watermark: Optional[str],
+    ) -> None:
+        data = {
+            "version": self.FORMAT_VERSION,
+            "api_root": self.client.api_root,
+            "site": self.site,
+            "status": self.status,
+            "fields": list(self.fields),
+            "full_synced_at": full_synced_at,
+            "watermark": watermark,
+            "ip_watermark": ip_watermark,
+            "devices": sorted(by_id.values(), key=lambda d: d["id"]),
+        }
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data), encoding="utf-8")
+        os.replace(tmp, self.path)
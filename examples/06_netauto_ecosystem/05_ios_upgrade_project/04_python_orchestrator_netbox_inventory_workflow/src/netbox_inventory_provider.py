@@ -2,9 +2,10 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 from src.netbox_client import NetBoxClient
+from src.netbox_inventory_cache import NetBoxInventoryCache
 
 
 class NetBoxInventoryError(RuntimeError):
@@ -16,6 +17,8 @@ class NetBoxInventoryProviderConfig:
     site: str
     status: str = "active"
     default_port: int = 22
+    cache_dir: Optional[str] = None     # None => always list the site from NetBox
+    cache_ttl_sec: int = 3600
 
 
 class NetBoxInventoryProvider:
@@ -23,7 +26,8 @@ class NetBoxInventoryProvider:
     Build orchestrator-ready inventory from NetBox device objects.
 
     Responsibilities:
-    - read devices through netbox_client
+    - read devices through netbox_client (only DEVICE_FIELDS are requested),
+      or through the on-disk inventory cache when cache_dir is set
     - enforce upgrade_candidate=true
     - validate required fields for selected devices
     - strip CIDR from primary_ip4.address
@@ -42,6 +46,16 @@ class NetBoxInventoryProvider:
             }
     """
 
+    # Everything the selection, validation, id-map and normalization below read.
+    DEVICE_FIELDS = (
+        "id",
+        "name",
+        "platform",
+        "device_type",
+        "primary_ip4",
+        "custom_fields",
+    )
+
     def __init__(
         self,
         client: NetBoxClient,
@@ -51,11 +65,19 @@ class NetBoxInventoryProvider:
         self.config = config
         self._name_to_device_id: Dict[str, int] = {}
 
+        self.cache: Optional[NetBoxInventoryCache] = None
+        if config.cache_dir:
+            self.cache = NetBoxInventoryCache(
+                client,
+                cache_dir=config.cache_dir,
+                site=config.site,
+                status=config.status,
+                fields=self.DEVICE_FIELDS,
+                ttl_sec=config.cache_ttl_sec,
+            )
+
     def load_devices(self) -> List[Dict[str, Any]]:
-        raw_devices = self.client.list_devices(
-            site=self.config.site,
-            status=self.config.status,
-        )
+        raw_devices = self._read_devices()
 
         self._build_name_to_id_map(raw_devices)
 
@@ -71,6 +93,25 @@ class NetBoxInventoryProvider:
 
         return normalized
 
+    def load_device_ids(self) -> Dict[str, int]:
+        """
+        Populate only the name -> device_id map (Stage 2 write-back).
+
+        With the cache this is at most an incremental refresh; without it
+        only id and name are requested.
+        """
+        if self.cache is not None:
+            raw_devices = self.cache.devices()
+        else:
+            raw_devices = self.client.list_devices(
+                site=self.config.site,
+                status=self.config.status,
+                fields=("id", "name"),
+            )
+
+        self._build_name_to_id_map(raw_devices)
+        return dict(self._name_to_device_id)
+
     def get_device_id_by_name(self, name: str) -> int | None:
         return self._name_to_device_id.get(name)
     
@@ -78,6 +119,15 @@ class NetBoxInventoryProvider:
         """Delegate cleanup to the underlying NetBoxClient."""
         self.client.close()
 
+    def _read_devices(self) -> List[Dict[str, Any]]:
+        if self.cache is not None:
+            return self.cache.devices()
+        return self.client.list_devices(
+            site=self.config.site,
+            status=self.config.status,
+            fields=self.DEVICE_FIELDS,
+        )
+
     def _build_name_to_id_map(self, raw_devices: List[Dict[str, Any]]) -> None:
         mapping: Dict[str, int] = {}
 
@@ -0,0 +1,311 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.netbox_client import NetBoxAPIError, NetBoxClient
+
+
+def _is_transient(exc: Exception) -> bool:
+    return isinstance(exc, NetBoxAPIError) and exc.transient
+
+
+class NetBoxWriteback:
+    """
+    Accumulate device custom-field write-back and flush it in bulk.
+
+    Responsibilities:
+    - merge every pending custom-field change per device_id
+    - flush pending changes as chunked bulk PATCHes on /dcim/devices/
+    - retry transient failures (no answer, 429, 5xx) with backoff
+    - isolate failures: a rejected chunk is retried device by device
+    - stop at the first transient failure that outlives its retries (NetBox
+      down): the rest is reported failed without further requests
+    - record per-device failures as warnings on the owning record
+
+    Warnings keep the per-field-group names used before bulk write-back,
+    e.g. netbox_writeback_precheck_failed:<error>.
+
+    Non-goals:
+    - deciding what to write (orchestrators do that)
+    - thread safety (WritebackQueue owns one from a single thread)
+    """
+
+    DEFAULT_CHUNK_SIZE = 100
+    DEFAULT_RETRIES = 2
+    DEFAULT_RETRY_BACKOFF = 1.0
+
+    def __init__(
+        self,
+        client: NetBoxClient,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        retries: int = DEFAULT_RETRIES,
+        retry_backoff: float = DEFAULT_RETRY_BACKOFF,
+    ) -> None:
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be >= 1")
+        self.client = client
+        self.chunk_size = chunk_size
+        self.retries = max(0, retries)
+        self.retry_backoff = retry_backoff
+        self.requests = 0
+
+        self._pending: Dict[int, Dict[str, Any]] = {}
+        # device_id -> [(warnings list to report into, failure warning prefix)]
+        self._owners: Dict[int, List[Tuple[List[str], str]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(
+        self,
+        device_id: int,
+        custom_fields: Dict[str, Any],
+        *,
+        warnings: List[str],
+        failure_warning: str,
+    ) -> None:
+        """
+        Queue custom-field values for one device.
+
+        Later values for the same field replace earlier ones. If the write
+        fails, f"{failure_warning}:{error}" is appended to `warnings`.
+        """
+        if not isinstance(device_id, int):
+            raise ValueError("device_id must be an integer")
+        if not custom_fields:
+            raise ValueError("custom_fields must not be empty")
+
+        self._pending.setdefault(device_id, {}).update(custom_fields)
+        owners = self._owners.setdefault(device_id, [])
+        if not any(w is warnings and f == failure_warning for w, f in owners):
+            owners.append((warnings, failure_warning))
+
+    def flush(self) -> int:
+        """
+        Write every pending change; returns the number of devices written
+        successfully. Never raises for NetBox errors.
+        """
+        pending, owners = self._pending, self._owners
+        self._pending, self._owners = {}, {}
+
+        device_ids = list(pending)
+        written = 0
+        down: Optional[Exception] = None
+
+        for start in range(0, len(device_ids), self.chunk_size):
+            chunk = {
+                device_id: pending[device_id]
+                for device_id in device_ids[start:start + self.chunk_size]
+            }
+            if down is not None:
+                for device_id in chunk:
+                    self._report(owners, device_id, down)
+                continue
+
+            try:
+                self._call(self.client.bulk_patch_device_custom_fields, chunk)
+                written += len(chunk)
+            except Exception as exc:
+                if _is_transient(exc):
+                    # per-device PATCHes would only repeat the retries
+                    down = exc
+                    for device_id in chunk:
+                        self._report(owners, device_id, exc)
+                elif len(chunk) == 1:
+                    self._report(owners, next(iter(chunk)), exc)
+                else:
+                    # the bulk update is atomic: retry one by one to find the offender(s)
+                    chunk_written, down = self._flush_one_by_one(chunk, owners)
+                    written += chunk_written
+
+        return written
+
+    def _flush_one_by_one(
+        self,
+        chunk: Dict[int, Dict[str, Any]],
+        owners: Dict[int, List[Tuple[List[str], str]]],
+    ) -> Tuple[int, Optional[Exception]]:
+        """(devices written, transient error that stopped the pass or None)"""
+        written = 0
+        down: Optional[Exception] = None
+        for device_id, custom_fields in chunk.items():
+            if down is not None:
+                self._report(owners, device_id, down)
+                continue
+            try:
+                self._call(self.client.patch_device_custom_fields, device_id, custom_fields)
+                written += 1
+            except Exception as exc:
+                self._report(owners, device_id, exc)
+                if _is_transient(exc):
+                    down = exc
+        return written, down
+
+    def _call(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Call fn, retrying transient NetBox errors with doubling backoff."""
+        delay = self.retry_backoff
+        for attempt in range(self.retries + 1):
+            self.requests += 1
+            try:
+                return fn(*args)
+            except NetBoxAPIError as exc:
+                if not exc.transient or attempt == self.retries:
+                    raise
+            time.sleep(delay)
+            delay *= 2
+
+    @staticmethod
+    def _report(
+        owners: Dict[int, List[Tuple[List[str], str]]],
+        device_id: int,
+        exc: Exception,
+    ) -> None:
+        for warnings, failure_warning in owners.get(device_id, []):
+            warnings.append(f"{failure_warning}:{exc}")
+
+
+class WritebackQueue:
+    """
+    Background write-back: a bounded queue drained by one worker thread
+    into a NetBoxWriteback.
+
+    Responsibilities:
+    - take write-back requests without doing HTTP on the caller's thread
+      (add() only blocks while the queue is full)
+    - flush a full chunk as soon as it is pending, and whatever is pending
+      after `flush_interval` seconds without new requests
+    - flush everything on close(), then merge each request's failure
+      warnings into the caller's warnings list
+
+    Warnings are collected on the worker thread and only merged on the
+    thread calling close(), so the caller's records are never written to
+    concurrently. close() must run before the records are serialized.
+    """
+
+    DEFAULT_MAXSIZE = 1000
+    DEFAULT_FLUSH_INTERVAL = 2.0
+
+    _STOP = object()
+
+    def __init__(
+        self,
+        writeback: NetBoxWriteback,
+        maxsize: int = DEFAULT_MAXSIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+    ) -> None:
+        self.writeback = writeback
+        self.flush_interval = flush_interval
+        self.written = 0
+
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=maxsize)
+        # (caller's warnings list, warnings collected by the worker)
+        self._outcomes: List[Tuple[List[str], List[str]]] = []
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run,
+            name="netbox-writeback",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def __enter__(self) -> "WritebackQueue":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def add(
+        self,
+        device_id: int,
+        custom_fields: Dict[str, Any],
+        *,
+        warnings: List[str],
+        failure_warning: str,
+    ) -> None:
+        """Same contract as NetBoxWriteback.add(); the write happens in the background."""
+        if self._closed:
+            raise RuntimeError("WritebackQueue is closed")
+        if not isinstance(device_id, int):
+            raise ValueError("device_id must be an integer")
+        if not custom_fields:
+            raise ValueError("custom_fields must not be empty")
+
+        collected: List[str] = []
+        self._outcomes.append((warnings, collected))
+        self._queue.put((device_id, dict(custom_fields), collected, failure_warning))
+
+    def close(self) -> int:
+        """
+        Flush everything still queued or pending, stop the worker and merge
+        failure warnings; returns the number of device writes that succeeded.
+        Safe to call more than once.
+        """
+        if not self._closed:
+            self._closed = True
+            self._queue.put(self._STOP)
+            self._thread.join()
+
+            for warnings, collected in self._outcomes:
+                warnings.extend(collected)
+            self._outcomes = []
+
+        return self.written
+
+    def _run(self) -> None:
+        writeback = self.writeback
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                if len(writeback):
+                    self.written += writeback.flush()
+                continue
+
+            if item is self._STOP:
+                self.written += writeback.flush()
+                return
+
+            device_id, custom_fields, collected, failure_warning = item
+            writeback.add(
+                device_id,
+                custom_fields,
+                warnings=collected,
+                failure_warning=failure_warning,
+            )
+            if len(writeback) >= writeback.chunk_size:
+                self.written += writeback.flush()
+
+
+def build_writeback(ctx, provider) -> Optional[NetBoxWriteback]:
+    """
+    Build the run's write-back accumulator when source=netbox, else None.
+
+    Uses ctx.netbox.writeback_chunk_size and writeback_retries (optional).
+    """
+    if provider is None:
+        return None
+    if str(ctx.inventory.get("source", "")).strip().lower() != "netbox":
+        return None
+    return NetBoxWriteback(
+        provider.client,
+        chunk_size=int(ctx.netbox.get("writeback_chunk_size", NetBoxWriteback.DEFAULT_CHUNK_SIZE)),
+        retries=int(ctx.netbox.get("writeback_retries", NetBoxWriteback.DEFAULT_RETRIES)),
+    )
+
+
+def build_writeback_queue(ctx, provider) -> Optional[WritebackQueue]:
+    """
+    Start a background WritebackQueue when source=netbox, else None.
+
+    Uses ctx.netbox.writeback_queue_size (optional) as the queue bound.
+    """
+    writeback = build_writeback(ctx, provider)
+    if writeback is None:
+        return None
+    return WritebackQueue(
+        writeback,
+        maxsize=int(ctx.netbox.get("writeback_queue_size", WritebackQueue.DEFAULT_MAXSIZE)),
+    )
@@ -2,7 +2,7 @@
 from __future__ import annotations
 
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Union
 
 from .ctx import RunContext, build_ctx
 from .io_utils import load_yaml, md5_file, file_size_bytes, write_json
@@ -10,6 +10,7 @@ from .vault import extract_creds
 from .worker import stage1_device_worker
 from .runtime_factory import build_runtime
 from .inventory_provider_factory import build_inventory_provider
+from .netbox_writeback import NetBoxWriteback, WritebackQueue, build_writeback_queue
 
 
 def global_validate_image(ctx: RunContext) -> None:
@@ -50,8 +51,17 @@ def init_handoff(ctx: RunContext) -> Dict[str, Any]:
         "devices": [],
     }
 
-def _writeback_v1_best_effort(ctx: RunContext, provider, device_state: Dict[str, Any]) -> None:
-    if str(ctx.inventory.get("source", "")).strip().lower() != "netbox":
+def _writeback_v1_best_effort(
+    ctx: RunContext,
+    provider,
+    device_state: Dict[str, Any],
+    writeback: Optional[Union[NetBoxWriteback, WritebackQueue]],
+) -> None:
+    """
+    Queue Stage 1 write-back for one device on `writeback`; the caller
+    flushes or closes it. None (source is not netbox) writes nothing.
+    """
+    if writeback is None:
         return
 
     device_name = device_state.get("inventory_hostname")
@@ -67,22 +77,22 @@ def _writeback_v1_best_effort(ctx: RunContext, provider, device_state: Dict[str,
 
     precheck_status = device_state.get("precheck_status")
     if precheck_status in {"passed", "failed"}:
-        try:
-            provider.client.write_precheck_status(device_id, precheck_status)
-        except Exception as exc:
-            warnings.append(f"netbox_writeback_precheck_failed:{exc}")
+        writeback.add(
+            device_id,
+            {"precheck_status": precheck_status},
+            warnings=warnings,
+            failure_warning="netbox_writeback_precheck_failed",
+        )
 
     backup_path = device_state.get("backup_path")
     backup_timestamp = device_state.get("backup_timestamp")
     if backup_path and backup_timestamp:
-        try:
-            provider.client.write_backup_metadata(
-                device_id=device_id,
-                backup_path=backup_path,
-                backup_timestamp=backup_timestamp,
-            )
-        except Exception as exc:
-            warnings.append(f"netbox_writeback_backup_failed:{exc}")
+        writeback.add(
+            device_id,
+            {"backup_path": backup_path, "backup_timestamp": backup_timestamp},
+            warnings=warnings,
+            failure_warning="netbox_writeback_backup_failed",
+        )
 
 def run_stage1_parallel(
     *,
@@ -93,17 +103,27 @@ def run_stage1_parallel(
     max_workers: int,
     handoff: Dict[str, Any],
 ) -> None:
-    with ThreadPoolExecutor(max_workers=max_workers) as ex:
-        futures = [ex.submit(worker_fn, dev) for dev in devices]
-        for fut in as_completed(futures):
-            device_state = fut.result()
-            handoff["devices"].append(device_state)
-
-            _writeback_v1_best_effort(
-                ctx=ctx,
-                provider=provider,
-                device_state=device_state,
-            )
+    # Write-back goes to a background queue (bulk PATCHes on its own thread),
+    # so collecting results never waits on NetBox. close() flushes what is
+    # left and merges write-back warnings into the device states before the
+    # caller writes the handoff.
+    writeback = build_writeback_queue(ctx, provider)
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as ex:
+            futures = [ex.submit(worker_fn, dev) for dev in devices]
+            for fut in as_completed(futures):
+                device_state = fut.result()
+                handoff["devices"].append(device_state)
+
+                _writeback_v1_best_effort(
+                    ctx=ctx,
+                    provider=provider,
+                    device_state=device_state,
+                    writeback=writeback,
+                )
+    finally:
+        if writeback is not None:
+            writeback.close()
 
 def stage1(run_id: str, config_path: str, vault_path: str) -> str:
     """
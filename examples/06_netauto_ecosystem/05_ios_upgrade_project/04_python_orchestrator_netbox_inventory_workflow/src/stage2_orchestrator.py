@@ -4,7 +4,7 @@ from __future__ import annotations
 import json
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 from .ctx import build_ctx
 from .io_utils import load_yaml, write_json
@@ -18,6 +18,7 @@ from .stage2_worker import (
 
 from .runtime_factory import build_runtime
 from .inventory_provider_factory import build_inventory_provider
+from .netbox_writeback import NetBoxWriteback, build_writeback
 
 def prepare_stage2_dirs(ctx) -> None:
     Path(ctx.stage2_dir).mkdir(parents=True, exist_ok=True)
@@ -41,7 +42,12 @@ def load_stage1_handoff(path: str) -> Dict[str, Any]:
         raise FileNotFoundError(f"Stage1 handoff not found: {p}")
     return json.loads(p.read_text(encoding="utf-8"))
 
-def _writeback_stage2_result_best_effort(ctx, provider, result: Dict[str, Any]) -> None:
+def _writeback_stage2_result_best_effort(
+    ctx,
+    provider,
+    result: Dict[str, Any],
+    writeback: Optional[NetBoxWriteback],
+) -> None:
     """
     Write back final Stage 2 result to NetBox as best effort.
 
@@ -49,14 +55,13 @@ def _writeback_stage2_result_best_effort(ctx, provider, result: Dict[str, Any])
     - only write stage2_result = passed|failed
     - do not fail Stage 2 if NetBox write-back fails
     - attach warnings to the result record
+    - queue on `writeback` (flushed in bulk by the caller); None means
+      write-back is off (source is not netbox)
 
     Future:
     - stage2_reason can later be mirrored to NetBox journaling
     """
-    if provider is None:
-        return
-
-    if str(ctx.inventory.get("source", "")).strip().lower() != "netbox":
+    if provider is None or writeback is None:
         return
 
     device_name = result.get("inventory_hostname")
@@ -72,10 +77,12 @@ def _writeback_stage2_result_best_effort(ctx, provider, result: Dict[str, Any])
 
     final_value = "passed" if result.get("stage2_status") is True else "failed"
 
-    try:
-        provider.client.write_stage2_result(device_id, final_value)
-    except Exception as exc:
-        warnings.append(f"netbox_writeback_stage2_failed:{exc}")
+    writeback.add(
+        device_id,
+        {"stage2_result": final_value},
+        warnings=warnings,
+        failure_warning="netbox_writeback_stage2_failed",
+    )
 
 def stage2(stage1_handoff_path: str, config_path: str, vault_path: str, precheck_no_reload: bool = False) -> str:
     # ---- load stage1 handoff ----
@@ -103,8 +110,10 @@ def stage2(stage1_handoff_path: str, config_path: str, vault_path: str, precheck
         # Build provider only when source=netbox and only for id-map + write-back.
         if str(ctx.inventory.get("source", "")).strip().lower() == "netbox":
             provider = build_inventory_provider(ctx)
-            # load_devices() populates the provider's name -> device_id map
-            _ = provider.load_devices()
+            # name -> device_id map only; with the inventory cache enabled
+            # (netbox.cache_ttl_sec > 0) this is an incremental refresh
+            # instead of a full site listing
+            _ = provider.load_device_ids()
 
         # ---- runtime + cli backend ----
         cli, _ = build_runtime(ctx)
@@ -188,14 +197,18 @@ def stage2(stage1_handoff_path: str, config_path: str, vault_path: str, precheck
                 # post_worker updates res in-place, so no need to capture the result here (assign the return value to "_")
 
         # =========================
-        # Phase E: final Stage 2 write-back (best effort)
+        # Phase E: final Stage 2 write-back (best effort, bulk)
         # =========================
+        writeback = build_writeback(ctx, provider)
         for res in handoff["devices"]:
             _writeback_stage2_result_best_effort(
                 ctx=ctx,
                 provider=provider,
                 result=res,
+                writeback=writeback,
             )
+        if writeback is not None:
+            writeback.flush()
 
         # ---- write stage2 results ----
         write_json(str(ctx.stage2_results_path), handoff)
@@ -0,0 +1,77 @@
+"""
+Shared NetBox fakes for the offline tests.
+
+FakeNetBoxSession stands in for the client's requests.Session; each test
+module subclasses it with only the endpoint behaviour it needs.
+"""
+import threading
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+from src.netbox_client import NetBoxClient, NetBoxClientConfig
+
+
+BASE_URL = "https://netbox.example"
+API = f"{BASE_URL}/api"
+
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200):
+        self.payload = payload
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.text = "" if self.ok else str(payload)
+
+    def json(self):
+        return self.payload
+
+
+class FakeNetBoxSession:
+    """
+    Records every request as (method, path, query) - query string and params
+    merged, repeated keys as lists - and lets answer() build the response.
+    Safe for the client's concurrent page reads.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def request(self, method, url, params=None, json=None, timeout=None):
+        split = urlsplit(url)
+        query = {k: v[0] if len(v) == 1 else v for k, v in parse_qs(split.query).items()}
+        query.update(params or {})
+        with self._lock:
+            self.calls.append((method, split.path, query))
+        return self.answer(method, split.path, query, json)
+
+    def answer(self, method, path, query, body):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+def paginate(path, objects, query, default_limit=50, with_count=True):
+    """
+    One NetBox list page of `objects` for the offset/limit in `query`; the
+    next link keeps the other query parameters, as NetBox's does.
+    """
+    offset = int(query.get("offset", 0))
+    limit = int(query.get("limit", default_limit))
+    end = offset + limit
+    next_query = urlencode(dict(query, limit=limit, offset=end), doseq=True)
+    page = {
+        "next": f"{BASE_URL}{path}?{next_query}" if end < len(objects) else None,
+        "previous": None,
+        "results": objects[offset:end],
+    }
+    if with_count:
+        page["count"] = len(objects)
+    return page
+
+
+def make_client(session, **config):
+    """NetBoxClient for API with `session` in place of the HTTP session."""
+    client = NetBoxClient(NetBoxClientConfig(base_url=API, token="nbt_test.token", **config))
+    client.session = session
+    return client
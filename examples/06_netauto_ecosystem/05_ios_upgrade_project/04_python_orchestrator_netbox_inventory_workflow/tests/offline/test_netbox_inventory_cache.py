@@ -0,0 +1,185 @@
+from src.netbox_inventory_provider import (
+    NetBoxInventoryProvider,
+    NetBoxInventoryProviderConfig,
+)
+from tests.offline.conftest import FakeNetBoxSession, FakeResponse, make_client, paginate
+
+
+class FakeNetBox(FakeNetBoxSession):
+    """
+    /dcim/devices/ (site, status, id, last_updated__gte, fields, limit/offset)
+    and /ipam/ip-addresses/ (last_updated__gte, fields). A device's
+    primary_ip4 is rendered from the IP object, as NetBox does.
+    """
+
+    def __init__(self, total):
+        super().__init__()
+        self.clock = 0
+        self.devices = {}
+        self.ips = {}
+        for i in range(1, total + 1):
+            self.save_ip({"id": 100 + i, "address": f"10.0.0.{i}/24"})
+            self.save({
+                "id": i,
+                "name": f"R{i}",
+                "site": {"slug": "lab-primary"},
+                "status": {"value": "active"},
+                "platform": {"slug": "iosxe"},
+                "device_type": {"model": "Cisco Catalyst 8000V"},
+                "primary_ip4": 100 + i,
+                "custom_fields": {"upgrade_candidate": True, "transfer_method": "scp"},
+            })
+
+    def tick(self):
+        self.clock += 1
+        return f"2026-01-01T00:{self.clock // 60:02d}:{self.clock % 60:02d}.000000Z"
+
+    def save(self, device):
+        device["last_updated"] = self.tick()
+        self.devices[device["id"]] = device
+
+    def save_ip(self, ip):
+        ip["last_updated"] = self.tick()
+        self.ips[ip["id"]] = ip
+
+    def render(self, device):
+        ip = self.ips[device["primary_ip4"]]
+        return dict(device, primary_ip4={"id": ip["id"], "address": ip["address"]})
+
+    def answer(self, method, path, query, body):
+        if path.endswith("/ipam/ip-addresses/"):
+            objects = [ip for _, ip in sorted(self.ips.items())]
+        else:
+            ids = query.get("id")
+            if ids is not None:
+                ids = {int(i) for i in (ids if isinstance(ids, list) else [ids])}
+            objects = [
+                self.render(d) for _, d in sorted(self.devices.items())
+                if ("site" not in query or d["site"]["slug"] == query["site"])
+                and ("status" not in query or d["status"]["value"] == query["status"])
+                and (ids is None or d["id"] in ids)
+            ]
+        matches = [o for o in objects if o["last_updated"] >= query.get("last_updated__gte", "")]
+
+        if "fields" in query:
+            fields = query["fields"].split(",")
+            matches = [{f: o[f] for f in fields if f in o} for o in matches]
+        return FakeResponse(paginate(path, matches, query))
+
+
+def make_provider(session, tmp_path, ttl=3600):
+    return NetBoxInventoryProvider(
+        client=make_client(session, page_workers=1),
+        config=NetBoxInventoryProviderConfig(
+            site="lab-primary",
+            cache_dir=str(tmp_path),
+            cache_ttl_sec=ttl,
+        ),
+    )
+
+
+def test_second_run_refreshes_incrementally(tmp_path):
+    netbox = FakeNetBox(total=120)
+
+    first = make_provider(netbox, tmp_path)
+    assert len(first.load_devices()) == 120
+    assert first.cache.last_refresh == "full"
+
+    netbox.calls.clear()
+    netbox.devices[5]["custom_fields"]["transfer_method"] = "copy_command"
+    netbox.save(netbox.devices[5])
+
+    second = make_provider(netbox, tmp_path)
+    devices = second.load_devices()
+
+    assert second.cache.last_refresh == "incremental"
+    # changed devices + changed IPs + count check
+    assert [path for _, path, _ in netbox.calls] == [
+        "/api/dcim/devices/", "/api/ipam/ip-addresses/", "/api/dcim/devices/",
+    ]
+    assert "site" not in netbox.calls[0][2]
+    assert netbox.calls[0][2]["last_updated__gte"]
+    assert devices[4]["transfer_method"] == "copy_command"
+    assert len(devices) == 120
+
+
+def test_primary_ip_change_alone_is_picked_up(tmp_path):
+    netbox = FakeNetBox(total=120)
+    make_provider(netbox, tmp_path).load_devices()
+
+    # edit only the IP object: the device's own last_updated does not move
+    netbox.ips[105]["address"] = "10.9.9.5/24"
+    netbox.save_ip(netbox.ips[105])
+    netbox.calls.clear()
+
+    provider = make_provider(netbox, tmp_path)
+    devices = provider.load_devices()
+
+    assert provider.cache.last_refresh == "incremental"
+    assert [query["id"] for _, _, query in netbox.calls if "id" in query] == [[5]]
+    assert devices[4]["host"] == "10.9.9.5"
+    assert len(devices) == 120
+
+
+def test_changes_on_other_sites_are_not_fetched_again(tmp_path):
+    netbox = FakeNetBox(total=10)
+    make_provider(netbox, tmp_path).load_devices()
+
+    netbox.save_ip({"id": 999, "address": "10.1.0.1/24"})
+    netbox.save({
+        "id": 99,
+        "name": "B1",
+        "site": {"slug": "lab-secondary"},
+        "status": {"value": "active"},
+        "platform": {"slug": "iosxe"},
+        "device_type": {"model": "Cisco Catalyst 8000V"},
+        "primary_ip4": 999,
+        "custom_fields": {},
+    })
+    make_provider(netbox, tmp_path).load_devices()
+
+    netbox.calls.clear()
+    provider = make_provider(netbox, tmp_path)
+    assert len(provider.load_devices()) == 10
+
+    assert provider.cache.last_refresh == "incremental"
+    assert netbox.calls[0][2]["last_updated__gte"] == netbox.devices[99]["last_updated"]
+
+
+def test_devices_leaving_the_status_are_dropped(tmp_path):
+    netbox = FakeNetBox(total=10)
+    make_provider(netbox, tmp_path).load_devices()
+
+    netbox.devices[3]["status"] = {"value": "offline"}
+    netbox.save(netbox.devices[3])
+
+    provider = make_provider(netbox, tmp_path)
+    ids = provider.load_device_ids()
+
+    assert provider.cache.last_refresh == "incremental"
+    assert "R3" not in ids
+    assert len(ids) == 9
+
+
+def test_deleted_device_forces_a_full_listing(tmp_path):
+    netbox = FakeNetBox(total=10)
+    make_provider(netbox, tmp_path).load_devices()
+
+    del netbox.devices[7]
+
+    provider = make_provider(netbox, tmp_path)
+    ids = provider.load_device_ids()
+
+    assert provider.cache.last_refresh == "full"
+    assert "R7" not in ids
+    assert len(ids) == 9
+
+
+def test_expired_cache_is_listed_again(tmp_path):
+    netbox = FakeNetBox(total=10)
+    make_provider(netbox, tmp_path, ttl=0).load_devices()
+
+    provider = make_provider(netbox, tmp_path, ttl=0)
+    provider.load_devices()
+
+    assert provider.cache.last_refresh == "full"
@@ -0,0 +1,47 @@
+from tests.offline.conftest import FakeNetBoxSession, FakeResponse, make_client, paginate
+
+
+class FakeDevicesSession(FakeNetBoxSession):
+    """Serves /dcim/devices/ from a list with NetBox offset/limit paging."""
+
+    def __init__(self, total, limit=50, with_count=True):
+        super().__init__()
+        self.devices = [{"id": i, "name": f"R{i}"} for i in range(1, total + 1)]
+        self.limit = limit
+        self.with_count = with_count
+
+    @property
+    def offsets(self):
+        return [int(query.get("offset", 0)) for _, _, query in self.calls]
+
+    def answer(self, method, path, query, body):
+        return FakeResponse(
+            paginate(path, self.devices, query, default_limit=self.limit, with_count=self.with_count)
+        )
+
+
+def test_pages_are_fetched_by_offset_and_joined_in_order():
+    session = FakeDevicesSession(total=1234, limit=50)
+
+    devices = make_client(session).list_devices(site="lab-primary")
+
+    assert [d["id"] for d in devices] == list(range(1, 1235))
+    assert sorted(session.offsets) == list(range(0, 1234, 50))
+
+
+def test_missing_count_falls_back_to_next_links():
+    session = FakeDevicesSession(total=120, limit=50, with_count=False)
+
+    devices = make_client(session).list_devices(site="lab-primary")
+
+    assert [d["id"] for d in devices] == list(range(1, 121))
+    assert session.offsets == [0, 50, 100]
+
+
+def test_single_worker_follows_next_links():
+    session = FakeDevicesSession(total=120, limit=50)
+
+    devices = make_client(session, page_workers=1).list_devices(site="lab-primary")
+
+    assert [d["id"] for d in devices] == list(range(1, 121))
+    assert session.offsets == [0, 50, 100]
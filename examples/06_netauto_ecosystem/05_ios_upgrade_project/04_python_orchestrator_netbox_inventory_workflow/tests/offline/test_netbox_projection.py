@@ -0,0 +1,165 @@
+import json
+
+from src.netbox_inventory_provider import (
+    NetBoxInventoryProvider,
+    NetBoxInventoryProviderConfig,
+)
+from tests.offline.conftest import API, FakeNetBoxSession, FakeResponse, make_client, paginate
+
+
+SITE_DEVICES = 2000
+
+
+def brief(kind, obj_id, name, **extra):
+    return {
+        "id": obj_id,
+        "url": f"{API}/{kind}/{obj_id}/",
+        "display": name,
+        "name": name,
+        "slug": name.lower().replace(" ", "-"),
+        "description": "",
+        **extra,
+    }
+
+
+def full_device(i):
+    """A NetBox 4.x device as GET /dcim/devices/ renders it without field selection."""
+    ip = {
+        "id": 10_000 + i,
+        "url": f"{API}/ipam/ip-addresses/{10_000 + i}/",
+        "display": f"10.{i // 250}.{i % 250}.1/24",
+        "family": {"value": 4, "label": "IPv4"},
+        "address": f"10.{i // 250}.{i % 250}.1/24",
+        "description": "",
+    }
+    manufacturer = brief("dcim/manufacturers", 1, "Cisco")
+    return {
+        "id": i,
+        "url": f"{API}/dcim/devices/{i}/",
+        "display_url": f"https://netbox.example/dcim/devices/{i}/",
+        "display": f"R{i}",
+        "name": f"R{i}",
+        "device_type": {
+            "id": 3,
+            "url": f"{API}/dcim/device-types/3/",
+            "display": "Cisco Catalyst 8000V",
+            "manufacturer": manufacturer,
+            "model": "Cisco Catalyst 8000V",
+            "slug": "c8000v",
+            "description": "",
+        },
+        "role": brief("dcim/device-roles", 2, "Edge Router"),
+        "tenant": None,
+        "platform": brief("dcim/platforms", 4, "iosxe", manufacturer=manufacturer),
+        "serial": f"9{i:010d}",
+        "asset_tag": None,
+        "site": brief("dcim/sites", 1, "lab-primary"),
+        "location": brief("dcim/locations", 7, "Row A"),
+        "rack": brief("dcim/racks", 40 + i % 20, f"A{i % 20:02d}"),
+        "position": float(i % 42 + 1),
+        "face": {"value": "front", "label": "Front"},
+        "latitude": None,
+        "longitude": None,
+        "parent_device": None,
+        "status": {"value": "active", "label": "Active"},
+        "airflow": {"value": "front-to-rear", "label": "Front to rear"},
+        "primary_ip": ip,
+        "primary_ip4": ip,
+        "primary_ip6": None,
+        "oob_ip": None,
+        "cluster": None,
+        "virtual_chassis": None,
+        "vc_position": None,
+        "vc_priority": None,
+        "description": "",
+        "comments": "Managed by the IOS upgrade workflow.",
+        "config_template": None,
+        "config_context": {
+            "ntp_servers": ["192.0.2.1", "192.0.2.2"],
+            "syslog_servers": ["192.0.2.10"],
+            "snmp": {"location": "lab-primary / Row A", "contact": "netops@example.com"},
+            "banner": "Authorized access only. " * 4,
+        },
+        "local_context_data": None,
+        "tags": [
+            {"id": 1, "url": f"{API}/extras/tags/1/", "display": "upgrade-wave-1",
+             "name": "upgrade-wave-1", "slug": "upgrade-wave-1", "color": "2196f3"},
+        ],
+        "custom_fields": {
+            "upgrade_candidate": i % 3 != 0,
+            "transfer_method": "scp",
+            "precheck_status": "passed",
+            "backup_path": f"artifacts/run/stage1/R{i}/running-config.txt",
+            "backup_timestamp": "2026-01-01T00:00:00Z",
+            "stage2_result": None,
+        },
+        "created": "2025-06-01T12:00:00.000000Z",
+        "last_updated": "2026-01-01T00:00:00.000000Z",
+        "console_port_count": 1,
+        "console_server_port_count": 0,
+        "power_port_count": 2,
+        "power_outlet_count": 0,
+        "interface_count": 8,
+        "front_port_count": 0,
+        "rear_port_count": 0,
+        "device_bay_count": 0,
+        "module_bay_count": 0,
+        "inventory_item_count": 0,
+    }
+
+
+def projected_device(i):
+    """The same device as NetBox renders it for ?fields=<DEVICE_FIELDS>."""
+    device = full_device(i)
+    return {field: device[field] for field in NetBoxInventoryProvider.DEVICE_FIELDS}
+
+
+def page_body(devices):
+    return json.dumps(
+        {"count": len(devices), "next": None, "previous": None, "results": devices}
+    ).encode("utf-8")
+
+
+class ProjectingSession(FakeNetBoxSession):
+    """Answers GET /dcim/devices/ the way NetBox applies ?fields=."""
+
+    def __init__(self, total):
+        super().__init__()
+        self.total = total
+
+    def answer(self, method, path, query, body):
+        devices = [full_device(i) for i in range(1, self.total + 1)]
+        if "fields" in query:
+            devices = [{f: d[f] for f in query["fields"].split(",")} for d in devices]
+        return FakeResponse(paginate(path, devices, query))
+
+
+def test_provider_requests_only_the_fields_it_reads():
+    session = ProjectingSession(total=30)
+    provider = NetBoxInventoryProvider(
+        client=make_client(session),
+        config=NetBoxInventoryProviderConfig(site="lab-primary"),
+    )
+
+    devices = provider.load_devices()
+
+    assert session.calls[0][2]["fields"] == "id,name,platform,device_type,primary_ip4,custom_fields"
+    assert len(devices) == 20
+    assert devices[0] == {
+        "inventory_hostname": "R1",
+        "host": "10.0.1.1",
+        "port": 22,
+        "os": "iosxe",
+        "platform": "iosxe",
+        "device_type": "Cisco Catalyst 8000V",
+        "upgrade_candidate": True,
+        "transfer_method": "scp",
+    }
+    assert provider.get_device_id_by_name("R3") == 3
+
+
+def test_projection_cuts_payload_bytes():
+    full_body = page_body([full_device(i) for i in range(1, SITE_DEVICES + 1)])
+    projected_body = page_body([projected_device(i) for i in range(1, SITE_DEVICES + 1)])
+
+    assert len(projected_body) < 0.5 * len(full_body)
@@ -0,0 +1,153 @@
+import time
+
+from src.netbox_writeback import NetBoxWriteback, WritebackQueue
+from tests.offline.conftest import FakeNetBoxSession, FakeResponse, make_client
+
+
+DEVICES_PATH = "/api/dcim/devices/"
+
+
+class FakeNetBox(FakeNetBoxSession):
+    """Applies PATCHes; devices in `rejected` fail validation (bulk PATCH is atomic)."""
+
+    def __init__(self, rejected=()):
+        super().__init__()
+        self.rejected = set(rejected)
+        self.custom_fields = {}
+
+    @property
+    def requests(self):
+        return [(method, path) for method, path, _ in self.calls]
+
+    def answer(self, method, path, query, body):
+        entries = body if isinstance(body, list) else [dict(body, id=int(path.rstrip("/").rsplit("/", 1)[-1]))]
+
+        bad = [e["id"] for e in entries if e["id"] in self.rejected]
+        if bad:
+            return FakeResponse({"custom_fields": [f"invalid value for device {bad[0]}"]}, 400)
+
+        for entry in entries:
+            self.custom_fields.setdefault(entry["id"], {}).update(entry["custom_fields"])
+        if isinstance(body, list):
+            return FakeResponse([{"id": e["id"]} for e in entries])
+        return FakeResponse({"id": entries[0]["id"]})
+
+
+def test_changes_are_merged_per_device_and_sent_in_bulk_chunks():
+    session = FakeNetBox()
+    writeback = NetBoxWriteback(make_client(session), chunk_size=100)
+    warnings = {i: [] for i in range(1, 251)}
+
+    # Stage 1 shape: precheck_status and backup metadata as separate groups
+    for i in range(1, 251):
+        writeback.add(i, {"precheck_status": "passed"}, warnings=warnings[i],
+                      failure_warning="netbox_writeback_precheck_failed")
+        writeback.add(i, {"backup_path": f"artifacts/R{i}.cfg",
+                          "backup_timestamp": "2026-04-01T12:00:00Z"},
+                      warnings=warnings[i], failure_warning="netbox_writeback_backup_failed")
+
+    assert session.requests == []
+    assert len(writeback) == 250
+    assert writeback.flush() == 250
+
+    assert session.requests == [("PATCH", DEVICES_PATH)] * 3
+    assert session.custom_fields[7] == {
+        "precheck_status": "passed",
+        "backup_path": "artifacts/R7.cfg",
+        "backup_timestamp": "2026-04-01T12:00:00Z",
+    }
+    assert all(w == [] for w in warnings.values())
+
+
+def test_rejected_device_gets_warnings_and_the_rest_of_its_chunk_is_written():
+    session = FakeNetBox(rejected={3})
+    writeback = NetBoxWriteback(make_client(session), chunk_size=4)
+    warnings = {i: [] for i in range(1, 9)}
+
+    for i in range(1, 9):
+        writeback.add(i, {"precheck_status": "passed"}, warnings=warnings[i],
+                      failure_warning="netbox_writeback_precheck_failed")
+    writeback.add(3, {"backup_path": "x", "backup_timestamp": "t"}, warnings=warnings[3],
+                  failure_warning="netbox_writeback_backup_failed")
+
+    assert writeback.flush() == 7
+
+    # chunk 1 rejected -> 4 single PATCHes, chunk 2 written in one
+    assert writeback.requests == 1 + 4 + 1
+    assert sorted(session.custom_fields) == [1, 2, 4, 5, 6, 7, 8]
+    assert [w.split(":", 1)[0] for w in warnings[3]] == [
+        "netbox_writeback_precheck_failed",
+        "netbox_writeback_backup_failed",
+    ]
+    assert all(warnings[i] == [] for i in warnings if i != 3)
+    assert len(writeback) == 0
+
+
+class FlakyNetBox(FakeNetBox):
+    """Answers 503 to the first `failures` requests."""
+
+    def __init__(self, failures):
+        super().__init__()
+        self.failures = failures
+
+    def answer(self, method, path, query, body):
+        if self.failures:
+            self.failures -= 1
+            return FakeResponse("Service Unavailable", 503)
+        return super().answer(method, path, query, body)
+
+
+def test_transient_errors_are_retried():
+    session = FlakyNetBox(failures=2)
+    writeback = NetBoxWriteback(make_client(session), retries=2, retry_backoff=0)
+    warnings = []
+
+    writeback.add(1, {"stage2_result": "passed"}, warnings=warnings,
+                  failure_warning="netbox_writeback_stage2_failed")
+
+    assert writeback.flush() == 1
+    assert writeback.requests == 3
+    assert session.custom_fields[1] == {"stage2_result": "passed"}
+    assert warnings == []
+
+
+def test_netbox_down_stops_after_one_chunk():
+    session = FlakyNetBox(failures=10_000)
+    writeback = NetBoxWriteback(make_client(session), chunk_size=100, retries=2, retry_backoff=0)
+    warnings = {i: [] for i in range(1, 251)}
+
+    for i in range(1, 251):
+        writeback.add(i, {"stage2_result": "passed"}, warnings=warnings[i],
+                      failure_warning="netbox_writeback_stage2_failed")
+
+    assert writeback.flush() == 0
+    # first bulk PATCH and its retries only: no per-device pass, no further chunks
+    assert len(session.calls) == 3
+    assert all(len(w) == 1 and w[0].startswith("netbox_writeback_stage2_failed:")
+               for w in warnings.values())
+
+
+def test_queue_writes_in_background_and_merges_warnings_on_close():
+    session = FakeNetBox(rejected={2})
+    queue = WritebackQueue(
+        NetBoxWriteback(make_client(session), chunk_size=2, retry_backoff=0),
+        maxsize=4,
+        flush_interval=0.05,
+    )
+    warnings = {i: [] for i in range(1, 6)}
+
+    for i in range(1, 6):
+        queue.add(i, {"precheck_status": "passed"}, warnings=warnings[i],
+                  failure_warning="netbox_writeback_precheck_failed")
+
+    # chunks of 2 go out from the worker thread while the caller continues
+    deadline = time.monotonic() + 5
+    while len(session.custom_fields) < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert {1, 3, 4} <= set(session.custom_fields)
+    assert warnings[2] == []  # not merged before close()
+
+    assert queue.close() == 4
+    assert sorted(session.custom_fields) == [1, 3, 4, 5]
+    assert [w.split(":", 1)[0] for w in warnings[2]] == ["netbox_writeback_precheck_failed"]
+    assert all(warnings[i] == [] for i in warnings if i != 2)
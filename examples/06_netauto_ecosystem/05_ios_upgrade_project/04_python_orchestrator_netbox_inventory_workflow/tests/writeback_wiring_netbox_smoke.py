@@ -1,6 +1,7 @@
 
 from src.ctx import build_ctx
 from src.inventory_provider_factory import build_inventory_provider
+from src.netbox_writeback import build_writeback
 from src.stage1_orchestrator import _writeback_v1_best_effort
 
 
@@ -28,11 +29,14 @@ def main() -> None:
             "backup_timestamp": "2026-04-01T12:00:00Z",
         }
 
+        writeback = build_writeback(ctx, provider)
         _writeback_v1_best_effort(
             ctx=ctx,
             provider=provider,
             device_state=device_state,
+            writeback=writeback,
         )
+        writeback.flush()
 
         print("warnings_after_writeback =", device_state["warnings"])
 
@@ -17,6 +17,7 @@ stage2_result_after_R2 = failed
 """
 from src.ctx import build_ctx
 from src.inventory_provider_factory import build_inventory_provider
+from src.netbox_writeback import build_writeback
 from src.stage2_orchestrator import _writeback_stage2_result_best_effort
 
 
@@ -67,11 +68,14 @@ def main() -> None:
             "stage2_reason": "",
             "warnings": [],
         }
+        writeback = build_writeback(ctx, provider)
         _writeback_stage2_result_best_effort(
             ctx=ctx,
             provider=provider,
             result=result_passed,
+            writeback=writeback,
         )
+        writeback.flush()
         print(f"warnings_after_{target_passed}_writeback =", result_passed["warnings"])
 
         actual_passed = _read_stage2_result(provider, ctx, target_passed)
@@ -84,11 +88,14 @@ def main() -> None:
             "stage2_reason": "error by compare: post system image does not contain target image",
             "warnings": [],
         }
+        writeback = build_writeback(ctx, provider)
         _writeback_stage2_result_best_effort(
             ctx=ctx,
             provider=provider,
             result=result_failed,
+            writeback=writeback,
         )
+        writeback.flush()
         print(f"warnings_after_{target_failed}_writeback =", result_failed["warnings"])
 
         actual_failed = _read_stage2_result(provider, ctx, target_failed)
@@ -4,19 +4,52 @@
 SNMP CPU Alerter (long-running)
 
 Reads snapshots from:
+  /app/shared/latest.tbl   (memory-mapped snapshot table, see snapshot_reader.py;
+                            plus latest.<shard>.tbl per poller shard)
+or, when the table does not exist, from the compatibility export:
   /app/shared/latest/<ip>.json
     {"timestamp_utc": "...", "ip": "...", "cpu_percent": <int|null>}
 
-Writes per-device state to:
-  /app/shared/state/<ip>.json   (atomic write)
+Pollers also push every snapshot over the Unix socket PUSH_SOCKET as it is
+taken (see push_receiver.py); those are evaluated immediately. The periodic
+pass above stays as the fallback and only evaluates snapshots that did not
+arrive by push.
+
+The pass is change-driven: a table slot is only evaluated when its sequence
+number moved, a JSON snapshot only when its (mtime, size) changed. Each pass
+logs how many snapshots were evaluated or skipped.
+
+Keeps per-device state in memory, checkpointed to:
+  /app/shared/state.db   (SQLite, WAL mode; see state_store.py)
+Changed states are written in one transaction at the end of each pass, and
+immediately when an alarm changes (before the email goes out). State is only
+marked changed when something besides the evaluation time differs; updated_ts
+is the time the state last changed. On first start the old per-device files
+/app/shared/state/<ip>.json are imported once; STATE_JSON_EXPORT=1 keeps
+writing them (on change) for compatibility.
 
 Policy:
-- cpu_percent is null => status=UNKNOWN (log only, no email)
-- cpu_percent >= THRESHOLD => HIGH
+- cpu_percent is null => status=UNKNOWN (log only, no email); the log says
+  whether the poller quarantined the device (breaker open) or the poll failed
+- every non-null cpu_percent is added to the device's sample window
+  (cpu_window.py); HIGH/OK follow the alert rule: raise when ALERT_BREACHES of
+  the last ALERT_WINDOW values are >= THRESHOLD, clear when as many are
+  < CLEAR_THRESHOLD, where a value is the mean of the last ALERT_AVG_SAMPLES
+  samples (defaults 1/1/1 and CLEAR_THRESHOLD=THRESHOLD: one sample decides)
+- HIGH
     - if alarm_active was False => ALERT email, set alarm_active=True
     - if alarm_active True and cooldown passed => REMINDER email
-- cpu_percent < THRESHOLD => OK
+- OK
     - if alarm_active True => RECOVERY email, set alarm_active=False
+
+Emails go through an asynchronous delivery queue (mail_queue.py): one reused
+SMTP connection, retries with backoff, and optionally one digest mail per
+pass (MAIL_DIGEST=cycle) or per site (MAIL_DIGEST=site, sites come from
+DEVICES_FILE) instead of one mail per action.
+
+Optionally (METRICS_PORT) serves Prometheus metrics on GET /metrics from the
+same event loop: snapshots processed per second, state-write and email-send
+latency. A scrape that arrives during a pass is answered once the pass ends.
 """
 
 import asyncio
@@ -24,19 +57,35 @@ import json
 import logging
 import os
 import sys
+import time
 from datetime import datetime, timezone
-from email.message import EmailMessage
 from pathlib import Path
-from typing import Any
+from typing import Any, Hashable
+
+from cpu_window import AlertRule, CpuWindows, Verdict
+from mail_queue import MailQueue, Notification, Outgoing
+from metrics import MetricsRegistry
+from push_receiver import PushReceiver
+from snapshot_reader import SnapshotTableSet
+from state_store import StateStore
 
 # ----------------------------
 # Config
 # ----------------------------
 LATEST_DIR   = os.environ.get("LATEST_DIR", "/app/shared/latest")
+SNAPSHOT_TABLE = os.environ.get("SNAPSHOT_TABLE", "/app/shared/latest.tbl")
 STATE_DIR    = os.environ.get("STATE_DIR", "/app/shared/state")
+STATE_DB     = os.environ.get("STATE_DB", "/app/shared/state.db")
+STATE_JSON_EXPORT = os.environ.get("STATE_JSON_EXPORT", "0") == "1"
+PUSH_SOCKET  = os.environ.get("PUSH_SOCKET", "/app/shared/alerter.sock")   # "" => no push
+DEVICES_FILE = os.environ.get("DEVICES_FILE", "/app/shared/devices.json")  # ip -> site for digests
 
 INTERVAL_SEC = int(os.environ.get("ALERTER_INTERVAL_SEC", "40"))
 THRESHOLD    = int(os.environ.get("THRESHOLD", "80"))
+CLEAR_THRESHOLD   = float(os.environ.get("CLEAR_THRESHOLD", str(THRESHOLD)))   # hysteresis
+ALERT_BREACHES    = int(os.environ.get("ALERT_BREACHES", "1"))     # N of ...
+ALERT_WINDOW      = int(os.environ.get("ALERT_WINDOW", "1"))       # ... M samples
+ALERT_AVG_SAMPLES = int(os.environ.get("ALERT_AVG_SAMPLES", "1"))  # moving average length
 COOLDOWN_SEC = int(os.environ.get("COOLDOWN_SEC", str(60 * 60)))  # 1 hour
 
 SMTP_HOST = os.environ.get("SMTP_HOST", "mailpit")
@@ -44,8 +93,17 @@ SMTP_PORT = int(os.environ.get("SMTP_PORT", "1025"))
 MAIL_FROM = os.environ.get("MAIL_FROM", "snmp@lab.local")
 MAIL_TO   = os.environ.get("MAIL_TO", "ops@lab.local")
 
+MAIL_DIGEST       = os.environ.get("MAIL_DIGEST", "off")            # off | cycle | site
+MAIL_QUEUE        = int(os.environ.get("MAIL_QUEUE", "1000"))
+MAIL_MAX_ATTEMPTS = int(os.environ.get("MAIL_MAX_ATTEMPTS", "5"))
+MAIL_BACKOFF_SEC  = float(os.environ.get("MAIL_BACKOFF_SEC", "2"))   # doubles per retry, max 60s
+MAIL_IDLE_SEC     = float(os.environ.get("MAIL_IDLE_SEC", "30"))     # close the SMTP connection after
+
 LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
 
+METRICS_HOST = os.environ.get("METRICS_HOST", "0.0.0.0")
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "0"))   # 0 => no /metrics endpoint
+
 logging.basicConfig(
     level=LOG_LEVEL,
     stream=sys.stdout,
@@ -53,6 +111,65 @@ logging.basicConfig(
 )
 log = logging.getLogger("alerter")
 
+# ----------------------------
+# Metrics
+# ----------------------------
+_metrics = MetricsRegistry()
+M_SNAPSHOTS = _metrics.counter(
+    "snmp_alerter_snapshots_total", "Snapshots evaluated.", ["source"])
+M_SNAPSHOTS_PER_SEC = _metrics.gauge(
+    "snmp_alerter_snapshots_per_second", "Evaluation throughput of the last pass.")
+M_PASS_SKIPPED = _metrics.counter(
+    "snmp_alerter_pass_skipped_total", "Snapshots the periodic pass did not re-evaluate.",
+    ["reason"])
+M_PASS_SECONDS = _metrics.gauge(
+    "snmp_alerter_pass_seconds", "Wall time of the last evaluation pass.")
+M_STATE_WRITES = _metrics.counter(
+    "snmp_alerter_state_writes_total", "State evaluations by outcome (changed/unchanged).",
+    ["result"])
+M_STATE_WRITE_SECONDS = _metrics.histogram(
+    "snmp_alerter_state_write_seconds", "Latency of one state checkpoint (one transaction).")
+M_EMAIL_SECONDS = _metrics.histogram(
+    "snmp_alerter_email_send_seconds", "Delivery time of one mail, retries included.",
+    ["result"])
+M_EMAILS = _metrics.counter(
+    "snmp_alerter_emails_total", "Notifications by action and delivery result.",
+    ["action", "result"])
+
+def on_mail_result(out: Outgoing, result: str, seconds: float, err: Exception | None) -> None:
+    if result != "dropped":
+        M_EMAIL_SECONDS.observe(seconds, result=result)
+    for n in out.notifications:
+        M_EMAILS.inc(action=n.action, result=result)
+    if out.is_digest:
+        log.info("digest email %s (%d notification(s)) subject=%r%s", result.upper(),
+                 len(out.notifications), out.subject, f" err={err}" if err else "")
+        return
+    n = out.notifications[0]
+    if result == "sent":
+        log.info("ip=%s email sent (%s) cpu=%s snap=%s", n.ip, n.action, n.cpu_txt, n.snap_ts)
+    else:
+        log.info("ip=%s email %s (%s) err=%s snap=%s", n.ip, result.upper(), n.action,
+                 err, n.snap_ts)
+
+_mail = MailQueue(
+    SMTP_HOST, SMTP_PORT, MAIL_FROM, MAIL_TO,
+    digest=MAIL_DIGEST,
+    max_queue=MAIL_QUEUE,
+    max_attempts=MAIL_MAX_ATTEMPTS,
+    backoff_sec=MAIL_BACKOFF_SEC,
+    idle_sec=MAIL_IDLE_SEC,
+    on_result=on_mail_result,
+)
+_sites: dict[str, str] = {}
+_windows = CpuWindows(AlertRule(
+    threshold=THRESHOLD,
+    clear_threshold=CLEAR_THRESHOLD,
+    n=ALERT_BREACHES,
+    window=ALERT_WINDOW,
+    avg_samples=ALERT_AVG_SAMPLES,
+))
+
 # ----------------------------
 # Helpers
 # ----------------------------
@@ -78,54 +195,93 @@ def atomic_write_json(path: Path, payload: dict[str, Any]) -> None:
         json.dump(payload, f, indent=2)
     os.replace(tmp, path)
 
-def send_email(subject: str, body: str) -> None:
-    msg = EmailMessage()
-    msg["From"] = MAIL_FROM
-    msg["To"] = MAIL_TO
-    msg["Subject"] = subject
-    msg.set_content(body)
-
-    import smtplib
-    with smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=5) as s:
-        s.send_message(msg)
-
-def compute_status(cpu: int | None) -> str:
-    if cpu is None:
+def load_sites(path: str) -> dict[str, str]:
+    """ip -> site from the poller's devices.json (empty when unreadable)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, list):
+        return {}
+    return {str(d["ip"]): str(d.get("site") or "")
+            for d in data if isinstance(d, dict) and "ip" in d}
+
+def compute_status(verdict: Verdict | None, alarm_active: bool) -> str:
+    """HIGH/OK from the device's window; between the raise and clear rules the alarm holds."""
+    if verdict is None:
         return "UNKNOWN"
-    return "HIGH" if cpu >= THRESHOLD else "OK"
+    return _windows.rule.status(verdict, alarm_active)
 
 def safe_name(s: str) -> str:
     return s.replace(":", "_").replace("/", "_")
 
+class ChangeTracker:
+    """Last marker seen per snapshot key; only a moved marker counts as a change."""
+
+    def __init__(self) -> None:
+        self._seen: dict[str, Hashable] = {}
+
+    def changed(self, key: str, marker: Hashable) -> bool:
+        if self._seen.get(key) == marker:
+            return False
+        self._seen[key] = marker
+        return True
+
+    def forget(self, key: str) -> None:
+        self._seen.pop(key, None)
+
+    def retain(self, keys: set[str]) -> None:
+        for key in [k for k in self._seen if k not in keys]:
+            del self._seen[key]
+
 # ----------------------------
 # Core per snapshot
 # ----------------------------
-def process_snapshot(snapshot_path: Path) -> None:
+def checkpoint_state(store: StateStore) -> int:
+    t0 = time.monotonic()
+    rows = store.checkpoint()
+    if rows:
+        M_STATE_WRITE_SECONDS.observe(time.monotonic() - t0)
+    return rows
+
+def process_snapshot(snapshot_path: Path, pushed: dict[str, str], store: StateStore) -> str:
+    """returns "evaluated", "pushed" (already evaluated from the push channel)
+    or "error" (file unreadable, nothing evaluated)"""
     snap = read_json(snapshot_path)
     if not snap:
         log.info("unreadable snapshot: %s", snapshot_path)
-        return
+        return "error"
+    if already_pushed(snap, pushed):
+        return "pushed"
+    evaluate_snapshot(snap, str(snapshot_path), store)
+    return "evaluated"
+
+def already_pushed(snap: dict[str, Any], pushed: dict[str, str]) -> bool:
+    ts = snap.get("timestamp_utc")
+    return ts is not None and pushed.get(str(snap.get("ip"))) == ts
 
+def evaluate_snapshot(snap: dict[str, Any], source: str, store: StateStore) -> None:
     ip = snap.get("ip")
     if not ip:
-        log.info("snapshot missing ip: %s", snapshot_path)
+        log.info("snapshot missing ip: %s", source)
         return
     ip = str(ip)
 
     snap_ts_utc = str(snap.get("timestamp_utc") or "")
     raw_cpu = snap.get("cpu_percent", None)
+    quarantined = bool(snap.get("quarantined")) or snap.get("breaker") == "open"
 
     try:
         cpu = None if raw_cpu is None else int(raw_cpu)
     except Exception:
         cpu = None
 
-    status = compute_status(cpu)
-
-    st_path = Path(STATE_DIR) / f"{safe_name(ip)}.json"
-    st = read_json(st_path) or {}
+    st = store.get(ip) or {}
 
     alarm_active = bool(st.get("alarm_active", False))
+    verdict = None if cpu is None else _windows.add(ip, cpu)
+    status = compute_status(verdict, alarm_active)
     last_alert_ts = st.get("last_alert_ts")
     if not isinstance(last_alert_ts, str):
         last_alert_ts = None
@@ -163,51 +319,180 @@ def process_snapshot(snapshot_path: Path) -> None:
             alarm_active = False
             last_alert_ts = now_utc
 
-    # write state always
     new_state = {
         "ip": ip,
         "status": status,
         "alarm_active": alarm_active,
         "last_alert_ts": last_alert_ts,
+        "quarantined": quarantined,
         "updated_ts": now_utc,
     }
-    atomic_write_json(st_path, new_state)
+    if any(st.get(k) != v for k, v in new_state.items() if k != "updated_ts"):
+        store.put(new_state)
+        if action is not None:
+            checkpoint_state(store)   # alarm changes are durable before the email
+        if STATE_JSON_EXPORT:
+            atomic_write_json(Path(STATE_DIR) / f"{safe_name(ip)}.json", new_state)
+        M_STATE_WRITES.inc(result="changed")
+    else:
+        M_STATE_WRITES.inc(result="unchanged")
 
     if status == "UNKNOWN":
-        log.info("ip=%s status=UNKNOWN (cpu_percent is null) snap=%s", ip, snap_ts_utc)
+        if quarantined:
+            log.info("ip=%s status=UNKNOWN (quarantined by poller, probing only) snap=%s",
+                     ip, snap_ts_utc)
+        else:
+            log.info("ip=%s status=UNKNOWN (cpu_percent is null) snap=%s", ip, snap_ts_utc)
         return
 
     if action is None:
         return
 
     cpu_txt = "UNKNOWN" if cpu is None else str(cpu)
+    site = _sites.get(ip, "")
     subject = f"[SNMP CPU] {action} ip={ip} cpu={cpu_txt} thr={THRESHOLD}"
     body = "\n".join([
         f"Action: {action}",
         f"IP: {ip}",
+        *([f"Site: {site}"] if site else []),
         f"Snapshot time (UTC): {snap_ts_utc}",
         f"CPU (%): {cpu_txt}",
         f"Threshold (%): {THRESHOLD}",
+        *([] if verdict is None or _windows.rule.is_single_sample else [
+            f"Rule: {_windows.rule.describe()}",
+            f"Window: value={verdict.value:.1f} breaches={verdict.breaches} "
+            f"clears={verdict.clears} of {verdict.samples}",
+        ]),
         f"Cooldown (sec): {COOLDOWN_SEC}",
     ])
-
-    try:
-        send_email(subject, body)
-        log.info("ip=%s email sent (%s) cpu=%s snap=%s", ip, action, cpu_txt, snap_ts_utc)
-    except Exception as e:
-        log.info("ip=%s email FAILED (%s) err=%s snap=%s", ip, action, e, snap_ts_utc)
+    _mail.submit(Notification(ip=ip, site=site, action=action, subject=subject, body=body,
+                              cpu_txt=cpu_txt, snap_ts=snap_ts_utc))
 
 # ----------------------------
 # Main loop
 # ----------------------------
 async def main() -> None:
     latest_dir = Path(LATEST_DIR)
-    Path(STATE_DIR).mkdir(parents=True, exist_ok=True)
-
+    if STATE_JSON_EXPORT:
+        Path(STATE_DIR).mkdir(parents=True, exist_ok=True)
+    table = SnapshotTableSet(SNAPSHOT_TABLE)
+
+    store = StateStore(STATE_DB)
+    imported = store.import_json_dir(STATE_DIR)
+    if imported is not None:
+        log.info("state: imported %d device(s) from %s into %s", imported, STATE_DIR, STATE_DB)
+    log.info("state: %s loaded with %d device(s)", STATE_DB, len(store))
+
+    _metrics.gauge("snmp_alerter_snapshot_torn_reads", "Table slots skipped mid-write so far.",
+                   fn=lambda: table.torn_reads)
+    if METRICS_PORT:
+        await _metrics.serve(METRICS_HOST, METRICS_PORT)
+        log.info("metrics on http://%s:%d/metrics", METRICS_HOST, METRICS_PORT)
+
+    # ip -> timestamp_utc of the last snapshot evaluated from the push channel
+    pushed: dict[str, str] = {}
+
+    def on_push(snap: dict[str, Any]) -> None:
+        evaluate_snapshot(snap, f"push#{snap.get('ip')}", store)
+        M_SNAPSHOTS.inc(source="push")
+        if snap.get("ip") and snap.get("timestamp_utc"):
+            pushed[str(snap["ip"])] = str(snap["timestamp_utc"])
+
+    if PUSH_SOCKET:
+        push = PushReceiver(PUSH_SOCKET, on_push)
+        await push.start()
+        _metrics.gauge("snmp_alerter_push_clients", "Pollers connected to the push socket.",
+                       fn=lambda: push.clients)
+        log.info("push channel listening on %s", PUSH_SOCKET)
+
+    # table slot ip -> (seq, ts_epoch); JSON file name -> (mtime_ns, size)
+    tracker = ChangeTracker()
+
+    def state_writes() -> tuple[float, float]:
+        return M_STATE_WRITES.value(result="changed"), M_STATE_WRITES.value(result="unchanged")
+
+    log.info("alert rule: %s", _windows.rule.describe())
+    _mail.start()
+    log.info("mail: %s:%d digest=%s max_attempts=%d", SMTP_HOST, SMTP_PORT, MAIL_DIGEST,
+             MAIL_MAX_ATTEMPTS)
+    _metrics.gauge("snmp_alerter_mail_queued", "Mails waiting for delivery.",
+                   fn=lambda: _mail.stats()["queued"])
+
+    sites_marker: tuple[int, int] | None = None
+    mail_before = _mail.stats()
+    writes_before = state_writes()
     while True:
-        for snap_file in sorted(latest_dir.glob("*.json")):
-            process_snapshot(snap_file)
-
+        t0 = time.monotonic()
+        try:
+            dst = os.stat(DEVICES_FILE)
+            marker = (dst.st_mtime_ns, dst.st_size)
+        except OSError:
+            marker = None
+        if marker != sites_marker:
+            sites_marker = marker
+            _sites.clear()
+            _sites.update(load_sites(DEVICES_FILE))
+        counts = {"evaluated": 0, "unchanged": 0, "pushed": 0, "error": 0}
+        if table.available():
+            source = "table"
+            torn_before = table.torn_reads
+            records = sorted(table.read_all(), key=lambda r: r.ip)
+            for rec in records:
+                if not tracker.changed(rec.ip, (rec.seq, rec.ts_epoch)):
+                    counts["unchanged"] += 1
+                    continue
+                snap = rec.as_snapshot()
+                if already_pushed(snap, pushed):
+                    counts["pushed"] += 1
+                    continue
+                evaluate_snapshot(snap, f"{SNAPSHOT_TABLE}#{rec.ip}", store)
+                counts["evaluated"] += 1
+            tracker.retain({rec.ip for rec in records})
+            _windows.retain({rec.ip for rec in records})
+            if table.torn_reads != torn_before:
+                log.info("snapshot table: %d slot(s) skipped (write in progress)",
+                         table.torn_reads - torn_before)
+        else:
+            source = "json"
+            snap_files = sorted(latest_dir.glob("*.json"))
+            for snap_file in snap_files:
+                try:
+                    st = snap_file.stat()
+                except OSError:
+                    continue
+                if not tracker.changed(snap_file.name, (st.st_mtime_ns, st.st_size)):
+                    counts["unchanged"] += 1
+                    continue
+                result = process_snapshot(snap_file, pushed, store)
+                if result == "error":
+                    tracker.forget(snap_file.name)   # retry on the next pass
+                counts[result] += 1
+            tracker.retain({f.name for f in snap_files})
+            _windows.retain({f.stem for f in snap_files})
+
+        checkpointed = checkpoint_state(store)
+        _mail.end_cycle()
+        elapsed = time.monotonic() - t0
+        processed = counts["evaluated"]
+        M_SNAPSHOTS.inc(processed, source=source)
+        M_PASS_SKIPPED.inc(counts["unchanged"], reason="unchanged")
+        M_PASS_SKIPPED.inc(counts["pushed"], reason="pushed")
+        M_PASS_SKIPPED.inc(counts["error"], reason="unreadable")
+        writes_now = state_writes()   # since the last pass, push evaluations included
+        log.info("pass (%s): evaluated=%d skipped_unchanged=%d skipped_pushed=%d "
+                 "unreadable=%d state_changed=%d state_unchanged=%d checkpointed=%d in %.1f ms",
+                 source, processed, counts["unchanged"], counts["pushed"], counts["error"],
+                 writes_now[0] - writes_before[0], writes_now[1] - writes_before[1],
+                 checkpointed, elapsed * 1000)
+        writes_before = writes_now
+        ms = _mail.stats()
+        if ms != mail_before and (ms["queued"] or ms["failed"] or ms["dropped"] or ms["retried"]):
+            log.info("mail: queued=%d sent=%d failed=%d retried=%d dropped=%d connections=%d",
+                     ms["queued"], ms["sent"], ms["failed"], ms["retried"], ms["dropped"],
+                     ms["connections"])
+        mail_before = ms
+        M_PASS_SECONDS.set(elapsed)
+        M_SNAPSHOTS_PER_SEC.set(processed / elapsed if elapsed > 0 else 0.0)
         await asyncio.sleep(INTERVAL_SEC)
 
 if __name__ == "__main__":
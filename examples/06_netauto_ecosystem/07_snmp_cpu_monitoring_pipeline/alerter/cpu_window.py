@@ -0,0 +1,166 @@
+"""
+Per-device CPU sample windows for N-of-M / hysteresis / moving-average rules.
+
+All devices share a few flat `array` buffers (one fixed-size ring per device
+and per buffer, addressed by slot * ring size), so memory is a handful of
+contiguous blocks instead of one deque per device. Aggregates are updated
+incrementally when a sample is added (running sum for the moving average,
+running breach/clear counts for N-of-M), so adding a sample and reading its
+verdict is O(1) and a pass over 10k devices never rescans windows.
+
+For each new sample:
+  value    = mean of the last avg_samples samples (the sample itself if 1)
+  breaches = how many of the last `window` values are >= threshold
+  clears   = how many of the last `window` values are <  clear_threshold
+
+The alerter raises when breaches >= n and clears when clears >= clear_n, with
+clear_threshold <= threshold giving hysteresis. clear_n = max(n, window - n + 1):
+at that many clears no n of the window can still breach, so a raise and a
+clear never hold together (with n = 2 of 5 and clears >= 2, a steady high
+device would flap ALERT/RECOVERY). n = window = avg_samples = 1 and
+clear_threshold = threshold is the plain single-sample rule.
+"""
+
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class AlertRule:
+    threshold: float
+    clear_threshold: float
+    n: int = 1
+    window: int = 1
+    avg_samples: int = 1
+
+    def __post_init__(self) -> None:
+        if not 1 <= self.n <= self.window:
+            raise ValueError(f"alert rule needs 1 <= n ({self.n}) <= window ({self.window})")
+        if self.avg_samples < 1:
+            raise ValueError("avg_samples must be >= 1")
+        if self.clear_threshold > self.threshold:
+            raise ValueError(f"clear threshold {self.clear_threshold} is above the alert "
+                             f"threshold {self.threshold}")
+
+    @property
+    def clear_n(self) -> int:
+        return max(self.n, self.window - self.n + 1)
+
+    @property
+    def is_single_sample(self) -> bool:
+        return (self.window == 1 and self.avg_samples == 1
+                and self.clear_threshold == self.threshold)
+
+    def describe(self) -> str:
+        value = "cpu" if self.avg_samples == 1 else f"avg{self.avg_samples}(cpu)"
+        return (f"{value} >= {self.threshold:g} in {self.n}/{self.window} raises, "
+                f"{value} < {self.clear_threshold:g} in {self.clear_n}/{self.window} clears")
+
+    def status(self, verdict: "Verdict", alarm_active: bool) -> str:
+        """HIGH/OK for a verdict; between the raise and clear rules the alarm holds."""
+        if alarm_active:
+            return "OK" if verdict.clears >= self.clear_n else "HIGH"
+        return "HIGH" if verdict.breaches >= self.n else "OK"
+
+
+@dataclass(frozen=True)
+class Verdict:
+    value: float        # the (averaged) value the thresholds were applied to
+    breaches: int       # of the last `samples` values, how many were >= threshold
+    clears: int         # ... and how many were < clear_threshold
+    samples: int        # values in the N-of-M window so far (<= window)
+
+
+class CpuWindows:
+    def __init__(self, rule: AlertRule, capacity: int = 1024) -> None:
+        self.rule = rule
+        self.capacity = 0
+        self._slots: dict[str, int] = {}
+        self._free: list[int] = []
+        self._samples = array("d")   # avg_samples per slot: raw cpu ring
+        self._breach = array("b")    # window per slot: 1 if value >= threshold
+        self._clear = array("b")     # window per slot: 1 if value < clear_threshold
+        self._pos_avg = array("l")
+        self._pos_win = array("l")
+        self._seen = array("l")      # samples added, capped at max(avg_samples, window)
+        self._sum = array("d")
+        self._breaches = array("l")
+        self._clears = array("l")
+        self._grow(max(capacity, 1))
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, ip: str) -> bool:
+        return ip in self._slots
+
+    def _grow(self, capacity: int) -> None:
+        """Append zeroed slots; existing rings keep their offsets."""
+        extra = capacity - self.capacity
+        for arr, per_slot in ((self._samples, self.rule.avg_samples),
+                              (self._breach, self.rule.window),
+                              (self._clear, self.rule.window),
+                              (self._pos_avg, 1), (self._pos_win, 1), (self._seen, 1),
+                              (self._sum, 1), (self._breaches, 1), (self._clears, 1)):
+            arr.frombytes(bytes(extra * per_slot * arr.itemsize))
+        self._free.extend(range(capacity - 1, self.capacity - 1, -1))
+        self.capacity = capacity
+
+    def _slot_for(self, ip: str) -> int:
+        slot = self._slots.get(ip)
+        if slot is None:
+            if not self._free:
+                self._grow(self.capacity * 2)
+            slot = self._slots[ip] = self._free.pop()
+        return slot
+
+    def add(self, ip: str, cpu: float) -> Verdict:
+        rule = self.rule
+        i = self._slot_for(ip)
+        seen = self._seen[i]
+
+        # moving average over the raw samples
+        avg = rule.avg_samples
+        k = i * avg + self._pos_avg[i]
+        if seen >= avg:
+            self._sum[i] -= self._samples[k]
+        self._samples[k] = cpu
+        self._sum[i] += cpu
+        self._pos_avg[i] = (self._pos_avg[i] + 1) % avg
+        value = self._sum[i] / min(seen + 1, avg)
+
+        # N-of-M counts over the (averaged) values
+        win = rule.window
+        k = i * win + self._pos_win[i]
+        if seen >= win:
+            self._breaches[i] -= self._breach[k]
+            self._clears[i] -= self._clear[k]
+        breach = 1 if value >= rule.threshold else 0
+        clear = 1 if value < rule.clear_threshold else 0
+        self._breach[k] = breach
+        self._clear[k] = clear
+        self._breaches[i] += breach
+        self._clears[i] += clear
+        self._pos_win[i] = (self._pos_win[i] + 1) % win
+
+        self._seen[i] = min(seen + 1, max(avg, win))
+        return Verdict(value, self._breaches[i], self._clears[i], min(seen + 1, win))
+
+    def release(self, ip: str) -> None:
+        i = self._slots.pop(ip, None)
+        if i is None:
+            return
+        avg, win = self.rule.avg_samples, self.rule.window
+        self._samples[i * avg:(i + 1) * avg] = array("d", bytes(8 * avg))
+        self._breach[i * win:(i + 1) * win] = array("b", bytes(win))
+        self._clear[i * win:(i + 1) * win] = array("b", bytes(win))
+        for arr in (self._pos_avg, self._pos_win, self._seen, self._sum,
+                    self._breaches, self._clears):
+            arr[i] = 0
+        self._free.append(i)
+
+    def retain(self, ips: set[str]) -> None:
+        for ip in [ip for ip in self._slots if ip not in ips]:
+            self.release(ip)
@@ -0,0 +1,220 @@
+"""
+Asynchronous, pooled SMTP delivery for the alerter.
+
+evaluate_snapshot() only submits a Notification; a single background task
+sends the mail, so a slow or dead relay never stalls snapshot processing.
+
+- one SMTP connection is kept open and reused for every message; it is
+  closed after idle_sec without mail and reopened on demand (also when the
+  relay dropped it in between)
+- smtplib is blocking, so each send runs in asyncio.to_thread(); there is
+  never more than one send in flight
+- temporary failures (connection errors, 4xx) are retried with exponential
+  backoff; permanent ones (5xx, refused recipients) are not
+- the queue is bounded: when it is full the notification is dropped and
+  reported as such
+
+Digest modes:
+  off    one mail per notification (the original behaviour)
+  cycle  everything submitted during one alerter pass is folded into one mail
+  site   as cycle, but one mail per site
+"""
+
+from __future__ import annotations
+
+import asyncio
+import smtplib
+import time
+from dataclasses import dataclass, field
+from email.message import EmailMessage
+from typing import Callable
+
+DIGEST_MODES = ("off", "cycle", "site")
+ACTION_ORDER = ("ALERT", "REMINDER", "RECOVERY")
+
+
+@dataclass(frozen=True)
+class Notification:
+    ip: str
+    site: str
+    action: str
+    subject: str
+    body: str
+    cpu_txt: str = ""
+    snap_ts: str = ""
+
+
+@dataclass
+class Outgoing:
+    subject: str
+    body: str
+    notifications: list[Notification] = field(default_factory=list)
+
+    @property
+    def is_digest(self) -> bool:
+        return len(self.notifications) != 1
+
+
+# (outgoing, result "sent"|"failed"|"dropped", seconds spent, last error)
+ResultCallback = Callable[[Outgoing, str, float, Exception | None], None]
+
+
+def is_permanent(err: Exception) -> bool:
+    if isinstance(err, (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused)):
+        return True
+    return isinstance(err, smtplib.SMTPResponseException) and err.smtp_code >= 500
+
+
+class MailQueue:
+    def __init__(self, host: str, port: int, mail_from: str, mail_to: str,
+                 digest: str = "off", max_queue: int = 1000, max_attempts: int = 5,
+                 backoff_sec: float = 2.0, backoff_max_sec: float = 60.0,
+                 idle_sec: float = 30.0, timeout: float = 10.0,
+                 on_result: ResultCallback | None = None) -> None:
+        if digest not in DIGEST_MODES:
+            raise ValueError(f"unsupported mail digest mode: {digest!r}")
+        self.host = host
+        self.port = port
+        self.mail_from = mail_from
+        self.mail_to = mail_to
+        self.digest = digest
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_sec = backoff_sec
+        self.backoff_max_sec = backoff_max_sec
+        self.idle_sec = idle_sec
+        self.timeout = timeout
+        self.on_result = on_result
+        self._queue: asyncio.Queue[Outgoing] = asyncio.Queue(maxsize=max_queue)
+        self._pending: list[Notification] = []
+        self._smtp: smtplib.SMTP | None = None
+        self._task: asyncio.Task | None = None
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.dropped = 0
+        self.connections = 0
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    # ----------------------------
+    # Producer side (called from evaluate_snapshot / the main loop)
+    # ----------------------------
+    def submit(self, n: Notification) -> None:
+        if self.digest == "off":
+            self._enqueue(Outgoing(n.subject, n.body, [n]))
+        else:
+            self._pending.append(n)
+
+    def end_cycle(self) -> int:
+        """Fold this pass's notifications into digest mails; returns the number queued."""
+        if self.digest == "off" or not self._pending:
+            return 0
+        groups: dict[str, list[Notification]] = {}
+        for n in self._pending:
+            key = (n.site or "(no site)") if self.digest == "site" else ""
+            groups.setdefault(key, []).append(n)
+        self._pending = []
+        for site, items in sorted(groups.items()):
+            self._enqueue(self._digest(site, items))
+        return len(groups)
+
+    def _digest(self, site: str, items: list[Notification]) -> Outgoing:
+        counts = {a: sum(1 for n in items if n.action == a) for a in ACTION_ORDER}
+        summary = ", ".join(f"{c} {a}" for a, c in counts.items() if c)
+        subject = f"[SNMP CPU] DIGEST {summary}" + (f" site={site}" if site else "")
+        parts = [f"{len(items)} notification(s)" + (f" for site {site}" if site else ""), ""]
+        for n in items:
+            parts += [n.subject, n.body, ""]
+        return Outgoing(subject, "\n".join(parts), items)
+
+    def _enqueue(self, out: Outgoing) -> None:
+        try:
+            self._queue.put_nowait(out)
+        except asyncio.QueueFull:
+            self.dropped += len(out.notifications)
+            if self.on_result is not None:
+                self.on_result(out, "dropped", 0.0, None)
+
+    # ----------------------------
+    # Delivery task
+    # ----------------------------
+    def _connect(self) -> smtplib.SMTP:
+        if self._smtp is None:
+            self._smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            self.connections += 1
+        return self._smtp
+
+    def _close(self) -> None:
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            self._smtp.close()
+        self._smtp = None
+
+    def _send_sync(self, msg: EmailMessage) -> None:
+        reused = self._smtp is not None
+        try:
+            self._connect().send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            if not reused:
+                raise
+            # the relay closed our idle connection: reconnect once, right away
+            self._close()
+            self._connect().send_message(msg)
+
+    def _message(self, out: Outgoing) -> EmailMessage:
+        msg = EmailMessage()
+        msg["From"] = self.mail_from
+        msg["To"] = self.mail_to
+        msg["Subject"] = out.subject
+        msg.set_content(out.body)
+        return msg
+
+    async def _deliver(self, out: Outgoing) -> None:
+        msg = self._message(out)
+        delay = self.backoff_sec
+        t0 = time.monotonic()
+        err: Exception | None = None
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                await asyncio.to_thread(self._send_sync, msg)
+            except (smtplib.SMTPException, OSError) as e:
+                err = e
+                await asyncio.to_thread(self._close)
+                if is_permanent(e) or attempt == self.max_attempts:
+                    break
+                self.retried += 1
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.backoff_max_sec)
+                continue
+            self.sent += 1
+            if self.on_result is not None:
+                self.on_result(out, "sent", time.monotonic() - t0, None)
+            return
+        self.failed += 1
+        if self.on_result is not None:
+            self.on_result(out, "failed", time.monotonic() - t0, err)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                out = await asyncio.wait_for(self._queue.get(), timeout=self.idle_sec)
+            except asyncio.TimeoutError:
+                if self._smtp is not None:
+                    await asyncio.to_thread(self._close)
+                continue
+            await self._deliver(out)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "queued": self._queue.qsize(),
+            "pending_digest": len(self._pending),
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "dropped": self.dropped,
+            "connections": self.connections,
+        }
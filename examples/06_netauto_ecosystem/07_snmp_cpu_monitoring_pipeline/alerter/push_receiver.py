@@ -0,0 +1,90 @@
+"""
+Push channel from the poller (receiver side).
+
+Listens on a Unix domain socket; every poller worker connects and streams
+snapshot records (poller/push_publisher.py owns the other end; keep the
+framing in sync):
+
+  record = length u32 (big-endian) | UTF-8 JSON object
+           {"timestamp_utc": ..., "ip": ..., "cpu_percent": <int|null>,
+            "quarantined": <bool>}
+
+Each record is handed to `on_record` before the next one is read, so when the
+alerter falls behind the socket buffer fills up and the poller's writer waits
+in drain(): back-pressure comes from the kernel, nothing is buffered here.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import stat
+import struct
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+LENGTH = struct.Struct(">I")
+MAX_RECORD = 64 * 1024
+
+log = logging.getLogger("alerter.push")
+
+
+class PushReceiver:
+    def __init__(self, path: str | Path, on_record: Callable[[dict[str, Any]], None]) -> None:
+        self.path = Path(path)
+        self.on_record = on_record
+        self._server: asyncio.AbstractServer | None = None
+        self.clients = 0
+        self.records = 0
+        self.bad_records = 0
+        self.last_record_mono: float | None = None
+
+    async def start(self) -> None:
+        try:
+            if stat.S_ISSOCK(os.stat(self.path).st_mode):
+                os.unlink(self.path)      # left behind by a previous run
+        except FileNotFoundError:
+            pass
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._server = await asyncio.start_unix_server(self._handle, str(self.path))
+
+    def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.clients += 1
+        log.info("poller connected (clients=%d)", self.clients)
+        try:
+            while True:
+                (size,) = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+                if size > MAX_RECORD:
+                    log.info("record of %d bytes exceeds %d, dropping connection",
+                             size, MAX_RECORD)
+                    return
+                payload = await reader.readexactly(size)
+                try:
+                    record = json.loads(payload)
+                except ValueError:
+                    self.bad_records += 1
+                    continue
+                if not isinstance(record, dict):
+                    self.bad_records += 1
+                    continue
+                self.records += 1
+                self.last_record_mono = time.monotonic()
+                self.on_record(record)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.clients -= 1
+            log.info("poller disconnected (clients=%d)", self.clients)
+            writer.close()
@@ -0,0 +1,171 @@
+"""
+Memory-mapped latest-snapshot table (reader side).
+
+Reads the table the poller maintains (poller/snapshot_table.py owns the
+layout; keep both in sync):
+  header, 64 bytes:  magic "CPUSNAP1" | version u32 | slot_size u32 | capacity u32
+  slot,   64 bytes:  seq u64 | ts_epoch f64 | cpu i32 | flags u32 | ip 40s
+
+Slots are decoded straight out of the mapping with struct.unpack_from (no
+file reads, no JSON). seq is a seqlock: odd means the poller is mid-write,
+and a changed seq after the copy means the copy is torn, so the slot is
+re-read (a few times at most, then skipped until the next cycle).
+
+A sharded poller writes one table per shard (latest.<shard>.tbl next to
+latest.tbl); SnapshotTableSet reads all of them and keeps the newest record
+per IP, so a device that just moved between shards is reported once.
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+MAGIC = b"CPUSNAP1"
+VERSION = 1
+
+HEADER = struct.Struct("<8sIII")
+HEADER_SIZE = 64
+SLOT = struct.Struct("<QdiI40s")
+SLOT_SIZE = SLOT.size
+SEQ = struct.Struct("<Q")
+
+FLAG_IN_USE = 0x1
+FLAG_CPU_VALID = 0x2
+FLAG_QUARANTINED = 0x4
+
+READ_RETRIES = 4
+
+
+@dataclass(frozen=True)
+class SnapshotRecord:
+    ip: str
+    seq: int
+    ts_epoch: float
+    cpu: int | None
+    flags: int
+
+    def as_snapshot(self) -> dict[str, Any]:
+        """Same shape as latest/<ip>.json, so the alerter logic does not care about the source."""
+        ts = datetime.fromtimestamp(self.ts_epoch, timezone.utc).isoformat(timespec="seconds")
+        return {"timestamp_utc": ts, "ip": self.ip, "cpu_percent": self.cpu,
+                "quarantined": bool(self.flags & FLAG_QUARANTINED)}
+
+
+class SnapshotTableReader:
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self._mm: mmap.mmap | None = None
+        self._ino: int | None = None
+        self.capacity = 0
+        self.torn_reads = 0
+
+    def available(self) -> bool:
+        return self.path.exists()
+
+    def _remap_if_needed(self) -> bool:
+        """(Re)map when the poller created or grew (replaced) the table."""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            self.close()
+            return False
+        if self._mm is not None and st.st_ino == self._ino:
+            return True
+
+        self.close()
+        with open(self.path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, slot_size, capacity = HEADER.unpack_from(mm, 0)
+        if magic != MAGIC or version != VERSION or slot_size != SLOT_SIZE:
+            mm.close()
+            raise ValueError(f"{self.path}: not a v{VERSION} snapshot table")
+        self.capacity = min(capacity, (len(mm) - HEADER_SIZE) // SLOT_SIZE)
+        self._mm, self._ino = mm, st.st_ino
+        return True
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+        self._mm = None
+        self._ino = None
+
+    def _read_slot(self, off: int) -> tuple | None:
+        assert self._mm is not None
+        for _ in range(READ_RETRIES):
+            (seq1,) = SEQ.unpack_from(self._mm, off)
+            if seq1 & 1:
+                continue
+            rec = SLOT.unpack_from(self._mm, off)
+            (seq2,) = SEQ.unpack_from(self._mm, off)
+            if rec[0] == seq1 == seq2:
+                return rec
+        self.torn_reads += 1
+        return None
+
+    def read_all(self) -> list[SnapshotRecord]:
+        """Every in-use slot with a consistent copy; empty list when there is no table."""
+        if not self._remap_if_needed():
+            return []
+        out = []
+        for i in range(self.capacity):
+            rec = self._read_slot(HEADER_SIZE + i * SLOT_SIZE)
+            if rec is None:
+                continue
+            seq, ts_epoch, cpu, flags, raw_ip = rec
+            if not flags & FLAG_IN_USE:
+                continue
+            out.append(SnapshotRecord(
+                ip=raw_ip.rstrip(b"\0").decode("ascii", "replace"),
+                seq=seq,
+                ts_epoch=ts_epoch,
+                cpu=cpu if flags & FLAG_CPU_VALID else None,
+                flags=flags,
+            ))
+        return out
+
+
+class SnapshotTableSet:
+    """Fan-in over latest.tbl and every latest.<shard>.tbl next to it."""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self._readers: dict[Path, SnapshotTableReader] = {}
+        self._torn_retired = 0
+
+    def paths(self) -> list[Path]:
+        shards = sorted(self.path.parent.glob(f"{self.path.stem}.*{self.path.suffix}"))
+        return ([self.path] if self.path.exists() else []) + shards
+
+    def available(self) -> bool:
+        return bool(self.paths())
+
+    @property
+    def torn_reads(self) -> int:
+        return self._torn_retired + sum(r.torn_reads for r in self._readers.values())
+
+    def read_all(self) -> list[SnapshotRecord]:
+        paths = self.paths()
+        for gone in [p for p in self._readers if p not in paths]:
+            reader = self._readers.pop(gone)
+            self._torn_retired += reader.torn_reads
+            reader.close()
+        newest: dict[str, SnapshotRecord] = {}
+        for p in paths:
+            reader = self._readers.get(p)
+            if reader is None:
+                reader = self._readers[p] = SnapshotTableReader(p)
+            try:
+                records = reader.read_all()
+            except ValueError:
+                continue   # not a snapshot table (or one being created)
+            for rec in records:
+                cur = newest.get(rec.ip)
+                if cur is None or rec.ts_epoch > cur.ts_epoch:
+                    newest[rec.ip] = rec
+        return list(newest.values())
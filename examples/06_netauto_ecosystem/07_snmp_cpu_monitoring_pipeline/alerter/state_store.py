@@ -0,0 +1,141 @@
+"""
+Alerter state: in memory, checkpointed to one SQLite database in WAL mode.
+
+The alerter reads and updates per-device state in a dict. Changed rows are
+marked dirty and written by checkpoint() in a single transaction (one WAL
+append + one fsync at most, instead of one file replace per device). On
+start the table is loaded back into memory, so a restart resumes with the
+same alarm_active / last_alert_ts and does not re-send ALERTs.
+
+import_json_dir() performs the one-time migration from the old
+state/<ip>.json files; it records that it ran in the meta table and does
+nothing afterwards.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+from pathlib import Path
+from typing import Any
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS device_state (
+    ip            TEXT PRIMARY KEY,
+    status        TEXT NOT NULL,
+    alarm_active  INTEGER NOT NULL,
+    last_alert_ts TEXT,
+    quarantined   INTEGER NOT NULL DEFAULT 0,
+    updated_ts    TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+FIELDS = ("ip", "status", "alarm_active", "last_alert_ts", "quarantined", "updated_ts")
+META_JSON_IMPORTED = "json_state_imported_from"
+
+
+def _from_row(row: tuple) -> dict[str, Any]:
+    state = dict(zip(FIELDS, row))
+    state["alarm_active"] = bool(state["alarm_active"])
+    state["quarantined"] = bool(state["quarantined"])
+    return state
+
+
+class StateStore:
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.path, isolation_level=None)   # explicit BEGIN/COMMIT
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")   # durable at checkpoint, not per row
+        self._db.executescript(SCHEMA)
+        self._states: dict[str, dict[str, Any]] = {}
+        self._dirty: set[str] = set()
+        self._load()
+
+    def _load(self) -> None:
+        cur = self._db.execute(f"SELECT {', '.join(FIELDS)} FROM device_state")
+        self._states = {row[0]: _from_row(row) for row in cur}
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def get(self, ip: str) -> dict[str, Any] | None:
+        return self._states.get(ip)
+
+    def put(self, state: dict[str, Any]) -> None:
+        ip = str(state["ip"])
+        self._states[ip] = {k: state.get(k) for k in FIELDS}
+        self._dirty.add(ip)
+
+    @property
+    def dirty(self) -> int:
+        return len(self._dirty)
+
+    def checkpoint(self) -> int:
+        """Write every dirty row in one transaction; returns the number of rows written."""
+        if not self._dirty:
+            return 0
+        rows = [
+            (s["ip"], s["status"], int(bool(s["alarm_active"])), s["last_alert_ts"],
+             int(bool(s["quarantined"])), s["updated_ts"])
+            for s in (self._states[ip] for ip in sorted(self._dirty))
+        ]
+        self._db.execute("BEGIN")
+        try:
+            self._db.executemany(
+                f"INSERT OR REPLACE INTO device_state ({', '.join(FIELDS)}) "
+                f"VALUES ({', '.join('?' * len(FIELDS))})",
+                rows,
+            )
+            self._db.execute("COMMIT")
+        except Exception:
+            self._db.execute("ROLLBACK")
+            raise
+        self._dirty.clear()
+        return len(rows)
+
+    def import_json_dir(self, state_dir: str | Path) -> int | None:
+        """
+        Import state/<ip>.json files once. Returns the number of imported
+        devices, or None when the import already ran. Rows already in the
+        database win over the JSON files.
+        """
+        done = self._db.execute("SELECT value FROM meta WHERE key = ?",
+                                (META_JSON_IMPORTED,)).fetchone()
+        if done:
+            return None
+        imported = 0
+        for path in sorted(Path(state_dir).glob("*.json")):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if not isinstance(data, dict) or not data.get("ip"):
+                continue
+            ip = str(data["ip"])
+            if ip in self._states:
+                continue
+            self.put({
+                "ip": ip,
+                "status": str(data.get("status") or "UNKNOWN"),
+                "alarm_active": bool(data.get("alarm_active", False)),
+                "last_alert_ts": data.get("last_alert_ts") if isinstance(
+                    data.get("last_alert_ts"), str) else None,
+                "quarantined": bool(data.get("quarantined", False)),
+                "updated_ts": data.get("updated_ts"),
+            })
+            imported += 1
+        self.checkpoint()
+        self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                         (META_JSON_IMPORTED, str(state_dir)))
+        return imported
+
+    def close(self) -> None:
+        self.checkpoint()
+        self._db.close()
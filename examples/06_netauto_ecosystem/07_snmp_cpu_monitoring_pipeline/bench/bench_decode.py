@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: varbind decoding with prettyPrint() vs snmp_values.py.
+
+Decodes a response-shaped list of (ObjectName, value) varbinds -- the mix a
+poll sees: Integer/Gauge32 CPU values, Counter64, TimeTicks, a DisplayString
+number and noSuchInstance/noSuchObject -- with both paths and checks they
+agree before timing them:
+
+  text:  val.prettyPrint().strip(), "No Such" prefix check, int()
+  typed: snmp_values.decode_int(val)
+
+plus the OID side (index of the last sub-identifier):
+
+  text:  int(oid.prettyPrint().rsplit(".", 1)[-1])
+  typed: snmp_values.oid_tuple(oid)[-1]
+
+  python bench_decode.py --varbinds 10000 --repeat 5 [--json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "poller"))
+
+from pysnmp.proto import rfc1902, rfc1905  # noqa: E402
+
+from snmp_values import decode_int, oid_tuple  # noqa: E402
+
+CPU_OID = "1.3.6.1.4.1.9.9.109.1.1.1.1.{}.{}"
+
+
+def text_int(val: Any) -> int | None:
+    """The poller's decode before snmp_values.py."""
+    text = val.prettyPrint().strip()
+    if text.startswith("No Such"):
+        return None
+    try:
+        return int(text)
+    except ValueError:
+        return None
+
+
+def text_index(oid: Any) -> int:
+    return int(oid.prettyPrint().rsplit(".", 1)[-1])
+
+
+def typed_index(oid: Any) -> int:
+    return oid_tuple(oid)[-1]
+
+
+def make_varbinds(n: int, seed: int) -> list[tuple[Any, Any]]:
+    rng = random.Random(seed)
+    makers: list[Callable[[], Any]] = [
+        lambda: rfc1902.Integer(rng.randint(0, 100)),
+        lambda: rfc1902.Gauge32(rng.randint(0, 100)),
+        lambda: rfc1902.Gauge32(rng.randint(0, 2**32 - 1)),
+        lambda: rfc1902.Counter64(rng.randint(0, 2**64 - 1)),
+        lambda: rfc1902.TimeTicks(rng.randint(0, 2**32 - 1)),
+        lambda: rfc1902.OctetString(str(rng.randint(0, 100))),
+        lambda: rfc1905.NoSuchInstance(),
+        lambda: rfc1905.NoSuchObject(),
+    ]
+    weights = [30, 30, 10, 10, 10, 4, 3, 3]
+    return [(rfc1902.ObjectName(CPU_OID.format(rng.randint(6, 8), rng.randint(1, 64))),
+             rng.choices(makers, weights)[0]())
+            for _ in range(n)]
+
+
+def best_ns(fn: Callable[[Any], Any], items: list[Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for item in items:
+            fn(item)
+        best = min(best, time.perf_counter() - t0)
+    return best / len(items) * 1e9
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Compare prettyPrint and typed varbind decoding.")
+    ap.add_argument("--varbinds", type=int, default=10_000)
+    ap.add_argument("--repeat", type=int, default=5, help="runs per path, best one counts")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--json", action="store_true", help="print the result as JSON")
+    args = ap.parse_args()
+
+    varbinds = make_varbinds(args.varbinds, args.seed)
+    oids = [oid for oid, _ in varbinds]
+    vals = [val for _, val in varbinds]
+    mismatches = sum(text_int(v) != decode_int(v) for v in vals)
+    mismatches += sum(text_index(o) != typed_index(o) for o in oids)
+    if mismatches:
+        print(f"bench_decode: {mismatches} varbind(s) decode differently", file=sys.stderr)
+        return 1
+
+    result = {"varbinds": args.varbinds}
+    for name, old, new, items in (("value", text_int, decode_int, vals),
+                                  ("index", text_index, typed_index, oids)):
+        text_ns = best_ns(old, items, args.repeat)
+        typed_ns = best_ns(new, items, args.repeat)
+        result[name] = {"text_ns": round(text_ns, 1), "typed_ns": round(typed_ns, 1),
+                        "speedup": round(text_ns / typed_ns, 2)}
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return 0
+    print(f"{args.varbinds} varbinds, best of {args.repeat}")
+    for name in ("value", "index"):
+        r = result[name]
+        print(f"  {name:<6} prettyPrint {r['text_ns']:8.1f} ns   typed {r['typed_ns']:8.1f} ns   "
+              f"x{r['speedup']:.2f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
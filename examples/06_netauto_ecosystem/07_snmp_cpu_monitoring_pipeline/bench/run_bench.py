@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark: the real poller against simulated devices.
+
+For every fleet size (default 100, 1000, 10000) the runner
+
+  1. starts snmp_sim.py, split over several processes for large fleets
+  2. writes a devices.json for them and starts poller/poller.py on it
+     (own history, snapshot table and /metrics port in a scratch directory;
+     push channel off)
+  3. warms up until every device was polled once (engine discovery, session
+     cache fill) or --warmup-sec passed, then measures --cycles intervals from
+     the poller's /metrics and /proc
+
+and reports per size:
+
+  cycle_s        snmp_poller_cycle_seconds at the end (flush to flush; the
+                 slowest worker with --workers)
+  polls_s        completed polls per second, next to the target N / INTERVAL_SEC
+                 ("saturated" when it stays below 95% of the target)
+  ok_pct         share of polls that got an answer
+  poll_p50/p95   per-device poll latency (histogram buckets, upper bounds)
+  lag_p95        schedule lag (deadline to poll start)
+  cpu_ms/poll    poller CPU time (user + system, all workers) per completed poll
+  rss_mb         peak resident memory of the poller (all workers)
+  sim_cpu        cores the simulator used (if close to its process count, the
+                 simulator, not the poller, is the bottleneck)
+
+  python run_bench.py --sizes 100,1000 --interval 10 --cycles 3 --json out.json
+  python run_bench.py --baseline out.json --tolerance 0.2   # exit 1 on regression
+  python run_bench.py --profiles ../shared/poll_profiles.example.json --profile cisco_cpu_mem
+
+Linux only (loopback addresses, /proc).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import re
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+
+from snmp_sim import device_address
+
+BENCH_DIR = Path(__file__).resolve().parent
+POLLER = BENCH_DIR.parent / "poller" / "poller.py"
+SIM = BENCH_DIR / "snmp_sim.py"
+
+CLK_TCK = os.sysconf("SC_CLK_TCK")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+SAMPLE = re.compile(r"^([a-zA-Z_:][\w:]*)(\{[^}]*\})?\s+(\S+)$")
+
+# result key -> (better when "higher"/"lower", unit) for the regression check
+CHECKED = {
+    "polls_s": ("higher", "/s"),
+    "cpu_ms_per_poll": ("lower", "ms"),
+    "rss_mb": ("lower", "MB"),
+    "poll_p95_ms": ("lower", "ms"),
+}
+
+
+# ----------------------------
+# Process and metrics probes
+# ----------------------------
+def cpu_seconds(pid: int) -> float:
+    with open(f"/proc/{pid}/stat", "r") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / CLK_TCK     # utime + stime
+
+
+def rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/statm", "r") as f:
+        return int(f.read().split()[1]) * PAGE_SIZE / 2**20
+
+
+def process_tree(pid: int) -> list[int]:
+    """pid and its direct children (the poller's workers with POLLER_WORKERS > 1)."""
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children", "r") as f:
+            return [pid, *(int(c) for c in f.read().split())]
+    except OSError:
+        return [pid]
+
+
+def tree_sum(pids: list[int], probe) -> float:
+    out = 0.0
+    for pid in pids:
+        try:
+            out += probe(pid)
+        except OSError:
+            pass            # worker restarting
+    return out
+
+
+def scrape(ports: list[int]) -> dict[str, list[tuple[str, float]]]:
+    """Samples of every worker's /metrics, concatenated per metric name."""
+    out: dict[str, list[tuple[str, float]]] = {}
+    for port in ports:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as resp:
+            text = resp.read().decode("utf-8")
+        for line in text.splitlines():
+            m = SAMPLE.match(line)
+            if m:
+                out.setdefault(m.group(1), []).append((m.group(2) or "", float(m.group(3))))
+    return out
+
+
+def total(metrics: dict, name: str, label: str = "") -> float:
+    return sum(v for labels, v in metrics.get(name, []) if label in labels)
+
+
+def maximum(metrics: dict, name: str) -> float:
+    return max((v for _, v in metrics.get(name, [])), default=0.0)
+
+
+def histogram_quantile(before: dict, after: dict, name: str, q: float,
+                       label: str = "") -> float | None:
+    """Upper bound of the bucket holding quantile q of the observations between two scrapes."""
+    def buckets(m: dict) -> dict[float, float]:
+        acc: dict[float, float] = {}
+        for labels, v in m.get(f"{name}_bucket", []):
+            if label not in labels:
+                continue
+            le = re.search(r'le="([^"]+)"', labels)
+            bound = math.inf if le.group(1) == "+Inf" else float(le.group(1))
+            acc[bound] = acc.get(bound, 0.0) + v
+        return acc
+    b0, b1 = buckets(before), buckets(after)
+    delta = sorted((bound, b1[bound] - b0.get(bound, 0.0)) for bound in b1)
+    if not delta or delta[-1][1] <= 0:
+        return None
+    rank = q * delta[-1][1]
+    for bound, cum in delta:
+        if cum >= rank:
+            return bound
+    return math.inf
+
+
+def wait_for(predicate, timeout: float, what: str) -> None:
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if predicate():
+            return
+        time.sleep(0.2)
+    raise RuntimeError(f"timed out waiting for {what}")
+
+
+def stop(procs: list[subprocess.Popen]) -> None:
+    for p in procs:
+        if p.poll() is None:
+            p.send_signal(signal.SIGTERM)
+    for p in procs:
+        try:
+            p.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            p.kill()
+
+
+# ----------------------------
+# One fleet size
+# ----------------------------
+def run_size(n: int, args: argparse.Namespace, workdir: Path) -> dict:
+    workdir.mkdir(parents=True, exist_ok=True)
+    devices = [{"site": f"sim{i % 4}", "ip": device_address(i), "port": args.port}
+               for i in range(n)]
+    devices_file = workdir / "devices.json"
+    devices_file.write_text(json.dumps(devices), encoding="utf-8")
+
+    sims: list[subprocess.Popen] = []
+    sim_logs: list[Path] = []
+    per_proc = max(1, args.sim_devices_per_proc)
+    for first in range(0, n, per_proc):
+        log_path = workdir / f"sim{first // per_proc}.log"
+        sim_logs.append(log_path)
+        cmd = [sys.executable, "-W", "ignore", str(SIM), "--first", str(first),
+               "--devices", str(min(per_proc, n - first)), "--port", str(args.port),
+               "--pattern", args.pattern, "--latency-ms", str(args.latency_ms),
+               "--jitter-ms", str(args.jitter_ms), "--loss", str(args.loss),
+               "--error-rate", str(args.error_rate), "--dead", str(args.dead)]
+        if args.script:
+            cmd += ["--script", args.script]
+        sims.append(subprocess.Popen(cmd, stdout=open(log_path, "w"), stderr=subprocess.STDOUT))
+
+    poller: subprocess.Popen | None = None
+    try:
+        wait_for(lambda: all("device(s)" in p.read_text() for p in sim_logs), 120,
+                 "the simulator to bind its addresses")
+        env = {
+            **os.environ,
+            "DEVICES_FILE": str(devices_file),
+            "POLL_PROFILES_FILE": args.profiles or "",
+            "POLL_PROFILE": args.profile or "cpu",
+            "CSV_FILE": str(workdir / "cpu.csv"),
+            "SNAPSHOT_TABLE": str(workdir / "latest.tbl"),
+            "TABLE_CSV_FILE": str(workdir / "table.csv"),
+            "TABLE_SNAPSHOT": str(workdir / "latest_tables.json"),
+            "LATEST_DIR": str(workdir / "latest"),
+            "PUSH_SOCKET": "",
+            "INTERVAL_SEC": str(args.interval),
+            "CONCURRENCY_LIMIT": str(args.concurrency),
+            "METRICS_HOST": "127.0.0.1",
+            "METRICS_PORT": str(args.metrics_port),
+            "POLLER_WORKERS": str(args.workers),
+            "PYTHONWARNINGS": "ignore",
+        }
+        poller = subprocess.Popen([sys.executable, str(POLLER)], env=env, cwd=workdir,
+                                  stdout=open(workdir / "poller.log", "w"),
+                                  stderr=subprocess.STDOUT)
+
+        ports = [args.metrics_port + i for i in range(max(1, args.workers))]
+
+        def serving() -> bool:
+            if poller.poll() is not None:
+                tail = (workdir / "poller.log").read_text()[-2000:]
+                raise RuntimeError(f"poller exited:\n{tail}")
+            try:
+                scrape(ports)
+            except OSError:
+                return False
+            return True
+        wait_for(serving, 60, "the poller's /metrics endpoint")
+
+        # warm-up: every device polled once (discovery, sessions), bounded
+        warm_end = time.monotonic() + args.warmup_sec
+        while (time.monotonic() < warm_end
+               and total(scrape(ports), "snmp_poller_polls_total") < n):
+            time.sleep(1.0)
+
+        pids = process_tree(poller.pid)
+        m0 = scrape(ports)
+        c0, s0, t0 = tree_sum(pids, cpu_seconds), tree_sum([p.pid for p in sims], cpu_seconds), time.monotonic()
+        peak = tree_sum(pids, rss_mb)
+        end = t0 + args.cycles * args.interval
+        while time.monotonic() < end:
+            time.sleep(1.0)
+            peak = max(peak, tree_sum(pids, rss_mb))
+        m1 = scrape(ports)
+        c1, s1, t1 = tree_sum(pids, cpu_seconds), tree_sum([p.pid for p in sims], cpu_seconds), time.monotonic()
+    finally:
+        stop([poller] if poller else [])
+        stop(sims)
+
+    polls = total(m1, "snmp_poller_polls_total") - total(m0, "snmp_poller_polls_total")
+    ok = (total(m1, "snmp_poller_polls_total", 'result="ok"')
+          - total(m0, "snmp_poller_polls_total", 'result="ok"'))
+    wall = t1 - t0
+
+    def ms(v: float | None) -> float | None:
+        return None if v is None else round(v * 1000, 1)
+
+    return {
+        "devices": n,
+        "interval_s": args.interval,
+        "workers": max(1, args.workers),
+        "cycle_s": round(maximum(m1, "snmp_poller_cycle_seconds"), 2),
+        "polls_s": round(polls / wall, 1),
+        "target_polls_s": round(n / args.interval, 1),
+        "saturated": polls / wall < 0.95 * n / args.interval,
+        "ok_pct": round(100 * ok / polls, 1) if polls else 0.0,
+        "poll_p50_ms": ms(histogram_quantile(m0, m1, "snmp_poller_poll_duration_seconds", 0.5)),
+        "poll_p95_ms": ms(histogram_quantile(m0, m1, "snmp_poller_poll_duration_seconds", 0.95)),
+        "lag_p95_ms": ms(histogram_quantile(m0, m1, "snmp_poller_schedule_lag_seconds", 0.95)),
+        "cpu_ms_per_poll": round((c1 - c0) * 1000 / polls, 3) if polls else None,
+        "rss_mb": round(peak, 1),
+        "sim_cpu": round((s1 - s0) / wall, 2),
+        "sim_procs": len(sims),
+    }
+
+
+# ----------------------------
+# Report
+# ----------------------------
+COLUMNS = ("devices", "workers", "cycle_s", "polls_s", "target_polls_s", "ok_pct", "poll_p50_ms",
+           "poll_p95_ms", "lag_p95_ms", "cpu_ms_per_poll", "rss_mb", "sim_cpu")
+
+
+def print_results(results: list[dict]) -> None:
+    cells = [[("-" if r.get(c) is None else str(r[c])) for c in COLUMNS] for r in results]
+    widths = [max(len(c), *(len(row[i]) for row in cells)) for i, c in enumerate(COLUMNS)]
+    print("  ".join(c.rjust(w) for c, w in zip(COLUMNS, widths)))
+    for row in cells:
+        print("  ".join(v.rjust(w) for v, w in zip(row, widths)))
+
+
+def regressions(results: list[dict], baseline: list[dict], tolerance: float) -> list[str]:
+    base = {(r["devices"], r.get("workers", 1)): r for r in baseline}
+    out = []
+    for r in results:
+        b = base.get((r["devices"], r["workers"]))
+        if b is None:
+            continue
+        for key, (better, unit) in CHECKED.items():
+            new, old = r.get(key), b.get(key)
+            if new is None or old is None or old == 0:
+                continue
+            worse = new < old * (1 - tolerance) if better == "higher" else new > old * (1 + tolerance)
+            if worse:
+                out.append(f"devices={r['devices']} {key}: {old}{unit} -> {new}{unit} "
+                           f"({(new - old) / old:+.0%})")
+    return out
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Benchmark poller.py against simulated devices.")
+    ap.add_argument("--sizes", default="100,1000,10000", help="comma-separated fleet sizes")
+    ap.add_argument("--interval", type=int, default=30, help="poller INTERVAL_SEC")
+    ap.add_argument("--cycles", type=int, default=2, help="measured intervals per size")
+    ap.add_argument("--concurrency", type=int, default=50, help="poller CONCURRENCY_LIMIT")
+    ap.add_argument("--workers", type=int, default=1, help="poller POLLER_WORKERS")
+    ap.add_argument("--warmup-sec", type=float, default=120,
+                    help="longest wait for the first poll of every device")
+    ap.add_argument("--profiles", help="POLL_PROFILES_FILE for the poller (default: none)")
+    ap.add_argument("--profile",
+                    help="POLL_PROFILE for the poller; required with --profiles "
+                         "(default: built-in cpu)")
+    ap.add_argument("--port", type=int, default=16100, help="simulator UDP port")
+    ap.add_argument("--metrics-port", type=int, default=19108)
+    ap.add_argument("--sim-devices-per-proc", type=int, default=2500)
+    ap.add_argument("--pattern", default="sine:40,25,600")
+    ap.add_argument("--latency-ms", type=float, default=2.0)
+    ap.add_argument("--jitter-ms", type=float, default=1.0)
+    ap.add_argument("--loss", type=float, default=0.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--dead", type=float, default=0.0)
+    ap.add_argument("--script", help="simulator per-device script (sim_patterns.py)")
+    ap.add_argument("--workdir", help="keep logs and poller output here (default: temp dir)")
+    ap.add_argument("--json", help="write the results to this file")
+    ap.add_argument("--baseline", help="results JSON of a previous run to compare against")
+    ap.add_argument("--tolerance", type=float, default=0.2,
+                    help="allowed relative change before a metric counts as a regression")
+    args = ap.parse_args()
+    if args.profiles:
+        # the poller runs with cwd=workdir: a relative path would not resolve there
+        profiles = Path(args.profiles).resolve()
+        if not profiles.is_file():
+            ap.error(f"--profiles: {profiles} not found")
+        args.profiles = str(profiles)
+        if not args.profile:
+            ap.error("--profiles needs --profile <name> (the profile the devices are polled with)")
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    results = []
+    with tempfile.TemporaryDirectory(prefix="snmp-bench-") as tmp:
+        root = Path(args.workdir) if args.workdir else Path(tmp)
+        for n in sizes:
+            print(f"[bench] {n} device(s): interval={args.interval}s cycles={args.cycles} "
+                  f"concurrency={args.concurrency}", flush=True)
+            try:
+                results.append(run_size(n, args, root / f"n{n}"))
+            except RuntimeError as e:
+                print(f"[bench] {n} device(s): {e}", file=sys.stderr)
+                return 2
+
+    print()
+    print_results(results)
+    for r in results:
+        if r["saturated"]:
+            print(f"[bench] devices={r['devices']}: saturated, {r['polls_s']} polls/s "
+                  f"of {r['target_polls_s']} needed")
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2), encoding="utf-8")
+    if args.baseline:
+        found = regressions(results, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        for line in found:
+            print(f"[bench] REGRESSION {line}")
+        if found:
+            return 1
+        print(f"[bench] no regression beyond {args.tolerance:.0%} against {args.baseline}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""
+Scripted CPU patterns and per-device fault settings for the SNMP simulator.
+
+Pattern specs (all times in seconds, values in percent):
+
+  const:V                     always V
+  sine:BASE,AMP,PERIOD        BASE + AMP * sin(2*pi*t / PERIOD)
+  square:LOW,HIGH,PERIOD[,DUTY]
+                              HIGH for DUTY (default 0.5) of each period, else LOW
+  ramp:FROM,TO,PERIOD         sawtooth from FROM to TO, then back to FROM
+  random:LO,HI                uniform, redrawn on every read
+  spike:BASE,PEAK,EVERY,LEN   BASE, with PEAK for LEN seconds every EVERY seconds
+  steps:V1,V2,...@STEP        V1 for STEP seconds, then V2, ...; repeats
+
+Every device gets its own phase offset so devices on the same pattern do not
+move in lockstep (phase_spread=False aligns them).
+
+Script file (--script, JSON) overrides the command line per device; keys of
+"devices" are an ip or an index range "first-last" (0-based, inclusive):
+
+  {"default": {"pattern": "sine:40,20,600", "latency_ms": 3},
+   "devices": {"0-9": {"pattern": "spike:20,95,300,60"},
+               "127.20.0.42": {"loss": 1.0}}}
+
+Fault settings: latency_ms, jitter_ms (uniform +-), loss (probability a
+request is silently dropped), error_rate (probability of a genErr response),
+dead (true: never answers). cpus sets the number of cpmCPUTotalTable rows.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import random
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Any, Callable
+
+Pattern = Callable[[float], float]
+
+FAULT_FIELDS = ("latency_ms", "jitter_ms", "loss", "error_rate", "dead")
+SETTINGS = ("pattern", "cpus", *FAULT_FIELDS)
+
+
+def _floats(args: str, n_min: int, n_max: int, name: str) -> list[float]:
+    parts = [float(x) for x in args.split(",")] if args else []
+    if not n_min <= len(parts) <= n_max:
+        raise ValueError(f"pattern {name!r} takes {n_min}..{n_max} numbers, got {args!r}")
+    return parts
+
+
+def _clamp(v: float) -> float:
+    return min(max(v, 0.0), 100.0)
+
+
+def parse_pattern(spec: str, phase: float = 0.0, rng: random.Random | None = None) -> Pattern:
+    name, _, args = spec.partition(":")
+    rng = rng or random.Random()
+    if name == "const":
+        (v,) = _floats(args, 1, 1, name)
+        return lambda t: v
+    if name == "sine":
+        base, amp, period = _floats(args, 3, 3, name)
+        return lambda t: _clamp(base + amp * math.sin(2 * math.pi * (t + phase * period) / period))
+    if name == "square":
+        low, high, period, *rest = _floats(args, 3, 4, name)
+        duty = rest[0] if rest else 0.5
+        return lambda t: high if ((t / period + phase) % 1.0) < duty else low
+    if name == "ramp":
+        start, end, period = _floats(args, 3, 3, name)
+        return lambda t: start + (end - start) * ((t / period + phase) % 1.0)
+    if name == "random":
+        lo, hi = _floats(args, 2, 2, name)
+        return lambda t: rng.uniform(lo, hi)
+    if name == "spike":
+        base, peak, every, length = _floats(args, 4, 4, name)
+        return lambda t: peak if ((t + phase * every) % every) < length else base
+    if name == "steps":
+        values, _, step = args.partition("@")
+        levels = _floats(values, 1, 10_000, name)
+        step_sec = float(step or 60)
+        return lambda t: levels[int(t / step_sec + phase * len(levels)) % len(levels)]
+    raise ValueError(f"unknown pattern {name!r} (const, sine, square, ramp, random, spike, steps)")
+
+
+@dataclass(frozen=True)
+class DeviceProfile:
+    pattern: str = "sine:40,25,600"
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    loss: float = 0.0
+    error_rate: float = 0.0
+    dead: bool = False
+    cpus: int = 1
+
+    def merged(self, overrides: dict[str, Any]) -> DeviceProfile:
+        known = {k: v for k, v in overrides.items() if k in SETTINGS}
+        unknown = set(overrides) - set(known)
+        if unknown:
+            raise ValueError(f"unknown simulator setting(s): {sorted(unknown)}")
+        return replace(self, **known)
+
+
+def _in_range(key: str, index: int) -> bool:
+    first, sep, last = key.partition("-")
+    if not sep or not first.isdigit() or not last.isdigit():
+        return False
+    return int(first) <= index <= int(last)
+
+
+def load_script(path: str | Path | None) -> dict[str, Any]:
+    if not path:
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError("simulator script must be a JSON object")
+    return data
+
+
+def profile_for(index: int, ip: str, base: DeviceProfile, script: dict[str, Any]) -> DeviceProfile:
+    """Command-line defaults, then the script's default, then ranges, then the exact ip."""
+    prof = base.merged(script.get("default") or {})
+    devices = script.get("devices") or {}
+    for key, overrides in devices.items():
+        if _in_range(key, index):
+            prof = prof.merged(overrides)
+    if ip in devices:
+        prof = prof.merged(devices[ip])
+    return prof
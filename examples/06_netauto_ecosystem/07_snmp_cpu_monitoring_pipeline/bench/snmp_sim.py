@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+SNMPv3 agent simulator for load-testing the poller.
+
+One process answers SNMPv3 (authPriv) GETs for many simulated devices, each
+on its own loopback address (127.20.0.1, 127.20.0.2, ...; Linux routes all of
+127.0.0.0/8 to lo, nothing to configure) and the same UDP port. Every device
+has a scripted CPU pattern and its own latency, loss and error injection
+(see sim_patterns.py).
+
+Answered OIDs (anything else is noSuchObject):
+
+  1.3.6.1.4.1.9.2.1.56.0 / .57.0 / .58.0          busyPer, avgBusy1, avgBusy5
+  1.3.6.1.4.1.9.9.109.1.1.1.1.{6,7,8}.N          cpmCPUTotal5secRev/1minRev/5minRev
+  1.3.6.1.4.1.9.9.48.1.1.1.{5,6}.1               ciscoMemoryPoolUsed/Free
+  1.3.6.1.2.1.1.3.0                              sysUpTime
+
+The 1-minute and 5-minute values are the pattern averaged over the trailing
+window. cpmCPUTotalTable has --cpus rows (N = 1..cpus, row 1 is the same
+value as busyPer, later rows run the pattern with a time offset). GETs with
+more than --max-oids varbinds get tooBig; GETBULK walks the same OIDs in
+order and, like a real agent, returns at most --max-bulk varbinds. A GET
+naming a --bad-oid is answered noAccess with errIdx pointing at it (or 0
+with --bad-index-zero, like agents that do not fill errIdx).
+
+  python snmp_sim.py --devices 1000 --port 16100 --pattern sine:50,30,300 \\
+      --latency-ms 5 --jitter-ms 3 --loss 0.01 --devices-out devices.json
+
+--first/--devices select a slice of the address range, so a large fleet can
+be split over several processes (run_bench.py does that).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import bisect
+import ipaddress
+import json
+import random
+import signal
+import sys
+import time
+from dataclasses import dataclass
+
+from pysnmp.carrier.asyncio.dgram import udp
+from pysnmp.entity import config, engine
+from pysnmp.entity.rfc3413 import cmdrsp, context
+from pysnmp.proto import rfc1902
+from pysnmp.proto.api import v2c
+
+from sim_patterns import DeviceProfile, Pattern, load_script, parse_pattern, profile_for
+
+BASE_ADDRESS = "127.20.0.1"
+
+OID_BUSY_5S = (1, 3, 6, 1, 4, 1, 9, 2, 1, 56, 0)
+OID_BUSY_1M = (1, 3, 6, 1, 4, 1, 9, 2, 1, 57, 0)
+OID_BUSY_5M = (1, 3, 6, 1, 4, 1, 9, 2, 1, 58, 0)
+OID_CPM_5S = (1, 3, 6, 1, 4, 1, 9, 9, 109, 1, 1, 1, 1, 6, 1)
+OID_CPM_1M = (1, 3, 6, 1, 4, 1, 9, 9, 109, 1, 1, 1, 1, 7, 1)
+OID_CPM_5M = (1, 3, 6, 1, 4, 1, 9, 9, 109, 1, 1, 1, 1, 8, 1)
+OID_MEM_USED = (1, 3, 6, 1, 4, 1, 9, 9, 48, 1, 1, 1, 5, 1)
+OID_MEM_FREE = (1, 3, 6, 1, 4, 1, 9, 9, 48, 1, 1, 1, 6, 1)
+OID_UPTIME = (1, 3, 6, 1, 2, 1, 1, 3, 0)
+CPM_COLUMN = (1, 3, 6, 1, 4, 1, 9, 9, 109, 1, 1, 1, 1)
+CPU_ROW_OFFSET_SEC = 37.0
+
+ERR_TOO_BIG = 1
+ERR_GEN_ERR = 5
+ERR_NO_ACCESS = 6
+
+
+def device_address(index: int) -> str:
+    return str(ipaddress.IPv4Address(BASE_ADDRESS) + index)
+
+
+def trailing_mean(pattern: Pattern, t: float, window: float, points: int = 5) -> float:
+    return sum(pattern(t - window * k / points) for k in range(points)) / points
+
+
+@dataclass
+class SimDevice:
+    ip: str
+    profile: DeviceProfile
+    pattern: Pattern
+    requests: int = 0
+    dropped: int = 0
+    errors: int = 0
+
+
+class SimStats:
+    def __init__(self) -> None:
+        self.answered = 0
+        self.dropped = 0
+        self.errors = 0
+        self.too_big = 0
+
+
+class SimGetResponder(cmdrsp.GetCommandResponder):
+    """GET responder that looks up the device by the transport the request came in on."""
+
+    def __init__(self, snmp_engine, snmp_context, devices: dict[tuple, SimDevice],
+                 started: float, max_oids: int, stats: SimStats, rng: random.Random,
+                 max_bulk: int = 64, bad_oids: frozenset[tuple] = frozenset(),
+                 bad_index_zero: bool = False) -> None:
+        super().__init__(snmp_engine, snmp_context)
+        self.devices = devices
+        self.started = started
+        self.max_oids = max_oids
+        self.max_bulk = max_bulk
+        self.bad_oids = bad_oids
+        self.bad_index_zero = bad_index_zero
+        self.stats = stats
+        self.rng = rng
+        self.loop = asyncio.get_event_loop()
+        self._deferred: set[int] = set()
+
+    def release_state_information(self, stateReference):
+        # process_pdu() releases the request right after handle_management_operation();
+        # a delayed answer still needs it, _respond() releases it instead
+        if stateReference not in self._deferred:
+            super().release_state_information(stateReference)
+
+    def values(self, dev: SimDevice, now: float) -> dict[tuple, object]:
+        t = now - self.started
+        cpu_5s = round(dev.pattern(t))
+        cpu_1m = round(trailing_mean(dev.pattern, t, 60))
+        cpu_5m = round(trailing_mean(dev.pattern, t, 300))
+        used = 200_000_000 + cpu_5s * 1_000_000
+        out = {
+            OID_BUSY_5S: rfc1902.Integer(cpu_5s),
+            OID_BUSY_1M: rfc1902.Integer(cpu_1m),
+            OID_BUSY_5M: rfc1902.Integer(cpu_5m),
+            OID_CPM_5S: rfc1902.Gauge32(cpu_5s),
+            OID_CPM_1M: rfc1902.Gauge32(cpu_1m),
+            OID_CPM_5M: rfc1902.Gauge32(cpu_5m),
+            OID_MEM_USED: rfc1902.Gauge32(used),
+            OID_MEM_FREE: rfc1902.Gauge32(512_000_000 - used),
+            OID_UPTIME: rfc1902.TimeTicks(int(t * 100) % 2**32),
+        }
+        for row in range(2, dev.profile.cpus + 1):
+            tr = t + CPU_ROW_OFFSET_SEC * (row - 1)
+            out[CPM_COLUMN + (6, row)] = rfc1902.Gauge32(round(dev.pattern(tr)))
+            out[CPM_COLUMN + (7, row)] = rfc1902.Gauge32(round(trailing_mean(dev.pattern, tr, 60)))
+            out[CPM_COLUMN + (8, row)] = rfc1902.Gauge32(round(trailing_mean(dev.pattern, tr, 300)))
+        return out
+
+    def answer(self, PDU, values: dict[tuple, object]) -> tuple[int, int, list]:
+        vbs = v2c.apiPDU.get_varbinds(PDU)
+        if len(vbs) > self.max_oids:
+            self.stats.too_big += 1
+            return ERR_TOO_BIG, 0, vbs
+        for i, (oid, _) in enumerate(vbs, 1):
+            if tuple(oid) in self.bad_oids:
+                return ERR_NO_ACCESS, 0 if self.bad_index_zero else i, vbs
+        return 0, 0, [(oid, values.get(tuple(oid), v2c.NoSuchObject())) for oid, _ in vbs]
+
+    def handle_management_operation(self, snmpEngine, stateReference, contextName, PDU):
+        ctx = snmpEngine.observer.get_execution_context("rfc3412.receiveMessage:request")
+        dev = self.devices.get(tuple(ctx["transportDomain"]))
+        prof = dev.profile if dev else None
+        if dev is None or prof.dead or self.rng.random() < prof.loss:
+            # no answer at all: the poller sees a timeout
+            if dev is not None:
+                dev.dropped += 1
+            self.stats.dropped += 1
+            return
+        dev.requests += 1
+
+        if self.rng.random() < prof.error_rate:
+            dev.errors += 1
+            self.stats.errors += 1
+            response = (ERR_GEN_ERR, 1, v2c.apiPDU.get_varbinds(PDU))
+        else:
+            response = self.answer(PDU, self.values(dev, time.time()))
+
+        delay = prof.latency_ms
+        if prof.jitter_ms:
+            delay += self.rng.uniform(-prof.jitter_ms, prof.jitter_ms)
+        if delay > 0:
+            self._deferred.add(stateReference)
+            self.loop.call_later(delay / 1000.0, self._respond, snmpEngine, stateReference,
+                                 response)
+        else:
+            self._respond(snmpEngine, stateReference, response)
+
+    def _respond(self, snmpEngine, stateReference, response) -> None:
+        self._deferred.discard(stateReference)
+        self.send_varbinds(snmpEngine, stateReference, *response)
+        self.release_state_information(stateReference)
+        self.stats.answered += 1
+
+
+class SimBulkResponder(SimGetResponder):
+    """GETBULK over the same per-device values, walked in OID order."""
+
+    SUPPORTED_PDU_TYPES = cmdrsp.BulkCommandResponder.SUPPORTED_PDU_TYPES
+
+    def answer(self, PDU, values: dict[tuple, object]) -> tuple[int, int, list]:
+        vbs = v2c.apiPDU.get_varbinds(PDU)
+        keys = sorted(values)
+        non_rep = min(max(int(v2c.apiBulkPDU.get_non_repeaters(PDU)), 0), len(vbs))
+        max_rep = max(int(v2c.apiBulkPDU.get_max_repetitions(PDU)), 0)
+
+        def successor(oid: tuple) -> tuple:
+            i = bisect.bisect_right(keys, oid)
+            if i == len(keys):
+                return oid, v2c.EndOfMibView()
+            return keys[i], values[keys[i]]
+
+        out = [successor(tuple(oid)) for oid, _ in vbs[:non_rep]]
+        current = [tuple(oid) for oid, _ in vbs[non_rep:]]
+        for _ in range(max_rep if current else 0):
+            if len(out) + len(current) > self.max_bulk:
+                break
+            group = [successor(oid) for oid in current]
+            out.extend(group)
+            current = [oid for oid, _ in group]
+        return 0, 0, [(rfc1902.ObjectName(oid), val) for oid, val in out]
+
+
+def build_devices(args: argparse.Namespace) -> list[SimDevice]:
+    script = load_script(args.script)
+    base = DeviceProfile(pattern=args.pattern, latency_ms=args.latency_ms,
+                         jitter_ms=args.jitter_ms, loss=args.loss,
+                         error_rate=args.error_rate, cpus=args.cpus)
+    rng = random.Random(args.seed)
+    dead = set(rng.sample(range(args.devices), round(args.dead * args.devices)))
+    out = []
+    for k in range(args.devices):
+        index = args.first + k
+        ip = device_address(index)
+        prof = profile_for(index, ip, base, script)
+        if k in dead:
+            prof = prof.merged({"dead": True})
+        phase = 0.0 if args.sync else random.Random(f"{args.seed}:{index}").random()
+        out.append(SimDevice(ip, prof, parse_pattern(prof.pattern, phase,
+                                                     random.Random(f"{args.seed}:{index}"))))
+    return out
+
+
+def write_devices_file(path: str, devices: list[SimDevice], port: int, sites: int,
+                       first: int) -> None:
+    entries = [{"site": f"sim{(first + k) % sites}", "ip": d.ip, "port": port}
+               for k, d in enumerate(devices)]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(entries, f, indent=1)
+
+
+async def serve(args: argparse.Namespace, devices: list[SimDevice]) -> None:
+    snmp_engine = engine.SnmpEngine()
+    by_domain: dict[tuple, SimDevice] = {}
+    for k, dev in enumerate(devices):
+        domain = udp.DOMAIN_NAME + (k + 1,)
+        transport = udp.UdpTransport().open_server_mode((dev.ip, args.port))
+        config.add_transport(snmp_engine, domain, transport)
+        by_domain[domain] = dev
+
+    config.add_v3_user(snmp_engine, args.user, config.USM_AUTH_HMAC96_SHA, args.auth,
+                       config.USM_PRIV_CFB128_AES, args.priv)
+    config.add_vacm_user(snmp_engine, 3, args.user, "authPriv", (1, 3, 6), (1, 3, 6))
+    stats = SimStats()
+    snmp_context = context.SnmpContext(snmp_engine)
+    started = time.time()
+    rng = random.Random(args.seed)
+    bad_oids = frozenset(tuple(int(x) for x in oid.strip(".").split(".")) for oid in args.bad_oid)
+    SimGetResponder(snmp_engine, snmp_context, by_domain, started, args.max_oids, stats, rng,
+                    bad_oids=bad_oids, bad_index_zero=args.bad_index_zero)
+    SimBulkResponder(snmp_engine, snmp_context, by_domain, started, args.max_oids, stats, rng,
+                     args.max_bulk)
+    snmp_engine.transport_dispatcher.job_started(1)
+
+    print(f"[sim] {len(devices)} device(s) {devices[0].ip}..{devices[-1].ip} port {args.port} "
+          f"pattern={args.pattern} cpus={args.cpus} latency={args.latency_ms:g}+-{args.jitter_ms:g}ms "
+          f"loss={args.loss:g} errors={args.error_rate:g} "
+          f"dead={sum(d.profile.dead for d in devices)}", flush=True)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=args.report_sec)
+        except asyncio.TimeoutError:
+            pass
+        print(f"[sim] answered={stats.answered} dropped={stats.dropped} "
+              f"errors={stats.errors} too_big={stats.too_big}", flush=True)
+    snmp_engine.transport_dispatcher.close_dispatcher()
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Simulate many SNMPv3 devices on loopback addresses.")
+    ap.add_argument("--devices", type=int, default=100, help="number of devices")
+    ap.add_argument("--first", type=int, default=0, help="index of the first device")
+    ap.add_argument("--port", type=int, default=16100)
+    ap.add_argument("--pattern", default="sine:40,25,600", help="CPU pattern (sim_patterns.py)")
+    ap.add_argument("--sync", action="store_true", help="same phase for every device")
+    ap.add_argument("--script", help="JSON file with per-device overrides")
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--jitter-ms", type=float, default=0.0)
+    ap.add_argument("--loss", type=float, default=0.0, help="request drop probability")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="genErr probability")
+    ap.add_argument("--dead", type=float, default=0.0, help="fraction of devices never answering")
+    ap.add_argument("--max-oids", type=int, default=50, help="varbinds per PDU before tooBig")
+    ap.add_argument("--bad-oid", action="append", default=[],
+                    help="OID answered noAccess on GET (repeatable)")
+    ap.add_argument("--bad-index-zero", action="store_true",
+                    help="send errIdx 0 with --bad-oid errors")
+    ap.add_argument("--max-bulk", type=int, default=64, help="varbinds per GETBULK response")
+    ap.add_argument("--cpus", type=int, default=1, help="cpmCPUTotalTable rows per device")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--user", default="SNMPUser1")
+    ap.add_argument("--auth", default="AUTHPass1")
+    ap.add_argument("--priv", default="PRIVPass1")
+    ap.add_argument("--sites", type=int, default=4, help="sites in the generated devices file")
+    ap.add_argument("--devices-out", help="write a poller devices.json for these devices")
+    ap.add_argument("--report-sec", type=float, default=30.0)
+    args = ap.parse_args()
+    if args.devices < 1:
+        ap.error("--devices must be >= 1")
+    if args.cpus < 1:
+        ap.error("--cpus must be >= 1")
+
+    try:
+        devices = build_devices(args)
+    except (OSError, ValueError) as e:
+        print(f"[sim] {e}", file=sys.stderr)
+        return 2
+    if args.devices_out:
+        write_devices_file(args.devices_out, devices, args.port, args.sites, args.first)
+    asyncio.run(serve(args, devices))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
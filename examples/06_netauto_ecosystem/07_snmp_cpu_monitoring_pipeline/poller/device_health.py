@@ -0,0 +1,154 @@
+"""
+Per-device health: circuit breaker + adaptive SNMP timeout.
+
+Breaker states:
+  closed  normal polling on the device's schedule
+  open    BREAKER_FAILURES consecutive unreachable polls; the device is
+          quarantined and only probed every probe_sec (doubling after each
+          failed probe, capped at probe_max_sec) with a short timeout and no
+          retries, so dead boxes stop holding semaphore slots
+A successful probe closes the breaker again.
+
+Timeouts follow the TCP retransmission timer (RFC 6298):
+  SRTT   <- (1 - 1/8) * SRTT   + 1/8 * R
+  RTTVAR <- (1 - 1/4) * RTTVAR + 1/4 * |SRTT - R|
+  RTO    =  SRTT + max(G, 4 * RTTVAR), clamped to [min_timeout, max_timeout]
+Samples from polls that needed a retry are ignored (Karn's algorithm), and the
+RTO is rounded up to 0.25 s so pysnmp only sees a handful of distinct
+target timeouts per device. A poll that times out while the breaker is closed
+doubles the RTO (RFC 6298 5.5, capped at max_timeout) until the next valid
+sample, so a device whose RTT rose above its RTO adapts instead of timing out
+at the same short timeout until it is quarantined.
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Any
+
+CLOSED = "closed"
+OPEN = "open"
+
+RTT_ALPHA = 1 / 8
+RTT_BETA = 1 / 4
+RTT_K = 4
+RTT_GRANULARITY = 0.05
+TIMEOUT_STEP = 0.25
+
+
+@dataclass
+class HealthEntry:
+    state: str = CLOSED
+    consecutive_failures: int = 0
+    srtt: float | None = None
+    rttvar: float | None = None
+    rto_backoff: int = 1         # RTO multiplier, doubled per closed-state timeout
+    probe_backoff: float = 0.0
+    next_probe: float = 0.0      # time.monotonic() value
+
+
+class DeviceHealth:
+    def __init__(self, failures_to_open: int, probe_sec: float, probe_max_sec: float,
+                 probe_timeout: float, min_timeout: float, max_timeout: float,
+                 retries: int) -> None:
+        self.failures_to_open = failures_to_open
+        self.probe_sec = probe_sec
+        self.probe_max_sec = probe_max_sec
+        self.probe_timeout = probe_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.retries = retries
+        self._entries: dict[str, HealthEntry] = {}
+        self.opened = 0
+        self.closed_after_probe = 0
+        self.skipped = 0
+
+    def entry(self, ip: str) -> HealthEntry:
+        e = self._entries.get(ip)
+        if e is None:
+            e = self._entries[ip] = HealthEntry()
+        return e
+
+    def retain(self, ips: set[str]) -> None:
+        for ip in [ip for ip in self._entries if ip not in ips]:
+            del self._entries[ip]
+
+    def is_open(self, ip: str) -> bool:
+        e = self._entries.get(ip)
+        return e is not None and e.state == OPEN
+
+    # ----------------------------
+    # Decisions before a poll
+    # ----------------------------
+    def should_poll(self, ip: str, now: float) -> bool:
+        """False while the device is quarantined and its next probe is not due."""
+        e = self.entry(ip)
+        if e.state == OPEN and now < e.next_probe:
+            self.skipped += 1
+            return False
+        return True
+
+    def timeout_for(self, ip: str) -> tuple[float, int]:
+        """(timeout, retries) for the next request to `ip`."""
+        e = self.entry(ip)
+        if e.state == OPEN:
+            return self.probe_timeout, 0
+        if e.srtt is None or e.rttvar is None:
+            return self.max_timeout, self.retries
+        rto = e.srtt + max(RTT_GRANULARITY, RTT_K * e.rttvar)
+        rto = math.ceil(rto / TIMEOUT_STEP) * TIMEOUT_STEP
+        rto = max(rto, self.min_timeout) * e.rto_backoff
+        return min(rto, self.max_timeout), self.retries
+
+    # ----------------------------
+    # Outcome of a poll
+    # ----------------------------
+    def record_success(self, ip: str, rtt: float | None) -> None:
+        e = self.entry(ip)
+        if e.state == OPEN:
+            self.closed_after_probe += 1
+        e.state = CLOSED
+        e.consecutive_failures = 0
+        e.probe_backoff = 0.0
+        if rtt is None:
+            return
+        e.rto_backoff = 1
+        if e.srtt is None or e.rttvar is None:
+            e.srtt, e.rttvar = rtt, rtt / 2
+        else:
+            e.rttvar = (1 - RTT_BETA) * e.rttvar + RTT_BETA * abs(e.srtt - rtt)
+            e.srtt = (1 - RTT_ALPHA) * e.srtt + RTT_ALPHA * rtt
+
+    def record_failure(self, ip: str, now: float) -> None:
+        e = self.entry(ip)
+        e.consecutive_failures += 1
+        if e.state == OPEN:
+            e.probe_backoff = min(e.probe_backoff * 2, self.probe_max_sec)
+            e.next_probe = now + e.probe_backoff
+        elif e.consecutive_failures >= self.failures_to_open:
+            e.state = OPEN
+            e.probe_backoff = self.probe_sec
+            e.next_probe = now + e.probe_backoff
+            # the old RTT estimate belongs to a device that stopped answering
+            e.srtt = e.rttvar = None
+            e.rto_backoff = 1
+            self.opened += 1
+        elif e.srtt is not None and self.timeout_for(ip)[0] < self.max_timeout:
+            e.rto_backoff *= 2
+
+    def snapshot_fields(self, ip: str) -> dict[str, Any]:
+        e = self.entry(ip)
+        return {
+            "breaker": e.state,
+            "consecutive_failures": e.consecutive_failures,
+            "srtt_ms": None if e.srtt is None else round(e.srtt * 1000, 1),
+        }
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "open": sum(1 for e in self._entries.values() if e.state == OPEN),
+            "opened": self.opened,
+            "recovered": self.closed_after_probe,
+            "skipped": self.skipped,
+        }
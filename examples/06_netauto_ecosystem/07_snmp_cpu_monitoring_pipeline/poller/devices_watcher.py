@@ -0,0 +1,135 @@
+"""
+devices.json change detection and diffing for hot reload.
+
+DevicesWatcher uses Linux inotify (through libc via ctypes, no extra
+dependency) on the file's directory, so atomic "write tmp + rename" edits are
+seen as well as in-place writes. The inotify fd is registered with the
+running asyncio loop; events only set a flag that the poller checks between
+cycles. Where inotify is not available (non-Linux, some container mounts) it
+falls back to comparing (mtime_ns, size) on every check.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import ctypes
+import ctypes.util
+import os
+import struct
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from snmp_sessions import file_fingerprint
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct("iIII")   # wd, mask, cookie, len
+
+
+class DevicesWatcher:
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self._fingerprint = file_fingerprint(str(self.path))
+        self._dirty = False
+        self._fd: int | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self.mode = "stat"
+
+    def start(self) -> None:
+        """Try to arm inotify on the running loop; stay in stat mode if that fails."""
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd < 0:
+                return
+            wd = libc.inotify_add_watch(fd, str(self.path.parent).encode(), WATCH_MASK)
+            if wd < 0:
+                os.close(fd)
+                return
+            loop = asyncio.get_running_loop()
+            loop.add_reader(fd, self._on_events)
+        except (OSError, AttributeError, RuntimeError, NotImplementedError):
+            return
+        self._fd, self._loop, self.mode = fd, loop, "inotify"
+
+    def _on_events(self) -> None:
+        assert self._fd is not None
+        try:
+            buf = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        off = 0
+        while off + EVENT_HEADER.size <= len(buf):
+            _wd, _mask, _cookie, name_len = EVENT_HEADER.unpack_from(buf, off)
+            off += EVENT_HEADER.size
+            name = buf[off:off + name_len].rstrip(b"\0").decode(errors="replace")
+            off += name_len
+            if name == self.path.name:
+                self._dirty = True
+
+    def changed(self) -> bool:
+        """True once per change; the caller reloads and calls this again next cycle."""
+        if self.mode == "inotify":
+            if not self._dirty:
+                return False
+            self._dirty = False
+        fp = file_fingerprint(str(self.path))
+        if fp == self._fingerprint:
+            return False
+        self._fingerprint = fp
+        return True
+
+    def close(self) -> None:
+        if self._fd is not None:
+            if self._loop is not None:
+                self._loop.remove_reader(self._fd)
+            os.close(self._fd)
+        self._fd = None
+        self.mode = "stat"
+
+
+# ----------------------------
+# Diff
+# ----------------------------
+@dataclass
+class DevicesDiff:
+    added: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    changed: dict[str, list[str]] = field(default_factory=dict)   # ip -> changed keys
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+    def summary(self) -> str:
+        parts = [f"added={len(self.added)}", f"removed={len(self.removed)}",
+                 f"changed={len(self.changed)}"]
+        if self.added:
+            parts.append("+" + ",".join(self.added))
+        if self.removed:
+            parts.append("-" + ",".join(self.removed))
+        for ip, keys in self.changed.items():
+            parts.append(f"~{ip}({','.join(keys)})")
+        return " ".join(parts)
+
+
+def diff_devices(old: list[dict[str, str]], new: list[dict[str, str]]) -> DevicesDiff:
+    before = {d["ip"]: d for d in old}
+    after = {d["ip"]: d for d in new}
+    diff = DevicesDiff(
+        added=[ip for ip in after if ip not in before],
+        removed=[ip for ip in before if ip not in after],
+    )
+    for ip in after.keys() & before.keys():
+        keys = sorted(k for k in after[ip].keys() | before[ip].keys()
+                      if after[ip].get(k) != before[ip].get(k))
+        if keys:
+            diff.changed[ip] = keys
+    return diff
@@ -0,0 +1,221 @@
+"""
+Buffered, segment-rotated CSV history for the poller.
+
+One write_cycle() call per poll cycle: all rows are rendered in memory and
+appended with a single open/write/close. Rows go into time-bucketed segments
+next to CSV_FILE:
+
+  rotate=hour  -> cpu-YYYYMMDDHH.csv
+  rotate=day   -> cpu-YYYYMMDD.csv
+  rotate=none  -> cpu.csv (the original single file)
+
+max_bytes > 0 additionally starts cpu-YYYYMMDDHH.1.csv, .2.csv, ... once a
+segment grows past the limit. Closed segments can be gzipped (.csv.gz).
+
+cpu-manifest.json lists every segment with its time range and row count so
+readers never have to list the directory:
+  {"fields": [...], "segments": [{"file": "cpu-2026041818.csv", "start_utc": ...,
+   "end_utc": ..., "rows": 1200, "closed": true, "gzip": false,
+   "fields": [...]}, ...]}
+
+The manifest is rewritten when a segment opens or closes and otherwise at most
+every checkpoint_sec, so rows/end_utc of the open segment may lag; readers go
+by the file contents. Closed segments whose end_utc is older than keep_sec are
+deleted (file and manifest entry) when a segment closes, which keeps the
+manifest and its rewrite cost bounded.
+"""
+
+from __future__ import annotations
+
+import csv
+import gzip
+import io
+import json
+import os
+import shutil
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+
+ROTATE_FORMATS = {
+    "hour": "%Y%m%d%H",
+    "day": "%Y%m%d",
+    "none": "",
+}
+
+
+def atomic_write_json(path: Path, payload: dict[str, Any]) -> None:
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(payload, f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+class HistoryWriter:
+    def __init__(self, csv_file: str | Path, fieldnames: list[str],
+                 rotate: str = "hour", max_bytes: int = 0,
+                 gzip_closed: bool = False, keep_sec: float = 0,
+                 checkpoint_sec: float = 60) -> None:
+        if rotate not in ROTATE_FORMATS:
+            raise ValueError(f"unsupported history rotation: {rotate!r}")
+        base = Path(csv_file)
+        self.dir = base.parent
+        self.stem = base.stem
+        self.suffix = base.suffix or ".csv"
+        self.fieldnames = fieldnames
+        self.rotate = rotate
+        self.max_bytes = max_bytes
+        self.gzip_closed = gzip_closed
+        self.keep_sec = keep_sec              # 0 => keep every closed segment
+        self.checkpoint_sec = checkpoint_sec
+        self.manifest_path = self.dir / f"{self.stem}-manifest.json"
+
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self._manifest = self._load_manifest()
+        self._index = {seg["file"]: seg for seg in self._manifest["segments"]}
+        self._saved_at = time.monotonic()
+        self._bucket: str | None = None
+        self._active: dict[str, Any] | None = None
+        self._active_bytes = 0
+
+    # ----------------------------
+    # Manifest
+    # ----------------------------
+    def _load_manifest(self) -> dict[str, Any]:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict) and isinstance(data.get("segments"), list):
+                data["fields"] = self.fieldnames
+                return data
+        except (OSError, ValueError):
+            pass
+        return {"fields": self.fieldnames, "segments": []}
+
+    def _save_manifest(self) -> None:
+        atomic_write_json(self.manifest_path, self._manifest)
+        self._saved_at = time.monotonic()
+
+    def _entry(self, name: str) -> dict[str, Any] | None:
+        return self._index.get(name)
+
+    def _prune(self, now: datetime) -> None:
+        """Delete closed segments that ended more than keep_sec before `now`."""
+        if self.keep_sec <= 0:
+            return
+        cutoff = now - timedelta(seconds=self.keep_sec)
+        keep = []
+        for entry in self._manifest["segments"]:
+            try:
+                expired = entry.get("closed") and datetime.fromisoformat(entry["end_utc"]) < cutoff
+            except (KeyError, TypeError, ValueError):
+                expired = False
+            if expired:
+                (self.dir / entry["file"]).unlink(missing_ok=True)
+                self._index.pop(entry["file"], None)
+            else:
+                keep.append(entry)
+        self._manifest["segments"] = keep
+
+    def segments(self) -> list[dict[str, Any]]:
+        return list(self._manifest["segments"])
+
+    # ----------------------------
+    # Segments
+    # ----------------------------
+    def _segment_name(self, bucket: str, part: int) -> str:
+        name = self.stem if not bucket else f"{self.stem}-{bucket}"
+        if part:
+            name += f".{part}"
+        return name + self.suffix
+
+    def _header_matches(self, path: Path) -> bool:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            header = next(csv.reader(f), None)
+        return header is None or header == self.fieldnames
+
+    def _open_segment(self, bucket: str, ts_iso: str) -> None:
+        """Pick the segment for `bucket`, resuming a matching one after a restart."""
+        part = 0
+        while True:
+            name = self._segment_name(bucket, part)
+            path = self.dir / name
+            gz_done = (self.dir / (name + ".gz")).exists()
+            entry = self._entry(name)
+            closed = bool(entry and entry.get("closed"))
+            if not gz_done and not closed and (not path.exists() or self._header_matches(path)):
+                break
+            part += 1
+
+        self._bucket = bucket
+        size = path.stat().st_size if path.exists() else 0
+        entry = self._entry(name)
+        if entry is None:
+            entry = {"file": name, "start_utc": ts_iso, "end_utc": ts_iso,
+                     "rows": 0, "closed": False, "gzip": False,
+                     "fields": self.fieldnames}
+            self._manifest["segments"].append(entry)
+            self._index[name] = entry
+            self._save_manifest()
+        self._active = entry
+        self._active_bytes = size
+
+    def _close_entry(self, entry: dict[str, Any]) -> None:
+        entry["closed"] = True
+        path = self.dir / entry["file"]
+        if self.gzip_closed and not entry.get("gzip") and path.exists():
+            gz_path = path.with_name(path.name + ".gz")
+            with open(path, "rb") as src, gzip.open(gz_path, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(path)
+            del self._index[entry["file"]]
+            entry["file"] = gz_path.name
+            entry["gzip"] = True
+            self._index[entry["file"]] = entry
+
+    def _close_open_segments(self, now: datetime, keep: dict[str, Any] | None = None) -> None:
+        """Close every open segment except `keep` (includes leftovers of a previous run)."""
+        for entry in self._manifest["segments"]:
+            if entry is not keep and not entry.get("closed"):
+                self._close_entry(entry)
+        self._prune(now)
+        self._save_manifest()
+
+    def _roll_if_needed(self, when: datetime, ts_iso: str) -> None:
+        fmt = ROTATE_FORMATS[self.rotate]
+        bucket = when.astimezone(timezone.utc).strftime(fmt) if fmt else ""
+        if self._active is None:
+            self._open_segment(bucket, ts_iso)
+            self._close_open_segments(when, keep=self._active)
+        elif bucket != self._bucket or (self.max_bytes and self._active_bytes >= self.max_bytes):
+            self._close_open_segments(when)
+            self._open_segment(bucket, ts_iso)
+
+    # ----------------------------
+    # Write
+    # ----------------------------
+    def write_cycle(self, ts_iso: str, rows: list[dict[str, Any]]) -> int:
+        """Append one poll cycle in a single write; returns bytes written."""
+        if not rows:
+            return 0
+        self._roll_if_needed(datetime.fromisoformat(ts_iso), ts_iso)
+        assert self._active is not None
+
+        buf = io.StringIO()
+        w = csv.DictWriter(buf, fieldnames=self.fieldnames, extrasaction="ignore")
+        if self._active_bytes == 0:
+            w.writeheader()
+        for row in rows:
+            w.writerow({k: ("" if row.get(k) is None else row[k]) for k in self.fieldnames})
+        data = buf.getvalue().encode("utf-8")
+
+        with open(self.dir / self._active["file"], "ab") as f:
+            f.write(data)
+
+        self._active_bytes += len(data)
+        self._active["rows"] += len(rows)
+        self._active["end_utc"] = ts_iso
+        if time.monotonic() - self._saved_at >= self.checkpoint_sec:
+            self._save_manifest()
+        return len(data)
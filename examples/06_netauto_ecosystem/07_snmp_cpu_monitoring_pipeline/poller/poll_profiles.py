@@ -0,0 +1,171 @@
+"""
+Named poll profiles: the set of OIDs the poller fetches per device.
+
+Profile file (POLL_PROFILES_FILE, JSON object):
+  {
+    "cisco_cpu_mem": {
+      "max_oids_per_pdu": 10,
+      "metrics": {
+        "cpu_percent": "1.3.6.1.4.1.9.2.1.56.0",
+        "cpu_1m": "1.3.6.1.4.1.9.2.1.57.0",
+        "cpu_5m": "1.3.6.1.4.1.9.2.1.58.0",
+        "mem_used": "1.3.6.1.4.1.9.9.48.1.1.1.5.1",
+        "mem_free": "1.3.6.1.4.1.9.9.48.1.1.1.6.1",
+        "uptime_ticks": "1.3.6.1.2.1.1.3.0"
+      },
+      "tables": {
+        "cpm_cpu_total": {
+          "max_repetitions": 8,
+          "columns": {
+            "cpu_5s": "1.3.6.1.4.1.9.9.109.1.1.1.1.6",
+            "cpu_1m": "1.3.6.1.4.1.9.9.109.1.1.1.1.7",
+            "cpu_5m": "1.3.6.1.4.1.9.9.109.1.1.1.1.8"
+          }
+        }
+      }
+    }
+  }
+
+A device picks a profile with "profile": "<name>" in devices.json, otherwise
+POLL_PROFILE is used. A device-level cpu_oid always overrides the profile's
+cpu_percent OID. Without a profile file only the built-in "cpu" profile
+(cpu_percent from cpu_oid) exists, which is the original single-OID poll.
+A POLL_PROFILES_FILE that is set explicitly must exist (empty = none).
+
+"tables" (optional) are walked with GETBULK after the scalar GETs: every
+column OID is a table column (no instance suffix), all columns of a table
+travel in the same PDUs, and each row is stored under its index (the OID
+suffix after the column, "1", "3.2", ...). max_repetitions caps the rows
+asked for per PDU (see snmp_tables.py for how it is tuned per device).
+"""
+
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+
+CPU_METRIC = "cpu_percent"
+BUILTIN_PROFILE = "cpu"
+DEFAULT_MAX_OIDS_PER_PDU = 20
+DEFAULT_MAX_REPETITIONS = 25
+
+
+@dataclass(frozen=True)
+class TableSpec:
+    name: str
+    columns: tuple[tuple[str, str], ...]   # (metric name, column oid), in PDU order
+    max_repetitions: int = DEFAULT_MAX_REPETITIONS
+
+    def metric_names(self) -> list[str]:
+        return [m for m, _ in self.columns]
+
+
+@dataclass(frozen=True)
+class PollProfile:
+    name: str
+    metrics: tuple[tuple[str, str], ...]   # (metric name, oid), in PDU order
+    max_oids_per_pdu: int = DEFAULT_MAX_OIDS_PER_PDU
+    tables: tuple[TableSpec, ...] = ()
+
+    def metric_names(self) -> list[str]:
+        return [m for m, _ in self.metrics]
+
+    def oids_for(self, cpu_oid: str, default_cpu_oid: str) -> list[tuple[str, str]]:
+        """
+        (metric, oid) pairs for one device. cpu_percent is always present:
+        device cpu_oid > profile OID > default_cpu_oid.
+        """
+        out = []
+        for m, oid in self.metrics:
+            if m == CPU_METRIC:
+                oid = cpu_oid or oid or default_cpu_oid
+            out.append((m, oid))
+        if CPU_METRIC not in self.metric_names():
+            out.insert(0, (CPU_METRIC, cpu_oid or default_cpu_oid))
+        return out
+
+
+def builtin_profiles() -> dict[str, PollProfile]:
+    # empty OID => filled per device from cpu_oid / DEFAULT_CPU_OID
+    return {BUILTIN_PROFILE: PollProfile(BUILTIN_PROFILE, ((CPU_METRIC, ""),))}
+
+
+def parse_tables(profile: str, spec: object) -> tuple[TableSpec, ...]:
+    if spec is None:
+        return ()
+    if not isinstance(spec, dict):
+        raise ValueError(f"profile {profile!r}: 'tables' must be an object")
+    tables = []
+    for name, tspec in spec.items():
+        where = f"profile {profile!r} table {name!r}"
+        if not isinstance(tspec, dict) or not isinstance(tspec.get("columns"), dict):
+            raise ValueError(f"{where}: 'columns' must be an object")
+        columns = tuple((str(m), str(oid).strip(".")) for m, oid in tspec["columns"].items())
+        if not columns:
+            raise ValueError(f"{where}: no columns")
+        reps = int(tspec.get("max_repetitions") or DEFAULT_MAX_REPETITIONS)
+        if reps < 1:
+            raise ValueError(f"{where}: max_repetitions must be >= 1")
+        tables.append(TableSpec(str(name), columns, reps))
+    return tuple(tables)
+
+
+def load_profiles(path: str | None, required: bool = False) -> dict[str, PollProfile]:
+    """
+    Built-in profiles plus those in `path`. A missing file means "no profile
+    file" unless `required` (the path was configured explicitly), then it is
+    an error instead of a silent fallback to the built-in profile.
+    """
+    profiles = builtin_profiles()
+    if not path:
+        return profiles
+    if not Path(path).exists():
+        if required:
+            raise FileNotFoundError(f"poll profiles file not found: {path}")
+        return profiles
+
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError("poll profiles file must be a JSON object")
+
+    for name, spec in data.items():
+        if not isinstance(spec, dict) or not isinstance(spec.get("metrics"), dict):
+            raise ValueError(f"profile {name!r}: 'metrics' must be an object")
+        metrics = tuple((str(m), str(oid)) for m, oid in spec["metrics"].items())
+        if not metrics:
+            raise ValueError(f"profile {name!r}: no metrics")
+        max_oids = int(spec.get("max_oids_per_pdu") or DEFAULT_MAX_OIDS_PER_PDU)
+        if max_oids < 1:
+            raise ValueError(f"profile {name!r}: max_oids_per_pdu must be >= 1")
+        tables = parse_tables(str(name), spec.get("tables"))
+        profiles[str(name)] = PollProfile(str(name), metrics, max_oids, tables)
+    return profiles
+
+
+def all_metric_names(profiles: dict[str, PollProfile]) -> list[str]:
+    """Stable column order: cpu_percent first, then every other metric by first appearance."""
+    names = [CPU_METRIC]
+    for p in profiles.values():
+        for m in p.metric_names():
+            if m not in names:
+                names.append(m)
+    return names
+
+
+def all_table_metric_names(profiles: dict[str, PollProfile]) -> list[str]:
+    """Stable column order of the table history: every table column by first appearance."""
+    names: list[str] = []
+    for p in profiles.values():
+        for t in p.tables:
+            for m in t.metric_names():
+                if m not in names:
+                    names.append(m)
+    return names
+
+
+def chunked(items: list[tuple[str, str]], size: int) -> Iterator[list[tuple[str, str]]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
@@ -3,56 +3,173 @@
 """
 SNMP CPU Poller (long-running)
 
-- Reads devices from /app/shared/devices.json
-- Every INTERVAL_SEC seconds, polls CPU OID on all devices concurrently (Semaphore limit)
-- Appends a history row to /app/shared/cpu.csv
-- Writes an atomic per-device snapshot to /app/shared/latest/<ip>.json
+- Reads devices from /app/shared/devices.json and hot-reloads it between
+  cycles (inotify, or mtime/size checks); an invalid file is rejected whole
+- Keeps one SNMPv3 session (auth + transport) per device across cycles
+- Polls each device's poll profile (CPU OID plus optional extra OIDs, batched
+  into as few GET PDUs as possible) every INTERVAL_SEC seconds (or the
+  device's interval_sec), at a stable per-device phase inside the interval
+  and on drift-free monotonic deadlines (Semaphore limit on concurrency)
+- Writes one history row per poll (one column per metric), buffered and
+  flushed once per INTERVAL_SEC into time/size-rotated segments next to
+  /app/shared/cpu.csv (cpu-YYYYMMDDHH.csv + cpu-manifest.json)
+- Updates the device's slot in the memory-mapped snapshot table
+  /app/shared/latest.tbl in place (read by the alerter)
+- Tracks per-device health: after BREAKER_FAILURES unreachable polls a
+  device is quarantined (short-timeout probes only, exported as a flag in
+  the snapshot); timeouts adapt to a per-device SRTT/RTTVAR estimate
+- Pushes every snapshot to the alerter over the Unix socket PUSH_SOCKET
+  (length-prefixed JSON records, bounded queue, never blocks polling); the
+  snapshot table stays the alerter's fallback
+- Optionally (LATEST_JSON_EXPORT=1) also writes the legacy atomic per-device
+  snapshot /app/shared/latest/<ip>.json
+- Can run as several worker processes (POLLER_WORKERS, or one process per
+  container with SHARD_NAME/SHARD_MEMBERS); each worker polls its
+  rendezvous-hash slice of devices.json and writes per-shard history and
+  snapshot files (cpu.<shard>.csv, latest.<shard>.tbl) that readers fan in
+- Optionally (METRICS_PORT) serves Prometheus metrics on GET /metrics from
+  the same event loop: cycle wall time, poll latency histogram, timeout and
+  error counters by type, device and in-flight counts
 
 Notes:
-- On any SNMP/read failure, cpu_percent is written as null (JSON) / empty (CSV).
+- On any SNMP/read failure, a metric is written as null (JSON) / empty (CSV).
+- A GET answered with tooBig is split in half and retried until it fits.
+- Profiles can add tables (e.g. cpmCPUTotalTable, one row per CPU); they are
+  walked with GETBULK (snmp_tables.py, max-repetitions tuned per device) and
+  every row is written with its index to a separate history next to
+  /app/shared/table.csv and to the snapshot /app/shared/latest_tables.json
+- Values are decoded by SNMP type (snmp_values.py), not by parsing prettyPrint()
+  text; noSuchObject/noSuchInstance/endOfMibView become null.
 - Alerting/cooldown logic is intentionally handled by a separate alerter service.
 """
 
 import asyncio
-import csv
 import json
 import os
+import signal
+import sys
+import time
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, NamedTuple
 
 from pysnmp.hlapi.v3arch.asyncio import (
     SnmpEngine,
-    UsmUserData,
-    UdpTransportTarget,
     ContextData,
     ObjectType,
     ObjectIdentity,
     get_cmd,
-    USM_AUTH_HMAC96_SHA,
-    USM_PRIV_CFB128_AES,
 )
+from pysnmp.proto.errind import RequestTimedOut
+
+from history_writer import HistoryWriter
+from poll_profiles import (
+    BUILTIN_PROFILE,
+    CPU_METRIC,
+    PollProfile,
+    all_metric_names,
+    all_table_metric_names,
+    chunked,
+    load_profiles,
+)
+from scheduler import DeviceScheduler
+from device_health import DeviceHealth
+from devices_watcher import DevicesDiff, DevicesWatcher, diff_devices
+from metrics import MetricsRegistry
+from push_publisher import PushPublisher
+from sharding import ShardRing, parse_members, shard_path, stale_tables
+from snapshot_table import FLAG_QUARANTINED, SnapshotTable
+from snmp_sessions import (
+    SnmpCredentials,
+    SnmpSession,
+    SnmpSessionCache,
+)
+from snmp_tables import BulkTuner, walk_table
+from snmp_values import decode_int
 
 # ----------------------------
 # Config (env-friendly)
 # ----------------------------
 DEVICES_FILE = os.environ.get("DEVICES_FILE", "/app/shared/devices.json")
+POLL_PROFILES_FILE = os.environ.get("POLL_PROFILES_FILE", "/app/shared/poll_profiles.json")
+POLL_PROFILE = os.environ.get("POLL_PROFILE", BUILTIN_PROFILE)
 CSV_FILE     = os.environ.get("CSV_FILE", "/app/shared/cpu.csv")
+TABLE_CSV_FILE = os.environ.get("TABLE_CSV_FILE", "/app/shared/table.csv")           # profile tables
+TABLE_SNAPSHOT = os.environ.get("TABLE_SNAPSHOT", "/app/shared/latest_tables.json")
 LATEST_DIR   = os.environ.get("LATEST_DIR", "/app/shared/latest")
+SNAPSHOT_TABLE     = os.environ.get("SNAPSHOT_TABLE", "/app/shared/latest.tbl")
+SNAPSHOT_CAPACITY  = int(os.environ.get("SNAPSHOT_CAPACITY", "1024"))   # initial slots, grows x2
+LATEST_JSON_EXPORT = os.environ.get("LATEST_JSON_EXPORT", "0") == "1"
+PUSH_SOCKET        = os.environ.get("PUSH_SOCKET", "/app/shared/alerter.sock")   # "" => no push
+PUSH_QUEUE         = int(os.environ.get("PUSH_QUEUE", "1000"))
+
+HISTORY_ROTATE    = os.environ.get("HISTORY_ROTATE", "hour")          # hour | day | none
+HISTORY_MAX_BYTES = int(os.environ.get("HISTORY_MAX_BYTES", "0"))     # 0 => no size rotation
+HISTORY_GZIP      = os.environ.get("HISTORY_GZIP", "0") == "1"        # gzip closed segments
+HISTORY_KEEP_DAYS = float(os.environ.get("HISTORY_KEEP_DAYS", "30"))  # 0 => keep every segment
+HISTORY_MANIFEST_SEC = float(os.environ.get("HISTORY_MANIFEST_SEC", "60"))  # open-segment checkpoint
 
 INTERVAL_SEC = int(os.environ.get("INTERVAL_SEC", "30"))
 LIMIT        = int(os.environ.get("CONCURRENCY_LIMIT", "50"))
 
 DEFAULT_CPU_OID = os.environ.get("DEFAULT_CPU_OID", "1.3.6.1.4.1.9.2.1.56.0")  # Cisco CPU 5sec
 
-SNMP_USER = os.environ.get("SNMP_USER", "SNMPUser1")
-SNMP_AUTH = os.environ.get("SNMP_AUTH", "AUTHPass1")
-SNMP_PRIV = os.environ.get("SNMP_PRIV", "PRIVPass1")
+DEFAULT_SNMP_PORT = int(os.environ.get("DEFAULT_SNMP_PORT", "161"))
 
 SNMP_TIMEOUT = float(os.environ.get("SNMP_TIMEOUT", "2"))
 SNMP_RETRIES = int(os.environ.get("SNMP_RETRIES", "1"))
 
+SNMP_MIN_TIMEOUT = float(os.environ.get("SNMP_MIN_TIMEOUT", "0.5"))   # floor for the adaptive RTO
+
+BREAKER_FAILURES      = int(os.environ.get("BREAKER_FAILURES", "3"))
+BREAKER_PROBE_SEC     = float(os.environ.get("BREAKER_PROBE_SEC", "120"))
+BREAKER_PROBE_MAX_SEC = float(os.environ.get("BREAKER_PROBE_MAX_SEC", "900"))
+BREAKER_PROBE_TIMEOUT = float(os.environ.get("BREAKER_PROBE_TIMEOUT", "1"))
+
+METRICS_HOST = os.environ.get("METRICS_HOST", "0.0.0.0")
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "0"))   # 0 => no /metrics endpoint
+
+POLLER_WORKERS = int(os.environ.get("POLLER_WORKERS", "1"))     # >1 => supervise local workers
+SHARD_NAME     = os.environ.get("SHARD_NAME", "")              # this worker's shard ("" => all devices)
+SHARD_MEMBERS  = parse_members(os.environ.get("SHARD_MEMBERS", ""))
+WORKER_RESTART_SEC = 5
+
+TAG = f"[poller {SHARD_NAME}]" if SHARD_NAME else "[poller]"
+
+SNMP_ERR_TOO_BIG = 1
+
 _engine = SnmpEngine()
+_sessions = SnmpSessionCache(timeout=SNMP_TIMEOUT, retries=SNMP_RETRIES)
+_bulk_tuner = BulkTuner()
+
+# ----------------------------
+# Metrics
+# ----------------------------
+_metrics = MetricsRegistry()
+M_CYCLE_SECONDS = _metrics.gauge(
+    "snmp_poller_cycle_seconds", "Wall time of the last poll cycle (flush to flush).")
+M_FLUSH_SECONDS = _metrics.gauge(
+    "snmp_poller_history_flush_seconds", "Time spent writing the last cycle's history rows.")
+M_POLL_SECONDS = _metrics.histogram(
+    "snmp_poller_poll_duration_seconds", "Per-device poll latency (all PDUs of the profile).",
+    ["result"])
+M_LAG_SECONDS = _metrics.histogram(
+    "snmp_poller_schedule_lag_seconds", "Delay between a device's deadline and its poll start.")
+M_POLLS = _metrics.counter(
+    "snmp_poller_polls_total", "Device polls by result.", ["result"])
+M_TIMEOUTS = _metrics.counter(
+    "snmp_poller_timeouts_total", "GET PDUs that timed out after all retries.")
+M_ERRORS = _metrics.counter(
+    "snmp_poller_errors_total", "Non-timeout SNMP failures by type.", ["type"])
+M_PDU_SPLITS = _metrics.counter(
+    "snmp_poller_pdu_splits_total", "GET PDUs split in half after a tooBig response.")
+M_BULK_PDUS = _metrics.counter(
+    "snmp_poller_bulk_pdus_total", "GETBULK PDUs sent for profile tables.")
+M_TABLE_ROWS = _metrics.counter(
+    "snmp_poller_table_rows_total", "Table rows read with GETBULK.")
+M_PUSH = _metrics.counter(
+    "snmp_poller_push_records_total", "Snapshots offered to the alerter push channel.",
+    ["result"])
 
 # ----------------------------
 # IO helpers
@@ -60,12 +177,15 @@ _engine = SnmpEngine()
 def utc_iso() -> str:
     return datetime.now(timezone.utc).isoformat(timespec="seconds")
 
-def load_devices(path: str) -> list[dict[str, str]]:
+def load_devices(path: str, profiles: dict[str, PollProfile]) -> list[dict[str, str]]:
     """
     expected JSON: list of objects with:
       - ip (required)
-      - cpu_oid (optional)
+      - cpu_oid (optional, overrides the profile's cpu_percent OID)
       - site (optional)
+      - port (optional, default DEFAULT_SNMP_PORT)
+      - profile (optional, default POLL_PROFILE)
+      - interval_sec (optional, default INTERVAL_SEC)
     """
     with open(path, "r", encoding="utf-8") as f:
         data = json.load(f)
@@ -76,11 +196,28 @@ def load_devices(path: str) -> list[dict[str, str]]:
         if isinstance(item, dict) and "ip" in item:
             out.append({
                 "ip": str(item["ip"]),
-                "cpu_oid": str(item.get("cpu_oid") or DEFAULT_CPU_OID),
+                "cpu_oid": str(item.get("cpu_oid") or ""),
                 "site": str(item.get("site") or ""),
+                "port": str(item.get("port") or DEFAULT_SNMP_PORT),
+                "profile": str(item.get("profile") or POLL_PROFILE),
+                "interval_sec": str(item.get("interval_sec") or ""),
             })
     if not out:
         raise ValueError("No valid devices in devices.json")
+    seen: set[str] = set()
+    dupes: set[str] = set()
+    for d in out:
+        if d["ip"] in seen:
+            dupes.add(d["ip"])
+        seen.add(d["ip"])
+    if dupes:
+        raise ValueError(f"devices.json lists duplicate ip(s): {sorted(dupes)}")
+    for d in out:
+        if d["interval_sec"] and not float(d["interval_sec"]) > 0:
+            raise ValueError(f"ip={d['ip']}: interval_sec must be > 0")
+    unknown = sorted({d["profile"] for d in out} - set(profiles))
+    if unknown:
+        raise ValueError(f"devices.json references unknown poll profile(s): {unknown}")
     return out
 
 def atomic_write_json(path: Path, payload: dict[str, Any]) -> None:
@@ -90,117 +227,424 @@ def atomic_write_json(path: Path, payload: dict[str, Any]) -> None:
         json.dump(payload, f, indent=2)
     os.replace(tmp, path)  # atomic replace
 
-def append_csv_row(path: Path, row: dict[str, Any]) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    new_file = not path.exists()
-
-    fieldnames = ["timestamp_utc", "ip", "cpu_percent"]
-    cpu = row.get("cpu_percent")
-
-    safe = {
-        "timestamp_utc": row["timestamp_utc"],
-        "ip": row["ip"],
-        "cpu_percent": "" if cpu is None else str(cpu),
-    }
-
-    with open(path, "a", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=fieldnames)
-        if new_file:
-            w.writeheader()
-        w.writerow(safe)
-
 # ----------------------------
 # SNMP
 # ----------------------------
-async def snmp_get_cpu_percent(ip: str, oid: str) -> int | None:
+async def snmp_get_pdu(sess: SnmpSession,
+                       oids: list[tuple[str, str]]) -> tuple[dict[str, int | None], bool]:
+    """
+    One GET for all `oids`; on tooBig the list is halved and each half retried.
+    returns: ({metric: int|None}, reachable)
+    """
+    empty = {m: None for m, _ in oids}
+    errorIndication, errorStatus, errorIndex, varBinds = await get_cmd(
+        _engine,
+        sess.auth,
+        sess.transport,
+        ContextData(),
+        *[ObjectType(ObjectIdentity(oid)) for _, oid in oids],
+        lookupMib=False,
+    )
+
+    if errorIndication:
+        if isinstance(errorIndication, RequestTimedOut):
+            M_TIMEOUTS.inc()
+        else:
+            M_ERRORS.inc(type=type(errorIndication).__name__)
+        return empty, False
+    if errorStatus:
+        M_ERRORS.inc(type=errorStatus.prettyPrint())
+        if int(errorStatus) == SNMP_ERR_TOO_BIG and len(oids) > 1:
+            M_PDU_SPLITS.inc()
+            mid = len(oids) // 2
+            left, ok = await snmp_get_pdu(sess, oids[:mid])
+            if not ok:
+                return empty, False
+            right, ok = await snmp_get_pdu(sess, oids[mid:])
+            return {**left, **right}, ok
+        return empty, True
+
+    out = dict(empty)
+    for (metric, _), (_, val) in zip(oids, varBinds):
+        out[metric] = decode_int(val)
+    return out, True
+
+TableRows = dict[str, list[tuple[str, dict[str, int | None]]]]   # {table: [(index, {metric: value})]}
+
+class PollResult(NamedTuple):
+    metrics: dict[str, int | None]
+    reachable: bool          # the device answered (even with SNMP-level errors)
+    rtt: float | None        # first PDU round trip, None if unreachable or retried
+    tables: TableRows | None = None   # profile tables, rows in index order
+
+async def snmp_get_metrics(ip: str, port: int, profile: PollProfile,
+                           oids: list[tuple[str, str]],
+                           creds: SnmpCredentials,
+                           timeout: float | None = None,
+                           retries: int | None = None) -> PollResult:
     """
-    returns:
-      int  => cpu percent
-      None => any failure or non-int response (=> UNKNOWN in alerter)
+    metrics holds {metric: value} for every OID of the profile:
+      int  => value
+      None => any failure or non-int response (=> UNKNOWN in alerter for cpu_percent)
+    timeout/retries override the session defaults for this poll (adaptive RTO).
+    tables holds the rows of every profile table the device answered (walked
+    only once the scalar GETs got through).
     """
+    out: dict[str, int | None] = {m: None for m, _ in oids}
+    tables: TableRows = {}
+    reachable = False
+    rtt = None
     try:
-        transport = await UdpTransportTarget.create(
-            (ip, 161), timeout=SNMP_TIMEOUT, retries=SNMP_RETRIES
-        )
-        errorIndication, errorStatus, errorIndex, varBinds = await get_cmd(
-            _engine,
-            UsmUserData(
-                userName=SNMP_USER,
-                authKey=SNMP_AUTH,
-                privKey=SNMP_PRIV,
-                authProtocol=USM_AUTH_HMAC96_SHA,
-                privProtocol=USM_PRIV_CFB128_AES,
-            ),
-            transport,
-            ContextData(),
-            ObjectType(ObjectIdentity(oid)),
-            lookupMib=False,
-        )
-
-        if errorIndication:
-            return None
-        if errorStatus:
-            return None
-
-        _, val = varBinds[0]
-        text = val.prettyPrint().strip()
-        if text.startswith("No Such"):
-            return None
-        return int(text)
-    except Exception:
-        return None
-
-async def poll_all(devices: list[dict[str, str]], limit: int) -> list[tuple[str, str, int | None]]:
-    sem = asyncio.Semaphore(limit)
-
-    async def bounded(dev: dict[str, str]):
-        async with sem:
-            ip = dev["ip"]
-            oid = dev["cpu_oid"]
-            cpu = await snmp_get_cpu_percent(ip, oid)
-            return ip, oid, cpu
-
-    tasks = [asyncio.create_task(bounded(d)) for d in devices]
-    return await asyncio.gather(*tasks)
+        sess = await _sessions.get(ip, port, creds)
+        sess.transport.timeout = SNMP_TIMEOUT if timeout is None else timeout
+        sess.transport.retries = SNMP_RETRIES if retries is None else retries
+        for i, chunk in enumerate(chunked(oids, profile.max_oids_per_pdu)):
+            t0 = time.monotonic()
+            values, reachable = await snmp_get_pdu(sess, chunk)
+            elapsed = time.monotonic() - t0
+            out.update(values)
+            if not reachable:
+                # timeout/transport error: the remaining PDUs would only wait as long
+                break
+            if i == 0 and elapsed < sess.transport.timeout:
+                rtt = elapsed   # longer than one timeout => a retry happened (Karn)
+        for spec in profile.tables if reachable else ():
+            walk = await walk_table(_engine, sess, ip, spec, _bulk_tuner)
+            M_BULK_PDUS.inc(walk.pdus)
+            M_TABLE_ROWS.inc(len(walk.rows))
+            if walk.error == "RequestTimedOut":
+                M_TIMEOUTS.inc()
+            elif walk.error:
+                M_ERRORS.inc(type=walk.error)
+            if walk.rows:
+                tables[spec.name] = walk.rows
+            if not walk.reachable:
+                break
+    except Exception as e:
+        M_ERRORS.inc(type=type(e).__name__)
+    return PollResult(out, reachable, rtt, tables)
 
 # ----------------------------
 # Main loop
 # ----------------------------
-async def main() -> None:
-    devices = load_devices(DEVICES_FILE)
+def shard_ring() -> ShardRing | None:
+    if not SHARD_NAME:
+        return None
+    ring = ShardRing(SHARD_MEMBERS)
+    if SHARD_NAME not in ring.members:
+        raise ValueError(f"SHARD_NAME={SHARD_NAME!r} is not in SHARD_MEMBERS={SHARD_MEMBERS}")
+    return ring
+
+def owned_devices(path: str, profiles: dict[str, PollProfile],
+                  ring: ShardRing | None) -> list[dict[str, str]]:
+    """The whole file is validated; the worker then keeps its own slice."""
+    devices = load_devices(path, profiles)
+    return devices if ring is None else ring.owned(devices, SHARD_NAME)
+
+def reload_devices(devices: list[dict[str, str]], profiles: dict[str, PollProfile],
+                   ring: ShardRing | None) -> tuple[list[dict[str, str]], DevicesDiff]:
+    """
+    Re-read devices.json and diff it against the running list. The new list is
+    only adopted if it loads and validates completely; otherwise the previous
+    list keeps running and an empty diff is returned.
+    """
+    try:
+        new_devices = owned_devices(DEVICES_FILE, profiles, ring)
+    except Exception as e:
+        print(f"{TAG} devices.json rejected, keeping previous list ({len(devices)} devices): {e}")
+        return devices, DevicesDiff()
+    diff = diff_devices(devices, new_devices)
+    if diff:
+        print(f"{TAG} devices.json reloaded: devices={len(new_devices)} {diff.summary()}")
+    return new_devices, diff
 
-    csv_path = Path(CSV_FILE)
+async def main() -> None:
+    # an explicitly configured file must exist; the default path is optional
+    profiles = load_profiles(POLL_PROFILES_FILE, required=bool(os.environ.get("POLL_PROFILES_FILE")))
+    if POLL_PROFILE not in profiles:
+        raise ValueError(f"POLL_PROFILE={POLL_PROFILE!r} not found in {POLL_PROFILES_FILE}")
+    ring = shard_ring()
+    devices = owned_devices(DEVICES_FILE, profiles, ring)
+    watcher = DevicesWatcher(DEVICES_FILE)
+    watcher.start()
+    creds = SnmpCredentials.from_env()
+
+    csv_fields = ["timestamp_utc", "ip", *all_metric_names(profiles)]
+    history = HistoryWriter(shard_path(CSV_FILE, SHARD_NAME), csv_fields, rotate=HISTORY_ROTATE,
+                            max_bytes=HISTORY_MAX_BYTES, gzip_closed=HISTORY_GZIP,
+                            keep_sec=HISTORY_KEEP_DAYS * 86400,
+                            checkpoint_sec=HISTORY_MANIFEST_SEC)
+    table_fields = all_table_metric_names(profiles)
+    table_history = None
+    if table_fields:
+        table_history = HistoryWriter(shard_path(TABLE_CSV_FILE, SHARD_NAME),
+                                      ["timestamp_utc", "ip", "table", "index", *table_fields],
+                                      rotate=HISTORY_ROTATE, max_bytes=HISTORY_MAX_BYTES,
+                                      gzip_closed=HISTORY_GZIP,
+                                      keep_sec=HISTORY_KEEP_DAYS * 86400,
+                                      checkpoint_sec=HISTORY_MANIFEST_SEC)
+    table_snapshot = Path(shard_path(TABLE_SNAPSHOT, SHARD_NAME))
+    table_latest: dict[str, dict[str, Any]] = {}   # ip -> {"timestamp_utc", "tables"}
+    snapshots = SnapshotTable(shard_path(SNAPSHOT_TABLE, SHARD_NAME), capacity=max(SNAPSHOT_CAPACITY, len(devices)))
+    snapshots.retain({d["ip"] for d in devices})
     latest_dir = Path(LATEST_DIR)
-    latest_dir.mkdir(parents=True, exist_ok=True)
-
-    print(f"[poller] devices={len(devices)} interval={INTERVAL_SEC}s limit={LIMIT}")
-    print(f"[poller] csv={csv_path}")
-    print(f"[poller] latest_dir={latest_dir}")
-
-    while True:
-        ts = utc_iso()
-
-        results = await poll_all(devices, LIMIT)
-
-        for ip, _oid, cpu in results:
-            append_csv_row(csv_path, {
-                "timestamp_utc": ts,
-                "ip": ip,
-                "cpu_percent": cpu,
-            })
-
+    if LATEST_JSON_EXPORT:
+        latest_dir.mkdir(parents=True, exist_ok=True)
+
+    scheduler = DeviceScheduler(INTERVAL_SEC)
+    scheduler.sync(devices)
+    health = DeviceHealth(
+        failures_to_open=BREAKER_FAILURES,
+        probe_sec=BREAKER_PROBE_SEC,
+        probe_max_sec=BREAKER_PROBE_MAX_SEC,
+        probe_timeout=BREAKER_PROBE_TIMEOUT,
+        min_timeout=SNMP_MIN_TIMEOUT,
+        max_timeout=SNMP_TIMEOUT,
+        retries=SNMP_RETRIES,
+    )
+    sem = asyncio.Semaphore(LIMIT)
+    sem_busy = 0
+    pending_rows: list[dict[str, Any]] = []
+    pending_table_rows: list[dict[str, Any]] = []
+    in_flight: set[asyncio.Task] = set()
+
+    _metrics.gauge("snmp_poller_devices", "Devices in the running inventory.",
+                   fn=lambda: len(scheduler))
+    _metrics.gauge("snmp_poller_devices_quarantined", "Devices with an open circuit breaker.",
+                   fn=lambda: health.stats()["open"])
+    _metrics.gauge("snmp_poller_polls_in_flight", "Poll tasks started and not finished.",
+                   fn=lambda: len(in_flight))
+    _metrics.gauge("snmp_poller_semaphore_in_use", "Concurrency slots held by running polls.",
+                   fn=lambda: sem_busy)
+    _metrics.gauge("snmp_poller_concurrency_limit", "CONCURRENCY_LIMIT.", fn=lambda: LIMIT)
+    _metrics.gauge("snmp_poller_sessions", "Cached SNMPv3 sessions.",
+                   fn=lambda: _sessions.stats()["size"])
+    push = None
+    if PUSH_SOCKET:
+        push = PushPublisher(PUSH_SOCKET, max_queue=PUSH_QUEUE, tag=TAG)
+        push.start()
+        _metrics.gauge("snmp_poller_push_connected", "1 while connected to the alerter socket.",
+                       fn=lambda: push.connected)
+    metrics_server = None
+    if METRICS_PORT:
+        metrics_server = await _metrics.serve(METRICS_HOST, METRICS_PORT)
+
+    print(f"{TAG} devices={len(devices)} interval={INTERVAL_SEC}s limit={LIMIT}")
+    if ring is not None:
+        print(f"{TAG} shard={SHARD_NAME} members={ring.members} owns {len(devices)} device(s)")
+    print(f"{TAG} watching {DEVICES_FILE} ({watcher.mode})")
+    print(f"{TAG} profiles={sorted(profiles)} default={POLL_PROFILE}")
+    print(f"{TAG} history={shard_path(CSV_FILE, SHARD_NAME)} rotate={HISTORY_ROTATE} max_bytes={HISTORY_MAX_BYTES} "
+          f"gzip={HISTORY_GZIP} columns={csv_fields[2:]}")
+    print(f"{TAG} snapshot_table={snapshots.path} capacity={snapshots.capacity}")
+    if table_history is not None:
+        print(f"{TAG} tables history={shard_path(TABLE_CSV_FILE, SHARD_NAME)} "
+              f"snapshot={table_snapshot} columns={table_fields}")
+    print(f"{TAG} latest_dir={latest_dir if LATEST_JSON_EXPORT else 'disabled'}")
+    print(f"{TAG} push_socket={PUSH_SOCKET or 'disabled'} queue={PUSH_QUEUE}")
+    print(f"{TAG} snmp user={creds.user} auth={creds.auth_protocol} "
+          f"priv={creds.priv_protocol}")
+    print(f"{TAG} metrics="
+          f"{f'http://{METRICS_HOST}:{METRICS_PORT}/metrics' if metrics_server else 'disabled'}")
+
+    def publish(ts: str, ip: str, cpu: int | None, quarantined: bool) -> None:
+        if push is not None:
+            M_PUSH.inc(result=push.publish({
+                "timestamp_utc": ts, "ip": ip, CPU_METRIC: cpu, "quarantined": quarantined,
+            }))
+
+    async def poll_one(dev: dict[str, str], deadline: float) -> None:
+        nonlocal sem_busy
+        ip = dev["ip"]
+        try:
+            profile = profiles[dev["profile"]]
+            if not health.should_poll(ip, time.monotonic()):
+                # quarantined and no probe due: refresh the snapshot without touching SNMP
+                ts = utc_iso()
+                snapshots.update(ip, datetime.fromisoformat(ts).timestamp(), None,
+                                 FLAG_QUARANTINED)
+                publish(ts, ip, None, True)
+                if LATEST_JSON_EXPORT:
+                    atomic_write_json(latest_dir / f"{ip}.json", {
+                        "timestamp_utc": ts, "ip": ip, "profile": profile.name,
+                        CPU_METRIC: None, **health.snapshot_fields(ip),
+                    })
+                M_POLLS.inc(result="quarantined")
+                return
+            async with sem:
+                sem_busy += 1
+                try:
+                    started = time.monotonic()
+                    scheduler.record_lag(started - deadline)
+                    M_LAG_SECONDS.observe(max(started - deadline, 0.0))
+                    ts = utc_iso()
+                    oids = profile.oids_for(dev["cpu_oid"], DEFAULT_CPU_OID)
+                    timeout, retries = health.timeout_for(ip)
+                    res = await snmp_get_metrics(ip, int(dev["port"]), profile, oids, creds,
+                                                 timeout=timeout, retries=retries)
+                finally:
+                    sem_busy -= 1
+            result = "ok" if res.reachable else "unreachable"
+            M_POLLS.inc(result=result)
+            M_POLL_SECONDS.observe(time.monotonic() - started, result=result)
+        finally:
+            scheduler.done(ip)
+        if ip not in scheduler:
+            return   # removed by a devices.json reload while the poll was running
+
+        if res.reachable:
+            health.record_success(ip, res.rtt)
+        else:
+            health.record_failure(ip, time.monotonic())
+
+        metrics = res.metrics
+        cpu = metrics.get(CPU_METRIC)
+        quarantined = health.is_open(ip)
+        snapshots.update(ip, datetime.fromisoformat(ts).timestamp(), cpu,
+                         FLAG_QUARANTINED if quarantined else 0)
+        publish(ts, ip, cpu, quarantined)
+        pending_rows.append({"timestamp_utc": ts, "ip": ip, **metrics})
+        tables = {name: [{"index": idx, **vals} for idx, vals in rows]
+                  for name, rows in (res.tables or {}).items()}
+        for name, rows in tables.items():
+            pending_table_rows.extend({"timestamp_utc": ts, "ip": ip, "table": name, **row}
+                                      for row in rows)
+        if profile.tables:
+            table_latest[ip] = {"timestamp_utc": ts, "tables": tables}
+
+        if LATEST_JSON_EXPORT:
             atomic_write_json(latest_dir / f"{ip}.json", {
                 "timestamp_utc": ts,
                 "ip": ip,
-                "cpu_percent": cpu,   # int or None => JSON null
+                "profile": profile.name,
+                **metrics,   # cpu_percent (+ profile metrics): int or None => JSON null
+                **({"tables": tables} if profile.tables else {}),
+                **health.snapshot_fields(ip),
             })
 
-            if cpu is None:
-                print(f"[poller] {ts} ip={ip} cpu=UNKNOWN")
-            else:
-                print(f"[poller] {ts} ip={ip} cpu={cpu}")
+        extra = " ".join(f"{k}={'UNKNOWN' if v is None else v}"
+                         for k, v in metrics.items() if k != CPU_METRIC)
+        if profile.tables:
+            extra += "".join(f" {t.name}_rows={len(tables.get(t.name, ()))}" for t in profile.tables)
+        cpu_txt = "UNKNOWN" if cpu is None else cpu
+        print(f"{TAG} {ts} ip={ip} cpu={cpu_txt}" + (f" {extra.strip()}" if extra else ""))
 
-        await asyncio.sleep(INTERVAL_SEC)
+    async def flush() -> None:
+        nonlocal pending_rows, pending_table_rows, last_flush
+        ts = utc_iso()
+        rows, pending_rows = pending_rows, []
+        table_rows, pending_table_rows = pending_table_rows, []
+        t0 = time.monotonic()
+        M_CYCLE_SECONDS.set(t0 - last_flush)
+        last_flush = t0
+        # one buffered write per interval, off the event loop (rotation may gzip a segment)
+        await asyncio.to_thread(history.write_cycle, ts, rows)
+        if table_history is not None:
+            await asyncio.to_thread(table_history.write_cycle, ts, table_rows)
+            await asyncio.to_thread(atomic_write_json, table_snapshot,
+                                    {"timestamp_utc": ts, "devices": dict(table_latest)})
+        M_FLUSH_SECONDS.set(time.monotonic() - t0)
+
+        st = _sessions.stats()
+        sc = scheduler.stats()
+        print(f"{TAG} {ts} rows={len(rows)} table_rows={len(table_rows)} sessions size={st['size']} hits={st['hits']} "
+              f"misses={st['misses']} evictions={st['evictions']} hit_ratio={st['hit_ratio']} "
+              f"pdu_splits={int(M_PDU_SPLITS.value())}")
+        print(f"{TAG} {ts} schedule devices={sc['devices']} in_flight={len(in_flight)} "
+              f"lag_avg_ms={sc['lag_avg_ms']} lag_p95_ms={sc['lag_p95_ms']} "
+              f"lag_max_ms={sc['lag_max_ms']} missed={sc['missed']} skipped_busy={sc['skipped_busy']}")
+        hs = health.stats()
+        print(f"{TAG} {ts} breaker open={hs['open']} opened={hs['opened']} "
+              f"recovered={hs['recovered']} quarantined_skips={hs['skipped']}")
+        if push is not None:
+            ps = push.stats()
+            print(f"{TAG} {ts} push connected={ps['connected']} sent={ps['sent']} "
+                  f"dropped={ps['dropped']} offline={ps['offline']} queued={ps['queued']}")
+
+    last_flush = time.monotonic()
+    next_flush = last_flush + INTERVAL_SEC
+    while True:
+        now = time.monotonic()
+        for dev, deadline in scheduler.pop_due(now):
+            task = asyncio.create_task(poll_one(dev, deadline))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+
+        if now >= next_flush:
+            await flush()
+            next_flush += INTERVAL_SEC
+            if next_flush <= time.monotonic():
+                next_flush = time.monotonic() + INTERVAL_SEC
+
+            if watcher.changed():
+                devices, diff = reload_devices(devices, profiles, ring)
+                if diff:
+                    # unchanged devices keep their session, deadline, breaker and slot
+                    endpoint_moved = [ip for ip, keys in diff.changed.items() if "port" in keys]
+                    for ip in diff.removed + endpoint_moved:
+                        _sessions.invalidate(ip)
+                        _bulk_tuner.forget(ip)
+                    keep = {d["ip"] for d in devices}
+                    for ip in set(table_latest) - keep:
+                        del table_latest[ip]
+                    snapshots.retain(keep)
+                    scheduler.sync(devices)
+                    health.retain(keep - set(endpoint_moved))
+
+        wake = min(next_flush, scheduler.next_deadline() or next_flush)
+        await asyncio.sleep(max(0.0, wake - time.monotonic()))
+
+# ----------------------------
+# Local worker supervisor
+# ----------------------------
+async def supervise_workers(count: int) -> None:
+    """
+    Run `count` copies of this script as shard workers w0..w{count-1} and
+    restart any that exit. Each worker has its own SNMP engine and event loop,
+    so USM crypto and BER decoding spread over `count` cores. Snapshot
+    tables of shards outside w0..w{count-1} are removed before they start.
+    """
+    members = [f"w{i}" for i in range(count)]
+    procs: dict[str, asyncio.subprocess.Process] = {}
+    stopping = asyncio.Event()
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stopping.set)
+
+    def worker_env(i: int, name: str) -> dict[str, str]:
+        env = dict(os.environ, POLLER_WORKERS="1", SHARD_NAME=name,
+                   SHARD_MEMBERS=",".join(members))
+        if METRICS_PORT:
+            env["METRICS_PORT"] = str(METRICS_PORT + i)   # one /metrics port per worker
+        return env
+
+    async def run(i: int, name: str) -> None:
+        while not stopping.is_set():
+            proc = await asyncio.create_subprocess_exec(
+                sys.executable, os.path.abspath(__file__), env=worker_env(i, name))
+            procs[name] = proc
+            print(f"[poller] worker {name} started pid={proc.pid}")
+            rc = await proc.wait()
+            if stopping.is_set():
+                return
+            print(f"[poller] worker {name} exited rc={rc}, restarting in {WORKER_RESTART_SEC}s")
+            await asyncio.sleep(WORKER_RESTART_SEC)
+
+    print(f"[poller] supervising {count} workers members={members}")
+    # a table left by a higher worker count would stay in the alerter's fan-in
+    for path in stale_tables(SNAPSHOT_TABLE, members):
+        path.unlink(missing_ok=True)
+        print(f"[poller] removed stale snapshot table {path}")
+    runners = [asyncio.create_task(run(i, name)) for i, name in enumerate(members)]
+    await stopping.wait()
+    for proc in procs.values():
+        if proc.returncode is None:
+            proc.terminate()
+    await asyncio.gather(*runners, return_exceptions=True)
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    if POLLER_WORKERS > 1 and not SHARD_NAME:
+        asyncio.run(supervise_workers(POLLER_WORKERS))
+    else:
+        asyncio.run(main())
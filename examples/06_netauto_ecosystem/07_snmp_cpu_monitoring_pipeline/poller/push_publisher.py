@@ -0,0 +1,111 @@
+"""
+Push channel to the alerter (publisher side).
+
+The alerter listens on a Unix domain socket (alerter/push_receiver.py owns
+the other end; keep the framing in sync). Every snapshot the poller writes is
+also sent as one record:
+
+  record = length u32 (big-endian) | UTF-8 JSON object
+           {"timestamp_utc": ..., "ip": ..., "cpu_percent": <int|null>,
+            "quarantined": <bool>}
+
+Records are queued (bounded) and written by one background task that awaits
+drain() after each batch, so a slow alerter slows the channel down instead of
+growing buffers. The poller itself never waits: when the queue is full or the
+alerter is not connected the record is dropped and counted. The snapshot table
+still has the value, and the alerter's periodic pass picks it up.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import struct
+from pathlib import Path
+from typing import Any
+
+LENGTH = struct.Struct(">I")
+MAX_RECORD = 64 * 1024
+
+QUEUED = "queued"
+DROPPED = "dropped"      # queue full (alerter is behind)
+OFFLINE = "offline"      # no connection to the alerter
+
+
+def frame(record: dict[str, Any]) -> bytes:
+    payload = json.dumps(record, separators=(",", ":")).encode("utf-8")
+    if len(payload) > MAX_RECORD:
+        raise ValueError(f"push record too large ({len(payload)} bytes)")
+    return LENGTH.pack(len(payload)) + payload
+
+
+class PushPublisher:
+    def __init__(self, path: str | Path, max_queue: int = 1000,
+                 reconnect_sec: float = 2.0, tag: str = "[poller]") -> None:
+        self.path = Path(path)
+        self.reconnect_sec = reconnect_sec
+        self.tag = tag
+        self._queue: asyncio.Queue[bytes] = asyncio.Queue(maxsize=max_queue)
+        self._task: asyncio.Task | None = None
+        self.connected = False
+        self.sent = 0
+        self.dropped = 0
+        self.offline = 0
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    def publish(self, record: dict[str, Any]) -> str:
+        if not self.connected:
+            self.offline += 1
+            return OFFLINE
+        try:
+            self._queue.put_nowait(frame(record))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return DROPPED
+        return QUEUED
+
+    def _discard_queue(self) -> None:
+        while not self._queue.empty():
+            self._queue.get_nowait()
+
+    async def _run(self) -> None:
+        announced_down = False
+        while True:
+            try:
+                _reader, writer = await asyncio.open_unix_connection(str(self.path))
+            except OSError as e:
+                if not announced_down:
+                    print(f"{self.tag} push: alerter socket {self.path} unavailable ({e}), "
+                          f"retrying every {self.reconnect_sec:g}s")
+                    announced_down = True
+                await asyncio.sleep(self.reconnect_sec)
+                continue
+
+            print(f"{self.tag} push: connected to {self.path}")
+            announced_down = False
+            self.connected = True
+            try:
+                while True:
+                    batch = [await self._queue.get()]
+                    while not self._queue.empty():
+                        batch.append(self._queue.get_nowait())
+                    writer.write(b"".join(batch))
+                    await writer.drain()          # back-pressure from the alerter
+                    self.sent += len(batch)
+            except (ConnectionError, OSError) as e:
+                print(f"{self.tag} push: connection lost ({e})")
+            finally:
+                self.connected = False
+                self._discard_queue()
+                writer.close()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "connected": self.connected,
+            "queued": self._queue.qsize(),
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "offline": self.offline,
+        }
@@ -0,0 +1,137 @@
+"""
+Per-device poll scheduler with stable phase offsets.
+
+Every device gets a phase inside its interval derived from a hash of its IP,
+so polls are spread evenly across the interval instead of bursting at the
+start of a cycle, and the phase stays the same across restarts (it is
+anchored to wall-clock multiples of the interval).
+
+Deadlines live on the monotonic clock and advance by exactly one interval
+per poll (deadline += interval), so the period never stretches by the poll
+time. A device whose deadline passed more than an interval ago skips the
+missed slots instead of firing a burst of catch-up polls.
+"""
+
+from __future__ import annotations
+
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Any
+
+
+def phase_offset(key: str, interval: float) -> float:
+    """Stable offset in [0, interval) for `key`."""
+    return zlib.crc32(key.encode("utf-8")) / 2**32 * interval
+
+
+@dataclass
+class ScheduleEntry:
+    device: dict[str, str]
+    interval: float
+    deadline: float          # time.monotonic() value
+    in_flight: bool = False
+
+
+class DeviceScheduler:
+    def __init__(self, default_interval: float) -> None:
+        self.default_interval = default_interval
+        self._entries: dict[str, ScheduleEntry] = {}
+        self._lags: list[float] = []
+        self.dispatched = 0
+        self.missed = 0
+        self.skipped_busy = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, ip: str) -> bool:
+        return ip in self._entries
+
+    def interval_for(self, dev: dict[str, str]) -> float:
+        raw = dev.get("interval_sec") or ""
+        return float(raw) if raw else self.default_interval
+
+    def first_deadline(self, ip: str, interval: float) -> float:
+        """Next wall-clock slot (k * interval + phase) mapped onto the monotonic clock."""
+        now_wall, now_mono = time.time(), time.monotonic()
+        offset = phase_offset(ip, interval)
+        k = (now_wall - offset) // interval + 1
+        due_wall = k * interval + offset
+        return now_mono + (due_wall - now_wall)
+
+    # ----------------------------
+    # Device set
+    # ----------------------------
+    def sync(self, devices: list[dict[str, str]]) -> None:
+        """Apply a new device list; unchanged devices keep their deadline."""
+        seen = set()
+        for dev in devices:
+            ip = dev["ip"]
+            seen.add(ip)
+            interval = self.interval_for(dev)
+            entry = self._entries.get(ip)
+            if entry is None:
+                self._entries[ip] = ScheduleEntry(dev, interval, self.first_deadline(ip, interval))
+            else:
+                entry.device = dev
+                if entry.interval != interval:
+                    entry.interval = interval
+                    entry.deadline = self.first_deadline(ip, interval)
+        for ip in [ip for ip in self._entries if ip not in seen]:
+            del self._entries[ip]
+
+    # ----------------------------
+    # Dispatch
+    # ----------------------------
+    def next_deadline(self) -> float | None:
+        return min((e.deadline for e in self._entries.values()), default=None)
+
+    def pop_due(self, now: float) -> list[tuple[dict[str, str], float]]:
+        """
+        Devices whose deadline has passed, with the deadline they were due at.
+        Their next deadline is advanced before returning.
+        """
+        due = []
+        for entry in self._entries.values():
+            if entry.deadline > now:
+                continue
+            deadline = entry.deadline
+            entry.deadline += entry.interval
+            if entry.deadline <= now:
+                skip = int((now - entry.deadline) // entry.interval) + 1
+                entry.deadline += skip * entry.interval
+                self.missed += skip
+            if entry.in_flight:
+                # previous poll (timeouts/retries) still running: don't stack another
+                self.skipped_busy += 1
+                continue
+            entry.in_flight = True
+            self.dispatched += 1
+            due.append((entry.device, deadline))
+        return due
+
+    def done(self, ip: str) -> None:
+        entry = self._entries.get(ip)
+        if entry is not None:
+            entry.in_flight = False
+
+    def record_lag(self, lag_sec: float) -> None:
+        """Time between a device's deadline and the moment its poll actually started."""
+        self._lags.append(max(lag_sec, 0.0))
+
+    def stats(self, reset: bool = True) -> dict[str, Any]:
+        lags = sorted(self._lags)
+        n = len(lags)
+        out = {
+            "devices": len(self._entries),
+            "dispatched": self.dispatched,
+            "missed": self.missed,
+            "skipped_busy": self.skipped_busy,
+            "lag_avg_ms": round(sum(lags) / n * 1000, 1) if n else 0.0,
+            "lag_p95_ms": round(lags[min(n - 1, int(n * 0.95))] * 1000, 1) if n else 0.0,
+            "lag_max_ms": round(lags[-1] * 1000, 1) if n else 0.0,
+        }
+        if reset:
+            self._lags.clear()
+        return out
@@ -0,0 +1,73 @@
+"""
+Device sharding across poller worker processes.
+
+Every worker loads the full devices.json and keeps only the devices it owns.
+Ownership uses rendezvous (highest-random-weight) hashing: each device goes
+to the member with the highest hash(member, ip). Adding or removing a member
+only moves the devices that member wins or held (about 1/N of them), and every
+worker computes the same assignment without talking to the others.
+
+Each shard writes its own outputs next to the configured paths, which readers
+fan in:
+  cpu.csv     -> cpu.<shard>.csv      (segments cpu.<shard>-YYYYMMDDHH.csv)
+  latest.tbl  -> latest.<shard>.tbl
+
+Readers glob latest.*.tbl, so a table left by a retired member would stay in
+use; stale_tables() lists them for the supervisor to remove at startup.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+from pathlib import Path
+
+SHARD_NAME_RE = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+def _weight(member: str, key: str) -> int:
+    digest = hashlib.blake2b(f"{member}\0{key}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+class ShardRing:
+    def __init__(self, members: list[str]) -> None:
+        if not members:
+            raise ValueError("shard ring needs at least one member")
+        bad = [m for m in members if not SHARD_NAME_RE.match(m)]
+        if bad:
+            raise ValueError(f"invalid shard name(s) {bad}: use letters, digits, '-' or '_'")
+        if len(set(members)) != len(members):
+            raise ValueError(f"duplicate shard name(s) in {members}")
+        self.members = list(members)
+
+    def owner(self, key: str) -> str:
+        return max(self.members, key=lambda m: _weight(m, key))
+
+    def owned(self, devices: list[dict[str, str]], member: str) -> list[dict[str, str]]:
+        return [d for d in devices if self.owner(d["ip"]) == member]
+
+
+def parse_members(raw: str) -> list[str]:
+    return [m.strip() for m in raw.split(",") if m.strip()]
+
+
+def shard_path(path: str | Path, shard: str) -> Path:
+    """latest.tbl -> latest.<shard>.tbl (unchanged when not sharded)."""
+    p = Path(path)
+    if not shard:
+        return p
+    return p.with_name(f"{p.stem}.{shard}{p.suffix}")
+
+
+def stale_tables(path: str | Path, members: list[str]) -> list[Path]:
+    """Snapshot tables next to `path` not written by any of `members`:
+    latest.<shard>.tbl of shards no longer in the ring, and the unsharded
+    latest.tbl itself."""
+    p = Path(path)
+    keep = {shard_path(p, m) for m in members}
+    found = [c for c in p.parent.glob(f"{p.stem}.*{p.suffix}")
+             if SHARD_NAME_RE.match(c.name[len(p.stem) + 1:len(c.name) - len(p.suffix)])]
+    if p.is_file():
+        found.append(p)
+    return sorted(c for c in found if c not in keep)
@@ -0,0 +1,168 @@
+"""
+Memory-mapped latest-snapshot table (writer side).
+
+One fixed-size file shared with the alerter (alerter/snapshot_reader.py reads
+the same layout). The poller updates slots in place instead of writing one
+JSON file per device per cycle.
+
+Layout (little-endian):
+  header, 64 bytes:  magic "CPUSNAP1" | version u32 | slot_size u32 | capacity u32
+  slot,   64 bytes:  seq u64 | ts_epoch f64 | cpu i32 | flags u32 | ip 40s
+
+seq is a seqlock: the writer makes it odd before touching the payload and
+even again afterwards, so a reader that sees the same even seq before and
+after copying a slot knows the copy is not torn. It also only ever grows,
+which lets readers skip slots that did not change.
+
+flags: FLAG_IN_USE (slot holds a device), FLAG_CPU_VALID (cpu is not null),
+       FLAG_QUARANTINED (device breaker is open, cpu is null on purpose).
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+from pathlib import Path
+
+MAGIC = b"CPUSNAP1"
+VERSION = 1
+
+HEADER = struct.Struct("<8sIII")
+HEADER_SIZE = 64
+SLOT = struct.Struct("<QdiI40s")
+SLOT_SIZE = SLOT.size            # 64
+SEQ = struct.Struct("<Q")
+PAYLOAD = struct.Struct("<diI40s")
+
+FLAG_IN_USE = 0x1
+FLAG_CPU_VALID = 0x2
+FLAG_QUARANTINED = 0x4
+
+
+class SnapshotTable:
+    def __init__(self, path: str | Path, capacity: int = 1024) -> None:
+        self.path = Path(path)
+        self.capacity = capacity
+        self._slots: dict[str, int] = {}
+        self._free: list[int] = []
+        self._fd: int | None = None
+        self._mm: mmap.mmap | None = None
+        self._open()
+
+    # ----------------------------
+    # File management
+    # ----------------------------
+    def _map(self) -> None:
+        self._fd = os.open(self.path, os.O_RDWR)
+        self._mm = mmap.mmap(self._fd, HEADER_SIZE + self.capacity * SLOT_SIZE)
+
+    def _create(self, capacity: int) -> None:
+        """Build a fresh, zeroed table and swap it in atomically."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp, "wb") as f:
+            header = HEADER.pack(MAGIC, VERSION, SLOT_SIZE, capacity)
+            f.write(header.ljust(HEADER_SIZE, b"\0"))
+            f.truncate(HEADER_SIZE + capacity * SLOT_SIZE)
+        os.replace(tmp, self.path)
+        self.capacity = capacity
+
+    def _open(self) -> None:
+        """Reuse an existing compatible table (keeping slot assignment) or create one."""
+        try:
+            with open(self.path, "rb") as f:
+                magic, version, slot_size, capacity = HEADER.unpack(f.read(HEADER.size))
+            size_ok = self.path.stat().st_size == HEADER_SIZE + capacity * SLOT_SIZE
+            compatible = (magic == MAGIC and version == VERSION
+                          and slot_size == SLOT_SIZE and size_ok)
+        except (OSError, struct.error):
+            compatible = False
+
+        if compatible:
+            self.capacity = max(capacity, 1)
+        else:
+            self._create(self.capacity)
+        self._map()
+        self._rebuild_index()
+
+    def _rebuild_index(self) -> None:
+        assert self._mm is not None
+        self._slots.clear()
+        self._free = []
+        for i in range(self.capacity):
+            _seq, _ts, _cpu, flags, raw_ip = SLOT.unpack_from(self._mm, self._offset(i))
+            ip = raw_ip.rstrip(b"\0").decode("ascii", "replace")
+            if flags & FLAG_IN_USE and ip:
+                self._slots[ip] = i
+            else:
+                self._free.append(i)
+        self._free.reverse()   # pop() hands out the lowest free slot first
+
+    def _grow(self, capacity: int) -> None:
+        """Copy the current slots into a bigger file; readers remap on inode change."""
+        assert self._mm is not None
+        old = bytes(self._mm[HEADER_SIZE:])
+        self.close()
+        self._create(capacity)
+        self._map()
+        assert self._mm is not None
+        self._mm[HEADER_SIZE:HEADER_SIZE + len(old)] = old
+        self._rebuild_index()
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    # ----------------------------
+    # Slots
+    # ----------------------------
+    @staticmethod
+    def _offset(slot: int) -> int:
+        return HEADER_SIZE + slot * SLOT_SIZE
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def slot_for(self, ip: str) -> int:
+        slot = self._slots.get(ip)
+        if slot is not None:
+            return slot
+        if not self._free:
+            self._grow(self.capacity * 2)
+        slot = self._free.pop()
+        self._slots[ip] = slot
+        return slot
+
+    def _write(self, slot: int, ts_epoch: float, cpu: int, flags: int, ip: bytes) -> None:
+        assert self._mm is not None
+        off = self._offset(slot)
+        (seq,) = SEQ.unpack_from(self._mm, off)
+        if seq & 1:          # left odd by a crash mid-write
+            seq += 1
+        SEQ.pack_into(self._mm, off, seq + 1)                          # odd: writing
+        PAYLOAD.pack_into(self._mm, off + SEQ.size, ts_epoch, cpu, flags, ip)
+        SEQ.pack_into(self._mm, off, seq + 2)                          # even: stable
+
+    def update(self, ip: str, ts_epoch: float, cpu: int | None, extra_flags: int = 0) -> None:
+        flags = FLAG_IN_USE | extra_flags
+        if cpu is not None:
+            flags |= FLAG_CPU_VALID
+        self._write(self.slot_for(ip), ts_epoch, -1 if cpu is None else int(cpu),
+                    flags, ip.encode("ascii"))
+
+    def release(self, ip: str) -> None:
+        """Clear a removed device's slot so readers stop reporting it."""
+        slot = self._slots.pop(ip, None)
+        if slot is None:
+            return
+        self._write(slot, 0.0, -1, 0, b"")
+        self._free.append(slot)
+
+    def retain(self, ips: set[str]) -> None:
+        for ip in [ip for ip in self._slots if ip not in ips]:
+            self.release(ip)
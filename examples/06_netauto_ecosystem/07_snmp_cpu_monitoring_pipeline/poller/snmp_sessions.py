@@ -0,0 +1,197 @@
+"""
+Long-lived SNMPv3 session cache for the poller.
+
+A session is the pair (UsmUserData, UdpTransportTarget) that get_cmd needs.
+Building them per poll costs an address resolution in the executor and a
+fresh auth object, and a changed auth object makes pysnmp drop and re-add
+the USM user, which throws away its localized keys.
+
+Sessions are keyed by (ip, port, user, auth protocol, priv protocol,
+credential fingerprint), so a credential change can never reuse a stale
+session; invalidate() drops entries when devices.json changes. The
+fingerprint is an HMAC with a per-process random salt, used only as a cache
+key and never logged.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import hmac
+import os
+import time
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Any, NamedTuple
+
+from pysnmp.hlapi.v3arch.asyncio import (
+    UsmUserData,
+    UdpTransportTarget,
+    USM_AUTH_HMAC96_MD5,
+    USM_AUTH_HMAC96_SHA,
+    USM_AUTH_HMAC128_SHA224,
+    USM_AUTH_HMAC192_SHA256,
+    USM_AUTH_HMAC256_SHA384,
+    USM_AUTH_HMAC384_SHA512,
+    USM_PRIV_CBC56_DES,
+    USM_PRIV_CFB128_AES,
+    USM_PRIV_CFB192_AES,
+    USM_PRIV_CFB256_AES,
+)
+
+AUTH_PROTOCOLS = {
+    "MD5": USM_AUTH_HMAC96_MD5,
+    "SHA": USM_AUTH_HMAC96_SHA,
+    "SHA224": USM_AUTH_HMAC128_SHA224,
+    "SHA256": USM_AUTH_HMAC192_SHA256,
+    "SHA384": USM_AUTH_HMAC256_SHA384,
+    "SHA512": USM_AUTH_HMAC384_SHA512,
+}
+
+PRIV_PROTOCOLS = {
+    "DES": USM_PRIV_CBC56_DES,
+    "AES": USM_PRIV_CFB128_AES,
+    "AES128": USM_PRIV_CFB128_AES,
+    "AES192": USM_PRIV_CFB192_AES,
+    "AES256": USM_PRIV_CFB256_AES,
+}
+
+
+# ----------------------------
+# Credentials
+# ----------------------------
+# fingerprints are per-process only: a fresh salt each start, never persisted or compared across runs
+_FP_SALT = os.urandom(16)
+
+
+@dataclass(frozen=True)
+class SnmpCredentials:
+    user: str
+    auth_key: str
+    priv_key: str
+    auth_protocol: str = "SHA"
+    priv_protocol: str = "AES"
+
+    @classmethod
+    def from_env(cls) -> "SnmpCredentials":
+        creds = cls(
+            user=os.environ.get("SNMP_USER", "SNMPUser1"),
+            auth_key=os.environ.get("SNMP_AUTH", "AUTHPass1"),
+            priv_key=os.environ.get("SNMP_PRIV", "PRIVPass1"),
+            auth_protocol=os.environ.get("SNMP_AUTH_PROTOCOL", "SHA").upper(),
+            priv_protocol=os.environ.get("SNMP_PRIV_PROTOCOL", "AES").upper(),
+        )
+        if creds.auth_protocol not in AUTH_PROTOCOLS:
+            raise ValueError(f"unsupported SNMP_AUTH_PROTOCOL: {creds.auth_protocol}")
+        if creds.priv_protocol not in PRIV_PROTOCOLS:
+            raise ValueError(f"unsupported SNMP_PRIV_PROTOCOL: {creds.priv_protocol}")
+        return creds
+
+    @cached_property
+    def fingerprint(self) -> str:
+        """Salted digest of the secrets (computed once), so cache keys never carry the passphrases."""
+        raw = "\0".join([self.user, self.auth_key, self.priv_key,
+                         self.auth_protocol, self.priv_protocol])
+        return hmac.new(_FP_SALT, raw.encode("utf-8"), hashlib.sha256).hexdigest()[:16]
+
+    def usm_user_data(self) -> UsmUserData:
+        return UsmUserData(
+            userName=self.user,
+            authKey=self.auth_key,
+            privKey=self.priv_key,
+            authProtocol=AUTH_PROTOCOLS[self.auth_protocol],
+            privProtocol=PRIV_PROTOCOLS[self.priv_protocol],
+        )
+
+
+# ----------------------------
+# Session cache
+# ----------------------------
+class SessionKey(NamedTuple):
+    ip: str
+    port: int
+    user: str
+    auth_protocol: str
+    priv_protocol: str
+    cred_fp: str
+
+
+@dataclass
+class SnmpSession:
+    key: SessionKey
+    auth: UsmUserData
+    transport: UdpTransportTarget
+    created_mono: float = field(default_factory=time.monotonic)
+    uses: int = 0
+
+
+class SnmpSessionCache:
+    def __init__(self, timeout: float, retries: int) -> None:
+        self.timeout = timeout
+        self.retries = retries
+        self._sessions: dict[SessionKey, SnmpSession] = {}
+        # one UsmUserData per credential set, shared by every device using it
+        self._auth: dict[str, UsmUserData] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    @staticmethod
+    def make_key(ip: str, port: int, creds: SnmpCredentials) -> SessionKey:
+        return SessionKey(ip, port, creds.user, creds.auth_protocol,
+                          creds.priv_protocol, creds.fingerprint)
+
+    async def get(self, ip: str, port: int, creds: SnmpCredentials) -> SnmpSession:
+        key = self.make_key(ip, port, creds)
+        sess = self._sessions.get(key)
+        if sess is not None:
+            self.hits += 1
+            sess.uses += 1
+            return sess
+
+        self.misses += 1
+        auth = self._auth.get(key.cred_fp)
+        if auth is None:
+            auth = self._auth[key.cred_fp] = creds.usm_user_data()
+        transport = await UdpTransportTarget.create(
+            (ip, port), timeout=self.timeout, retries=self.retries
+        )
+        # another task may have filled the slot while we were resolving
+        sess = self._sessions.setdefault(key, SnmpSession(key, auth, transport))
+        sess.uses += 1
+        return sess
+
+    def invalidate(self, ip: str | None = None) -> int:
+        """Drop every session (ip=None) or only the sessions of one device."""
+        if ip is None:
+            dropped = len(self._sessions)
+            self._sessions.clear()
+            self._auth.clear()
+        else:
+            stale = [k for k in self._sessions if k.ip == ip]
+            for k in stale:
+                del self._sessions[k]
+            dropped = len(stale)
+        self.evictions += dropped
+        return dropped
+
+    def stats(self) -> dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._sessions),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+def file_fingerprint(path: str) -> tuple[int, int] | None:
+    """(mtime_ns, size) of a file, or None when it can't be stat'ed."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
@@ -0,0 +1,125 @@
+"""
+GETBULK table walks for the poller (per-CPU / per-module tables).
+
+All columns of a table go into one GetBulkRequest (non-repeaters 0), so a
+response carries max-repetitions rows of every column; the walk continues
+from the last OID of each column until that column leaves its subtree (or
+the agent answers endOfMibView). Rows are keyed by their index, the OID
+suffix after the column ("1", "3.2", ...).
+
+max-repetitions is tuned per (device, table): the first walk asks for the
+profile's max_repetitions, later walks ask for the row count seen last time
+plus one, so a table whose size does not change is read in one PDU with no
+wasted rows (the extra repetition is what shows the walk that the table
+ended). A tooBig answer halves the value for that device and retries.
+"""
+
+from __future__ import annotations
+
+from typing import Any, NamedTuple
+
+from pysnmp.hlapi.v3arch.asyncio import ContextData, ObjectIdentity, ObjectType, bulk_cmd
+from pysnmp.proto.errind import RequestTimedOut
+
+from poll_profiles import TableSpec
+from snmp_values import decode_int, is_exception, oid_tuple
+
+SNMP_ERR_TOO_BIG = 1
+MAX_PDUS_PER_WALK = 64   # guard against agents that never end a column
+
+
+class TableWalk(NamedTuple):
+    rows: list[tuple[str, dict[str, int | None]]]   # (index, {metric: value}), in index order
+    pdus: int
+    reachable: bool
+    error: str | None      # error label for metrics, None if the walk completed
+
+
+class BulkTuner:
+    """Per-(ip, table) max-repetitions from the last walk's row count."""
+
+    def __init__(self) -> None:
+        self._rows: dict[tuple[str, str], int] = {}
+        self._cap: dict[tuple[str, str], int] = {}
+
+    def repetitions(self, key: tuple[str, str], limit: int) -> int:
+        limit = min(limit, self._cap.get(key, limit))
+        rows = self._rows.get(key)
+        return limit if rows is None else max(1, min(limit, rows + 1))
+
+    def learn(self, key: tuple[str, str], rows: int) -> None:
+        self._rows[key] = rows
+
+    def too_big(self, key: tuple[str, str], reps: int) -> int:
+        self._cap[key] = max(1, reps // 2)
+        return self._cap[key]
+
+    def forget(self, ip: str) -> None:
+        for d in (self._rows, self._cap):
+            for key in [k for k in d if k[0] == ip]:
+                del d[key]
+
+
+def _index_order(index: str) -> tuple[int, ...]:
+    return tuple(int(x) for x in index.split(".")) if index else ()
+
+
+async def walk_table(engine: Any, sess: Any, ip: str, spec: TableSpec,
+                     tuner: BulkTuner) -> TableWalk:
+    key = (ip, spec.name)
+    prefixes = {m: tuple(int(x) for x in oid.split(".")) for m, oid in spec.columns}
+    last = dict(prefixes)
+    active = spec.metric_names()
+    rows: dict[str, dict[str, int | None]] = {}
+    reps = tuner.repetitions(key, spec.max_repetitions)
+    pdus = 0
+    error = None
+
+    while active:
+        if pdus >= MAX_PDUS_PER_WALK:
+            error = "walkTooLong"
+            break
+        pdus += 1
+        errorIndication, errorStatus, _, varBinds = await bulk_cmd(
+            engine,
+            sess.auth,
+            sess.transport,
+            ContextData(),
+            0, reps,
+            *[ObjectType(ObjectIdentity(".".join(map(str, last[m])))) for m in active],
+            lookupMib=False,
+        )
+        if errorIndication:
+            error = ("RequestTimedOut" if isinstance(errorIndication, RequestTimedOut)
+                     else type(errorIndication).__name__)
+            return TableWalk([], pdus, False, error)
+        if errorStatus:
+            if int(errorStatus) == SNMP_ERR_TOO_BIG and reps > 1:
+                reps = tuner.too_big(key, reps)
+                continue
+            error = errorStatus.prettyPrint()
+            break
+        if not varBinds:
+            break
+
+        width = len(active)
+        ended: set[str] = set()
+        for i, (oid, val) in enumerate(varBinds):
+            metric = active[i % width]
+            if metric in ended:
+                continue
+            prefix = prefixes[metric]
+            o = oid_tuple(oid)
+            if is_exception(val) or o[:len(prefix)] != prefix or o <= last[metric]:
+                ended.add(metric)   # left the column (or endOfMibView / not increasing)
+                continue
+            last[metric] = o
+            rows.setdefault(".".join(map(str, o[len(prefix):])), {})[metric] = decode_int(val)
+        active = [m for m in active if m not in ended]
+
+    if error is None:
+        tuner.learn(key, len(rows))
+    names = spec.metric_names()
+    ordered = sorted(rows.items(), key=lambda kv: _index_order(kv[0]))
+    return TableWalk([(idx, {m: vals.get(m) for m in names}) for idx, vals in ordered],
+                     pdus, True, error)
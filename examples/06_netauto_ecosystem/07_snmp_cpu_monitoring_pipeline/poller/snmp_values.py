@@ -0,0 +1,137 @@
+"""
+Typed decoding of SNMP varbind values for the poller.
+
+prettyPrint() renders a value to text (and, for the exception values, to a
+sentence such as "No Such Object currently exists at this OID"), which the
+poller then parsed back with int(). Every pysnmp value type already knows
+its Python value, so decoding goes by type instead:
+
+  Integer/Integer32/Unsigned32/Gauge32/Counter32/Counter64/TimeTicks -> int
+  OctetString/Opaque/Bits                                          -> bytes
+  IpAddress                                                        -> str (dotted quad)
+  ObjectIdentifier                                                 -> tuple of ints
+  noSuchObject/noSuchInstance/endOfMibView, Null                   -> None
+
+The decoder for a type is looked up once per class and cached, so a varbind
+costs one dict lookup plus the conversion itself. decode_number() also
+accepts numbers sent as text (DisplayString "12" or "12.5"), decode_text()
+gives the display form without going through prettyPrint().
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable
+
+from pyasn1.type import univ
+from pysnmp.proto import rfc1902, rfc1905
+
+EXCEPTION_TYPES = (rfc1905.NoSuchObject, rfc1905.NoSuchInstance, rfc1905.EndOfMibView)
+
+Decoder = Callable[[Any], Any]
+
+
+def _none(val: Any) -> None:
+    return None
+
+
+def _ip(val: Any) -> str:
+    return ".".join(map(str, val.asNumbers()))
+
+
+def _bytes(val: Any) -> bytes:
+    return val.asOctets()
+
+
+def _oid(val: Any) -> tuple[int, ...]:
+    return val.asTuple()
+
+
+def _decoder_for(cls: type) -> Decoder:
+    # exception values subclass Null, IpAddress subclasses OctetString:
+    # the order of the checks matters
+    if issubclass(cls, EXCEPTION_TYPES) or issubclass(cls, univ.Null):
+        return _none
+    if issubclass(cls, univ.Integer):
+        return int
+    if issubclass(cls, rfc1902.IpAddress):
+        return _ip
+    if issubclass(cls, univ.OctetString):
+        return _bytes
+    if issubclass(cls, univ.ObjectIdentifier):
+        return _oid
+    raise TypeError(f"no decoder for SNMP type {cls.__name__}")
+
+
+_DECODERS: dict[type, Decoder] = {}
+
+
+def decoder(cls: type) -> Decoder:
+    fn = _DECODERS.get(cls)
+    if fn is None:
+        fn = _DECODERS[cls] = _decoder_for(cls)
+    return fn
+
+
+def is_exception(val: Any) -> bool:
+    """True for noSuchObject / noSuchInstance / endOfMibView."""
+    return isinstance(val, EXCEPTION_TYPES)
+
+
+def decode(val: Any) -> int | bytes | str | tuple[int, ...] | None:
+    """Python value of a varbind value (see the module docstring), None if absent."""
+    return decoder(type(val))(val)
+
+
+def decode_number(val: Any) -> int | float | None:
+    """
+    Numeric value of a varbind:
+      integer types => int
+      OctetString holding a decimal number => int or float
+      anything else (exceptions, non-numeric text, OIDs) => None
+    """
+    fn = decoder(type(val))
+    if fn is int:
+        return int(val)
+    if fn is _bytes:
+        text = val.asOctets().strip()
+        try:
+            return int(text)
+        except ValueError:
+            pass
+        try:
+            return float(text)
+        except ValueError:
+            return None
+    return None
+
+
+def decode_int(val: Any) -> int | None:
+    """Integer value of a varbind (integer types or decimal text), else None."""
+    fn = _DECODERS.get(type(val)) or decoder(type(val))   # hot path: skip a call
+    if fn is int:
+        return int(val)
+    if fn is _bytes:
+        try:
+            return int(val.asOctets())
+        except ValueError:
+            return None
+    return None
+
+
+def decode_text(val: Any) -> str | None:
+    """Display form of a varbind: text for OctetStrings (UTF-8), str() of the decoded value otherwise."""
+    fn = decoder(type(val))
+    if fn is _none:
+        return None
+    if fn is _bytes:
+        return val.asOctets().decode("utf-8", errors="replace")
+    if fn is _oid:
+        return ".".join(map(str, val.asTuple()))
+    return str(fn(val))
+
+
+def oid_tuple(oid: Any) -> tuple[int, ...]:
+    """Sub-identifiers of a response OID (ObjectName or ObjectIdentity)."""
+    if isinstance(oid, univ.ObjectIdentifier):
+        return oid.asTuple()
+    return oid.get_oid().asTuple()   # resolved ObjectIdentity (lookupMib=True)
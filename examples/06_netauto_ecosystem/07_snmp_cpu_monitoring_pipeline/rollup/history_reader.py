@@ -0,0 +1,135 @@
+"""
+Incremental reader for the poller's segmented CPU history.
+
+Every poller shard keeps its own manifest next to CSV_FILE (cpu-manifest.json,
+cpu.w0-manifest.json, ...; see poller/history_writer.py). new_rows() walks the
+segments they list and returns only the rows a watermark has not covered yet.
+
+The watermark is kept per segment (file name without .gz):
+
+  rows    data rows already consumed
+  offset  bytes of the plain .csv already consumed
+  done    the segment is closed and was read to the end; never opened again
+
+- a plain segment is read from `offset` on, and only up to the last complete
+  line, so a cycle the poller is still appending is picked up next time
+- a segment gzipped since the last run (.csv.gz) is decompressed once, the
+  first `rows` data rows are skipped unparsed and the rest is read
+"""
+
+from __future__ import annotations
+
+import csv
+import gzip
+import io
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterator
+
+
+@dataclass
+class Watermark:
+    rows: int = 0
+    offset: int = 0
+    done: bool = False
+
+
+@dataclass(frozen=True)
+class Sample:
+    ts_epoch: float
+    ip: str
+    value: float | None     # None: failed poll (empty cell)
+
+
+def manifests(csv_file: str | Path) -> list[Path]:
+    """cpu-manifest.json plus one per shard (cpu.<shard>-manifest.json)."""
+    base = Path(csv_file)
+    return sorted(base.parent.glob(f"{base.stem}*-manifest.json"))
+
+
+def load_segments(manifest: Path) -> list[dict[str, Any]]:
+    try:
+        with open(manifest, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return []
+    segments = data.get("segments") if isinstance(data, dict) else None
+    return [s for s in segments or [] if isinstance(s, dict) and s.get("file")]
+
+
+def segment_key(entry: dict[str, Any]) -> str:
+    name = str(entry["file"])
+    return name[:-3] if name.endswith(".gz") else name
+
+
+def _parse(row: list[str], ts_col: int, ip_col: int, value_col: int) -> Sample | None:
+    try:
+        ts = datetime.fromisoformat(row[ts_col]).timestamp()
+        ip = row[ip_col]
+    except (IndexError, ValueError):
+        return None
+    cell = row[value_col] if value_col < len(row) else ""
+    try:
+        value = float(cell) if cell != "" else None
+    except ValueError:
+        value = None
+    return Sample(ts, ip, value)
+
+
+def _columns(fields: list[str], metric: str) -> tuple[int, int, int] | None:
+    try:
+        return fields.index("timestamp_utc"), fields.index("ip"), fields.index(metric)
+    except ValueError:
+        return None
+
+
+def new_rows(directory: Path, entry: dict[str, Any], mark: Watermark,
+             metric: str) -> tuple[list[Sample], Watermark]:
+    """Rows of one segment past `mark`, and the watermark after them."""
+    fields = [str(f) for f in entry.get("fields") or []]
+    cols = _columns(fields, metric)
+    closed = bool(entry.get("closed"))
+    if cols is None:
+        # metric not recorded in this segment: nothing to fold, ever
+        return [], Watermark(mark.rows, mark.offset, closed)
+    path = directory / str(entry["file"])
+    samples: list[Sample] = []
+
+    if path.suffix == ".gz":
+        rows = 0
+        with gzip.open(path, "rt", encoding="utf-8", newline="") as f:
+            for row in csv.reader(f):
+                if row == fields:
+                    continue
+                rows += 1
+                if rows <= mark.rows:
+                    continue
+                s = _parse(row, *cols)
+                if s is not None:
+                    samples.append(s)
+        return samples, Watermark(rows, mark.offset, True)
+
+    with open(path, "rb") as f:
+        f.seek(mark.offset)
+        data = f.read()
+    end = data.rfind(b"\n") + 1          # only complete lines
+    rows = mark.rows
+    for row in csv.reader(io.StringIO(data[:end].decode("utf-8"), newline="")):
+        if not row or row == fields:
+            continue
+        rows += 1
+        s = _parse(row, *cols)
+        if s is not None:
+            samples.append(s)
+    return samples, Watermark(rows, mark.offset + end, closed and end == len(data))
+
+
+def pending(csv_file: str | Path, marks: dict[str, Watermark]) -> Iterator[tuple[Path, dict[str, Any]]]:
+    """(directory, manifest entry) for every segment that may have unread rows."""
+    for manifest in manifests(csv_file):
+        for entry in load_segments(manifest):
+            mark = marks.get(segment_key(entry))
+            if mark is None or not mark.done:
+                yield manifest.parent, entry
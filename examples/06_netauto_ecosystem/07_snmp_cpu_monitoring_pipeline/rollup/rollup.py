@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+SNMP CPU rollup (long-running)
+
+Folds the poller's raw CPU history into downsampled aggregates:
+
+  /app/shared/cpu-*.csv[.gz]   (segments listed by cpu-manifest.json and, per
+                                poller shard, cpu.<shard>-manifest.json)
+    -> /app/shared/rollup.db   (SQLite, WAL mode; see rollup_store.py)
+
+Every ROLLUP_INTERVAL_SEC the new rows of each segment (past its watermark,
+see history_reader.py) are folded into 1-minute, 5-minute and 1-hour buckets
+with min/avg/max/p95/count, per device and per site (sites from
+DEVICES_FILE, as they are when the row is folded). A segment's buckets and
+its watermark are committed together, so processed rows are never read or
+counted again, and a restart continues where the last commit stopped.
+
+Buckets older than ROLLUP_KEEP_<LEVEL>_DAYS are pruned after each run
+(0 keeps them forever).
+
+Query the rollups with rollup_query.py.
+
+Run once and exit (cron, backfill): python rollup.py --once
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+from history_reader import Sample, Watermark, new_rows, pending, segment_key
+from rollup_store import LEVELS, Agg, BucketKey, RollupStore, bucket_start
+
+# ----------------------------
+# Config
+# ----------------------------
+CSV_FILE     = os.environ.get("CSV_FILE", "/app/shared/cpu.csv")
+ROLLUP_DB    = os.environ.get("ROLLUP_DB", "/app/shared/rollup.db")
+DEVICES_FILE = os.environ.get("DEVICES_FILE", "/app/shared/devices.json")   # ip -> site
+METRIC       = os.environ.get("ROLLUP_METRIC", "cpu_percent")
+INTERVAL_SEC = int(os.environ.get("ROLLUP_INTERVAL_SEC", "60"))
+KEEP_DAYS = {
+    "1m": float(os.environ.get("ROLLUP_KEEP_1M_DAYS", "2")),
+    "5m": float(os.environ.get("ROLLUP_KEEP_5M_DAYS", "30")),
+    "1h": float(os.environ.get("ROLLUP_KEEP_1H_DAYS", "400")),
+}
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+
+logging.basicConfig(
+    level=LOG_LEVEL,
+    stream=sys.stdout,
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+)
+log = logging.getLogger("rollup")
+
+
+def load_sites(path: str) -> dict[str, str]:
+    """ip -> site from the poller's devices.json (empty when unreadable)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, list):
+        return {}
+    return {str(d["ip"]): str(d.get("site") or "")
+            for d in data if isinstance(d, dict) and "ip" in d}
+
+
+def fold(samples: list[Sample], sites: dict[str, str]) -> dict[BucketKey, Agg]:
+    aggs: dict[BucketKey, Agg] = {}
+    for s in samples:
+        site = sites.get(s.ip, "")
+        for level in LEVELS:
+            b = bucket_start(s.ts_epoch, level)
+            targets = [(level, "device", s.ip, b)]
+            if site:
+                targets.append((level, "site", site, b))
+            for k in targets:
+                agg = aggs.get(k)
+                if agg is None:
+                    agg = aggs[k] = Agg()
+                agg.add(s.value)
+    return aggs
+
+
+def run_once(store: RollupStore, sites: dict[str, str]) -> dict[str, int]:
+    counts = {"segments": 0, "rows": 0, "buckets": 0, "pruned": 0}
+    marks = store.watermarks()
+    for directory, entry in pending(CSV_FILE, marks):
+        key = segment_key(entry)
+        mark = marks.get(key, Watermark())
+        try:
+            samples, new_mark = new_rows(directory, entry, mark, METRIC)
+        except FileNotFoundError:
+            continue        # gzipped or removed since the manifest was read: next run
+        if new_mark == mark:
+            continue
+        counts["buckets"] += store.merge(fold(samples, sites), {key: new_mark})
+        counts["segments"] += 1
+        counts["rows"] += new_mark.rows - mark.rows
+    now = time.time()
+    for level, days in KEEP_DAYS.items():
+        if days > 0:
+            counts["pruned"] += store.prune(level, bucket_start(now - days * 86400, level))
+    return counts
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Fold the CPU history into 1m/5m/1h rollups.")
+    ap.add_argument("--once", action="store_true", help="run one pass and exit")
+    args = ap.parse_args()
+
+    store = RollupStore(ROLLUP_DB)
+    log.info("history=%s metric=%s db=%s keep_days=%s", CSV_FILE, METRIC, ROLLUP_DB,
+             " ".join(f"{k}={v:g}" for k, v in KEEP_DAYS.items()))
+
+    sites_marker: tuple[int, int] | None = None
+    sites: dict[str, str] = {}
+    while True:
+        t0 = time.monotonic()
+        try:
+            dst = os.stat(DEVICES_FILE)
+            marker = (dst.st_mtime_ns, dst.st_size)
+        except OSError:
+            marker = None
+        if marker != sites_marker:
+            sites_marker = marker
+            sites = load_sites(DEVICES_FILE)
+
+        counts = run_once(store, sites)
+        if counts["segments"] or counts["pruned"] or args.once:
+            log.info("run: segments=%d rows=%d buckets_written=%d pruned=%d in %.1f ms",
+                     counts["segments"], counts["rows"], counts["buckets"], counts["pruned"],
+                     (time.monotonic() - t0) * 1000)
+        if args.once:
+            break
+        time.sleep(INTERVAL_SEC)
+    store.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Query the CPU rollups (rollup.db) without touching the raw history.
+
+  python rollup_query.py summary --scope site --since 7d
+      min/avg/max/p95/count per site over the last week
+  python rollup_query.py top --scope device --by p95 -n 10 --since 24h
+      the 10 devices with the highest p95 in the last day
+  python rollup_query.py series --scope device --key 192.168.56.20 --since 6h
+      one line per bucket for one device (or site)
+  python rollup_query.py status
+      bucket counts per level, watermarks
+
+--since/--until take a duration back from now (90m, 24h, 7d) or an ISO
+timestamp. --level auto picks the finest of 1m/5m/1h that needs at most
+MAX_POINTS buckets for the range; ranges are widened to whole buckets.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import sqlite3
+import sys
+import time
+from datetime import datetime, timezone
+
+from rollup_store import LEVELS, SCOPES, Agg, RollupStore
+
+ROLLUP_DB = os.environ.get("ROLLUP_DB", "/app/shared/rollup.db")
+MAX_POINTS = 720
+DURATION = re.compile(r"^(\d+(?:\.\d+)?)([smhd])$")
+UNIT_SEC = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+ORDER_BY = ("p95", "max", "avg", "min", "count")
+
+
+def parse_time(text: str, now: float) -> int:
+    m = DURATION.match(text)
+    if m:
+        return int(now - float(m.group(1)) * UNIT_SEC[m.group(2)])
+    try:
+        dt = datetime.fromisoformat(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a duration or ISO timestamp: {text!r}")
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+def pick_level(level: str, since: int, until: int) -> str:
+    if level != "auto":
+        return level
+    for name, size in LEVELS.items():
+        if (until - since) / size <= MAX_POINTS:
+            return name
+    return "1h"
+
+
+def iso(epoch: int | None) -> str:
+    if epoch is None:
+        return "-"
+    return datetime.fromtimestamp(epoch, timezone.utc).isoformat(timespec="seconds")
+
+
+def fmt(v: float | None) -> str:
+    return "-" if v is None else f"{v:.1f}"
+
+
+def stat_cells(agg: Agg) -> list[str]:
+    return [fmt(agg.min), fmt(agg.avg), fmt(agg.max), fmt(agg.p95), str(agg.count),
+            str(agg.missing)]
+
+
+def print_table(header: list[str], rows: list[list[str]]) -> None:
+    widths = [max(len(h), *(len(r[i]) for r in rows)) if rows else len(h)
+              for i, h in enumerate(header)]
+    print("  ".join(h.ljust(w) for h, w in zip(header, widths)))
+    for r in rows:
+        print("  ".join(c.ljust(w) for c, w in zip(r, widths)))
+
+
+def sort_value(agg: Agg, by: str) -> float:
+    v = agg.count if by == "count" else getattr(agg, by)
+    return float("-inf") if v is None else float(v)
+
+
+def cmd_summary(store: RollupStore, args: argparse.Namespace, top: int | None) -> None:
+    level = pick_level(args.level, args.since, args.until)
+    aggs = store.summarize(level, args.scope, args.since, args.until)
+    if top is None:
+        items = sorted(aggs.items())
+    else:
+        items = sorted(aggs.items(), key=lambda kv: (-sort_value(kv[1], args.by), kv[0]))[:top]
+    print(f"# {args.scope} {iso(args.since)} .. {iso(args.until)} level={level}")
+    print_table([args.scope, "min", "avg", "max", "p95", "count", "missing"],
+                [[key, *stat_cells(agg)] for key, agg in items])
+
+
+def cmd_series(store: RollupStore, args: argparse.Namespace) -> None:
+    level = pick_level(args.level, args.since, args.until)
+    rows = store.series(level, args.scope, args.key, args.since, args.until)
+    print(f"# {args.scope}={args.key} {iso(args.since)} .. {iso(args.until)} level={level}")
+    print_table(["bucket_utc", "min", "avg", "max", "p95", "count", "missing"],
+                [[iso(bucket), *stat_cells(agg)] for bucket, agg in rows])
+
+
+def cmd_status(store: RollupStore) -> None:
+    counts = store.counts()
+    print_table(["level", "scope", "buckets", "first_utc", "last_utc"],
+                [[level, scope, str(n), iso(lo), iso(hi)]
+                 for (level, scope), (n, lo, hi) in sorted(counts.items())])
+    marks = store.watermarks()
+    print()
+    print_table(["segment", "rows", "offset", "done"],
+                [[seg, str(m.rows), str(m.offset), "yes" if m.done else "no"]
+                 for seg, m in sorted(marks.items())])
+
+
+def main() -> int:
+    now = time.time()
+    ap = argparse.ArgumentParser(description="Query CPU rollups (min/avg/max/p95/count).")
+    ap.add_argument("--db", default=ROLLUP_DB, help=f"rollup database (default {ROLLUP_DB})")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    def add_range(p: argparse.ArgumentParser) -> None:
+        p.add_argument("--scope", choices=SCOPES, default="device")
+        p.add_argument("--since", type=lambda t: parse_time(t, now), default=parse_time("1h", now))
+        p.add_argument("--until", type=lambda t: parse_time(t, now), default=int(now))
+        p.add_argument("--level", choices=["auto", *LEVELS], default="auto")
+
+    p = sub.add_parser("summary", help="one line per device/site over a time range")
+    add_range(p)
+    p = sub.add_parser("top", help="top-N devices/sites over a time range")
+    add_range(p)
+    p.add_argument("--by", choices=ORDER_BY, default="p95")
+    p.add_argument("-n", type=int, default=10)
+    p = sub.add_parser("series", help="per-bucket values of one device/site")
+    add_range(p)
+    p.add_argument("--key", required=True, help="device ip or site name")
+    sub.add_parser("status", help="bucket counts and history watermarks")
+    args = ap.parse_args()
+
+    try:
+        store = RollupStore(args.db, readonly=True)
+        if args.cmd == "summary":
+            cmd_summary(store, args, None)
+        elif args.cmd == "top":
+            cmd_summary(store, args, args.n)
+        elif args.cmd == "series":
+            cmd_series(store, args)
+        else:
+            cmd_status(store)
+    except sqlite3.Error as e:
+        print(f"rollup_query: {args.db}: {e}", file=sys.stderr)
+        return 1
+    store.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+"""
+CPU rollups: 1-minute, 5-minute and 1-hour aggregates per device and per site,
+in one SQLite database (WAL mode), next to the watermarks of the history
+segments they were folded from.
+
+Each bucket keeps count/missing/sum/min/max plus a histogram of the values
+over integer percent bins 0..100 (stored sparse). Histograms merge exactly,
+so a bucket can be topped up by later runs and the p95 of any time range or
+any group of buckets is the real p95 of the samples, not an average of
+percentiles. Values outside 0..100 are clamped into the end bins; min, max
+and avg use the raw values.
+
+merge() writes aggregates and watermarks in one transaction: a crash either
+keeps both or neither, so no row is folded twice.
+"""
+
+from __future__ import annotations
+
+import math
+import sqlite3
+from array import array
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable
+
+from history_reader import Watermark
+
+LEVELS = {"1m": 60, "5m": 300, "1h": 3600}
+SCOPES = ("device", "site")
+BINS = 101
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollup (
+    level   TEXT NOT NULL,
+    scope   TEXT NOT NULL,
+    key     TEXT NOT NULL,
+    bucket  INTEGER NOT NULL,
+    count   INTEGER NOT NULL,
+    missing INTEGER NOT NULL,
+    sum     REAL NOT NULL,
+    min     REAL,
+    max     REAL,
+    p95     REAL,
+    hist    BLOB NOT NULL,
+    PRIMARY KEY (level, scope, key, bucket)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS rollup_by_bucket ON rollup (level, scope, bucket);
+CREATE TABLE IF NOT EXISTS watermark (
+    segment TEXT PRIMARY KEY,
+    rows    INTEGER NOT NULL,
+    offset  INTEGER NOT NULL,
+    done    INTEGER NOT NULL
+);
+"""
+
+COLUMNS = "level, scope, key, bucket, count, missing, sum, min, max, p95, hist"
+
+BucketKey = tuple[str, str, str, int]     # (level, scope, key, bucket start epoch)
+
+
+@dataclass
+class Agg:
+    count: int = 0
+    missing: int = 0
+    sum: float = 0.0
+    min: float | None = None
+    max: float | None = None
+    hist: list[int] = field(default_factory=lambda: [0] * BINS)
+
+    def add(self, value: float | None) -> None:
+        if value is None:
+            self.missing += 1
+            return
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.hist[min(max(int(round(value)), 0), BINS - 1)] += 1
+
+    def merge(self, other: Agg) -> None:
+        self.count += other.count
+        self.missing += other.missing
+        self.sum += other.sum
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        if other.max is not None:
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        for i, c in enumerate(other.hist):
+            if c:
+                self.hist[i] += c
+
+    @property
+    def avg(self) -> float | None:
+        return self.sum / self.count if self.count else None
+
+    def percentile(self, q: float) -> float | None:
+        """Nearest-rank percentile over the histogram bins."""
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for i, c in enumerate(self.hist):
+            seen += c
+            if seen >= rank:
+                return float(i)
+        return float(BINS - 1)
+
+    @property
+    def p95(self) -> float | None:
+        return self.percentile(0.95)
+
+    def encode_hist(self) -> bytes:
+        pairs = array("I")
+        for i, c in enumerate(self.hist):
+            if c:
+                pairs.extend((i, c))
+        return pairs.tobytes()
+
+    @classmethod
+    def from_row(cls, count: int, missing: int, sum_: float, min_: float | None,
+                 max_: float | None, blob: bytes) -> Agg:
+        agg = cls(count, missing, sum_, min_, max_)
+        pairs = array("I")
+        pairs.frombytes(blob)
+        for i in range(0, len(pairs), 2):
+            agg.hist[pairs[i]] = pairs[i + 1]
+        return agg
+
+
+def bucket_start(ts_epoch: float, level: str) -> int:
+    size = LEVELS[level]
+    return int(ts_epoch // size) * size
+
+
+class RollupStore:
+    def __init__(self, path: str | Path, readonly: bool = False) -> None:
+        self.path = Path(path)
+        if readonly:
+            self._db = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True,
+                                       isolation_level=None)
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path, isolation_level=None)   # explicit BEGIN/COMMIT
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(SCHEMA)
+
+    # ----------------------------
+    # Watermarks
+    # ----------------------------
+    def watermarks(self) -> dict[str, Watermark]:
+        cur = self._db.execute("SELECT segment, rows, offset, done FROM watermark")
+        return {seg: Watermark(rows, offset, bool(done)) for seg, rows, offset, done in cur}
+
+    # ----------------------------
+    # Write
+    # ----------------------------
+    def _existing(self, keys: Iterable[BucketKey]) -> dict[BucketKey, Agg]:
+        """Stored buckets for `keys`, fetched with one range scan per (level, scope)."""
+        wanted: dict[tuple[str, str], set[BucketKey]] = {}
+        for k in keys:
+            wanted.setdefault((k[0], k[1]), set()).add(k)
+        found: dict[BucketKey, Agg] = {}
+        for (level, scope), ks in wanted.items():
+            lo = min(k[3] for k in ks)
+            hi = max(k[3] for k in ks)
+            cur = self._db.execute(
+                "SELECT key, bucket, count, missing, sum, min, max, hist FROM rollup "
+                "WHERE level = ? AND scope = ? AND bucket BETWEEN ? AND ?",
+                (level, scope, lo, hi))
+            for key, bucket, *rest in cur:
+                k = (level, scope, key, bucket)
+                if k in ks:
+                    found[k] = Agg.from_row(*rest)
+        return found
+
+    def merge(self, aggs: dict[BucketKey, Agg], marks: dict[str, Watermark]) -> int:
+        """Fold `aggs` into the stored buckets and advance `marks`, atomically."""
+        self._db.execute("BEGIN")
+        try:
+            existing = self._existing(aggs)
+            rows = []
+            for k, agg in aggs.items():
+                old = existing.get(k)
+                if old is not None:
+                    old.merge(agg)
+                    agg = old
+                rows.append((*k, agg.count, agg.missing, agg.sum, agg.min, agg.max,
+                             agg.p95, agg.encode_hist()))
+            self._db.executemany(
+                f"INSERT OR REPLACE INTO rollup ({COLUMNS}) "
+                f"VALUES ({', '.join('?' * len(COLUMNS.split(',')))})", rows)
+            self._db.executemany(
+                "INSERT OR REPLACE INTO watermark (segment, rows, offset, done) "
+                "VALUES (?, ?, ?, ?)",
+                [(seg, m.rows, m.offset, int(m.done)) for seg, m in marks.items()])
+            self._db.execute("COMMIT")
+        except Exception:
+            self._db.execute("ROLLBACK")
+            raise
+        return len(rows)
+
+    def prune(self, level: str, before_epoch: int) -> int:
+        cur = self._db.execute("DELETE FROM rollup WHERE level = ? AND bucket < ?",
+                               (level, before_epoch))
+        return cur.rowcount
+
+    # ----------------------------
+    # Read
+    # ----------------------------
+    def series(self, level: str, scope: str, key: str, since: int,
+               until: int) -> list[tuple[int, Agg]]:
+        cur = self._db.execute(
+            "SELECT bucket, count, missing, sum, min, max, hist FROM rollup "
+            "WHERE level = ? AND scope = ? AND key = ? AND bucket >= ? AND bucket < ? "
+            "ORDER BY bucket",
+            (level, scope, key, bucket_start(since, level), until))
+        return [(bucket, Agg.from_row(*rest)) for bucket, *rest in cur]
+
+    def summarize(self, level: str, scope: str, since: int, until: int) -> dict[str, Agg]:
+        """One merged aggregate per key over every bucket in [since, until)."""
+        cur = self._db.execute(
+            "SELECT key, count, missing, sum, min, max, hist FROM rollup "
+            "WHERE level = ? AND scope = ? AND bucket >= ? AND bucket < ?",
+            (level, scope, bucket_start(since, level), until))
+        out: dict[str, Agg] = {}
+        for key, *rest in cur:
+            agg = Agg.from_row(*rest)
+            if key in out:
+                out[key].merge(agg)
+            else:
+                out[key] = agg
+        return out
+
+    def counts(self) -> dict[tuple[str, str], tuple[int, int | None, int | None]]:
+        """(level, scope) -> (buckets, first bucket, last bucket)."""
+        cur = self._db.execute(
+            "SELECT level, scope, COUNT(*), MIN(bucket), MAX(bucket) FROM rollup "
+            "GROUP BY level, scope")
+        return {(level, scope): (n, lo, hi) for level, scope, n, lo, hi in cur}
+
+    def close(self) -> None:
+        self._db.close()
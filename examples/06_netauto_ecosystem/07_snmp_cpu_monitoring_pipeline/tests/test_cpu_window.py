@@ -0,0 +1,43 @@
+import pytest
+
+from cpu_window import AlertRule, CpuWindows
+
+
+def actions(rule, samples):
+    """ALERT/RECOVERY per sample (None when the alarm does not change)."""
+    windows = CpuWindows(rule)
+    alarm_active = False
+    out = []
+    for cpu in samples:
+        status = rule.status(windows.add("10.0.0.1", cpu), alarm_active)
+        if status == "HIGH" and not alarm_active:
+            out.append("ALERT")
+        elif status == "OK" and alarm_active:
+            out.append("RECOVERY")
+        else:
+            out.append(None)
+        alarm_active = status == "HIGH"
+    return out
+
+
+def test_steady_high_cpu_does_not_recover():
+    rule = AlertRule(80, 80, n=2, window=5)
+
+    result = actions(rule, [10, 10, 10, 90, 90, 90, 90, 90, 90])
+
+    assert result.count("ALERT") == 1
+    assert "RECOVERY" not in result
+
+
+def test_recovers_once_the_raise_rule_can_no_longer_hold():
+    rule = AlertRule(80, 70, n=2, window=5)
+    assert rule.clear_n == 4
+
+    result = actions(rule, [90, 90, 10, 10, 10, 10])
+
+    assert result == [None, "ALERT", None, None, None, "RECOVERY"]
+
+
+@pytest.mark.parametrize("n, window, clear_n", [(1, 1, 1), (3, 5, 3), (3, 3, 3), (1, 5, 5)])
+def test_clear_count(n, window, clear_n):
+    assert AlertRule(80, 80, n=n, window=window).clear_n == clear_n
@@ -0,0 +1,46 @@
+from device_health import CLOSED, DeviceHealth
+
+
+IP = "10.0.0.1"
+
+
+def make_health():
+    return DeviceHealth(failures_to_open=3, probe_sec=30, probe_max_sec=300, probe_timeout=1,
+                        min_timeout=0.5, max_timeout=2, retries=1)
+
+
+def poll(health, rtt, now):
+    """One poll against a device answering after `rtt` seconds."""
+    timeout, _ = health.timeout_for(IP)
+    if rtt <= timeout:
+        health.record_success(IP, rtt)
+        return True
+    health.record_failure(IP, now)
+    return False
+
+
+def test_rising_rtt_backs_off_instead_of_quarantining():
+    health = make_health()
+    for i in range(20):
+        assert poll(health, 0.05, now=i)
+    assert health.timeout_for(IP)[0] == 0.5
+
+    results = [poll(health, 1.5, now=20 + i) for i in range(10)]
+
+    assert results[:2] == [False, False]   # 0.5 s, then 1.0 s
+    assert all(results[2:])                # 2.0 s from then on
+    assert health.entry(IP).state == CLOSED
+    assert health.opened == 0
+    assert health.timeout_for(IP)[0] >= 1.5
+
+
+def test_valid_sample_resets_the_backoff():
+    health = make_health()
+    for i in range(20):
+        poll(health, 0.05, now=i)
+
+    health.record_failure(IP, now=20)
+    assert health.timeout_for(IP)[0] == 1.0
+
+    health.record_success(IP, 0.05)
+    assert health.timeout_for(IP)[0] == 0.5
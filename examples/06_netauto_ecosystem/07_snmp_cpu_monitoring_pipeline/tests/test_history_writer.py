@@ -0,0 +1,43 @@
+import json
+
+from history_writer import HistoryWriter
+
+
+FIELDS = ["timestamp_utc", "ip", "cpu_percent"]
+
+
+def rows(ts):
+    return [{"timestamp_utc": ts, "ip": "10.0.0.1", "cpu_percent": 5}]
+
+
+def manifest(writer):
+    return json.loads(writer.manifest_path.read_text(encoding="utf-8"))
+
+
+def test_manifest_is_written_on_open_and_close_not_every_cycle(tmp_path):
+    writer = HistoryWriter(tmp_path / "cpu.csv", FIELDS, checkpoint_sec=3600)
+
+    for minute in range(10):
+        writer.write_cycle(f"2026-04-18T18:{minute:02d}:00+00:00", rows("x"))
+    assert manifest(writer)["segments"][0]["rows"] == 0   # only the open was saved
+
+    writer.write_cycle("2026-04-18T19:00:00+00:00", rows("x"))
+    segments = manifest(writer)["segments"]
+    assert [(s["file"], s["rows"], s["closed"]) for s in segments] == [
+        ("cpu-2026041818.csv", 10, True),
+        ("cpu-2026041819.csv", 0, False),
+    ]
+
+
+def test_closed_segments_past_retention_are_deleted(tmp_path):
+    writer = HistoryWriter(tmp_path / "cpu.csv", FIELDS, keep_sec=2 * 3600)
+
+    for hour in range(18, 23):
+        writer.write_cycle(f"2026-04-18T{hour}:00:00+00:00", rows("x"))
+
+    assert [s["file"] for s in manifest(writer)["segments"]] == [
+        "cpu-2026041820.csv", "cpu-2026041821.csv", "cpu-2026041822.csv",
+    ]
+    assert sorted(p.name for p in tmp_path.glob("cpu-*.csv")) == [
+        "cpu-2026041820.csv", "cpu-2026041821.csv", "cpu-2026041822.csv",
+    ]